@@ -0,0 +1,103 @@
+"""Compare the JSON codecs in :mod:`snek.codec` on typical KV2 payloads.
+
+Each installed codec decodes a response body, both directly and through
+:meth:`snek.client.VaultClient._to_vault_response`, and encodes a write
+request body::
+
+    python -m benchmarks.bench_codec
+"""
+import argparse
+import json
+import timeit
+
+from snek.client import VaultClient
+from snek.codec import CODECS, JSONCodec, get_codec
+
+
+def read_body(data: dict) -> bytes:
+    return json.dumps(
+        {
+            "request_id": "0b7b3bc2-9e04-3cbd-5a4a-1b9e4d1dbe4d",
+            "lease_id": "",
+            "renewable": False,
+            "lease_duration": 0,
+            "data": {
+                "data": data,
+                "metadata": {
+                    "created_time": "2020-12-19T19:39:24.123456Z",
+                    "custom_metadata": None,
+                    "deletion_time": "",
+                    "destroyed": False,
+                    "version": 3,
+                },
+            },
+            "wrap_info": None,
+            "warnings": None,
+            "auth": None,
+        }
+    ).encode()
+
+
+def payloads() -> dict:
+    line = "MIIDdzCCAl+gAwIBAgIEAgAAuTANBgkqhkiG9w0BAQUFADBaMQswCQYDVQQGEwJJ\n"
+    return {
+        "small read": read_body({"username": "app", "password": "hunter2"}),
+        "config read": read_body(
+            {f"setting_{i}": {"value": i, "enabled": i % 2 == 0} for i in range(50)}
+        ),
+        "certificate read": read_body(
+            {"bundle": "-----BEGIN CERTIFICATE-----\n" + line * 1500}
+        ),
+        "list 1000 keys": json.dumps(
+            {"data": {"keys": [f"service-{i}/" for i in range(1000)]}}
+        ).encode(),
+    }
+
+
+class FakeResponse:
+    """Stand-in for ``requests.Response`` with no transport involved."""
+
+    def __init__(self, content: bytes):
+        self.status_code = 200
+        self.content = content
+
+
+def bench(name: str, func, number: int) -> None:
+    best = min(timeit.repeat(func, number=number, repeat=5))
+    print(f"{name:<45} {best / number * 1e6:10.2f} us/call")
+
+
+def available() -> list:
+    codecs = []
+    for name in CODECS:
+        try:
+            codecs.append(get_codec(name))
+        except ImportError:
+            print(f"{name} is not installed, skipping")
+    return codecs
+
+
+def main(number: int) -> None:
+    codecs = available()
+    print(f"default codec: {get_codec().name}")
+    for label, body in payloads().items():
+        print(f"\n{label} ({len(body)} bytes)")
+        res = FakeResponse(body)
+        document = json.loads(body)
+        write_body = {"options": {"cas": 3}, "data": document["data"]}
+        # Fewer iterations for the large payloads so every case takes similar time.
+        count = max(10, number * 500 // len(body))
+        for codec in codecs:
+
+            def read(codec: JSONCodec = codec) -> object:
+                return VaultClient._to_vault_response(res, codec).response
+
+            bench(f"  {codec.name} loads", lambda: codec.loads(body), count)
+            bench(f"  {codec.name} response", read, count)
+            bench(f"  {codec.name} dumps", lambda: codec.dumps(write_body), count)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=10_000)
+    main(parser.parse_args().number)
@@ -0,0 +1,77 @@
+"""Compare eager and lazy :class:`snek.secrets.KVSecretV2` decoding of a large
+secret: time to read one small key, time to write the big key to a file, and
+peak memory allocated while doing so::
+
+    python -m benchmarks.bench_lazy --size 300000
+"""
+import argparse
+import json
+import os
+import tempfile
+import timeit
+import tracemalloc
+
+from snek.models import VaultResponse
+from snek.secrets import KVSecretV2
+
+
+def make_body(size: int) -> bytes:
+    line = "MIIDdzCCAl+gAwIBAgIEAgAAuTANBgkqhkiG9w0BAQUFADBaMQswCQYDVQQGEwJJ\n"
+    cert = "-----BEGIN CERTIFICATE-----\n" + line * (size // len(line))
+    return json.dumps(
+        {
+            "data": {
+                "data": {"bundle": cert, "port": 5432},
+                "metadata": {"version": 3, "created_time": "2020-12-19T19:39:24Z"},
+            }
+        }
+    ).encode()
+
+
+def secret(raw: bytes, lazy: bool) -> KVSecretV2:
+    res = VaultResponse(None, 200, loader=lambda: json.loads(raw), raw=raw)
+    return KVSecretV2("app/tls", vault_response=res, lazy=lazy)
+
+
+def peak(func) -> int:
+    tracemalloc.start()
+    func()
+    _, high = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return high
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=300_000)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+    raw = make_body(args.size)
+    fd, path = tempfile.mkstemp()
+    os.close(fd)
+
+    def small_key(lazy: bool) -> None:
+        secret(raw, lazy).value["port"]
+
+    def to_file(lazy: bool) -> None:
+        with open(path, "wb") as fp:
+            secret(raw, lazy).write_value("bundle", fp)
+
+    try:
+        print(f"body: {len(raw)} bytes")
+        for name, func in (("read small key", small_key), ("write to file", to_file)):
+            for lazy in (False, True):
+                best = min(
+                    timeit.repeat(lambda: func(lazy), number=args.number, repeat=3)
+                )
+                print(
+                    f"{name:<16} {'lazy' if lazy else 'eager':<6}"
+                    f" {best / args.number * 1e6:10.1f} us"
+                    f" {peak(lambda: func(lazy)) / 1024:10.1f} KiB peak"
+                )
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Micro-benchmark of the per-call overhead of turning an HTTP response into a
+:class:`snek.models.VaultResponse`.
+
+The ``legacy`` case reproduces the original enum and list based implementation
+so the two can be compared on the same machine::
+
+    python -m benchmarks.bench_response
+"""
+import json
+import timeit
+
+from snek.client import VaultClient
+from snek.codec import JSONCodec
+from snek.constants import HttpStatusCode
+from snek.exceptions import VaultClientException
+from snek.models import VaultResponse
+
+BODY = json.dumps(
+    {
+        "data": {
+            "data": {"username": "app", "password": "hunter2"},
+            "metadata": {"version": 3, "created_time": "2020-12-19T19:39:24Z"},
+        }
+    }
+)
+
+
+PAYLOAD = json.loads(BODY)
+
+#: returns the pre-decoded payload so only snek's own overhead is measured
+PREDECODED = JSONCodec("predecoded", lambda _: PAYLOAD, lambda _: b"")
+
+
+class FakeResponse:
+    """Stand-in for ``requests.Response`` with no transport involved.
+
+    ``json()`` returns a pre-decoded payload, like :data:`PREDECODED`, so only
+    snek's own overhead is measured.
+    """
+
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+        self.text = BODY
+        self.content = BODY.encode()
+
+    def json(self):
+        return PAYLOAD
+
+
+class LegacyVaultResponse:
+    def __init__(self, response, status_code, errors=None):
+        self.response = response
+        if isinstance(status_code, HttpStatusCode):
+            self.status_code = status_code
+        else:
+            self.status_code = HttpStatusCode(status_code)
+        self.errors = errors
+
+
+def legacy_to_vault_response(res):
+    code = HttpStatusCode(res.status_code)
+    if code not in [
+        HttpStatusCode.SUCCESS_DATA,
+        HttpStatusCode.SUCCESS_NO_DATA,
+        HttpStatusCode.HEALTH_PERFORMANCE_STANDBY_NODE,
+        HttpStatusCode.HEALTH_STANDBY_NODE,
+    ]:
+        raise VaultClientException(f"{res.status_code}: {res.text}")
+    return LegacyVaultResponse(
+        response=res.json() if code != HttpStatusCode.SUCCESS_NO_DATA else {},
+        status_code=res.status_code,
+    )
+
+
+def legacy_ok(response):
+    return response.status_code in [
+        HttpStatusCode.SUCCESS_DATA,
+        HttpStatusCode.SUCCESS_NO_DATA,
+        HttpStatusCode.HEALTH_PERFORMANCE_STANDBY_NODE,
+        HttpStatusCode.HEALTH_STANDBY_NODE,
+    ]
+
+
+def bench(name, func, number):
+    best = min(timeit.repeat(func, number=number, repeat=5))
+    print(f"{name:<40} {best / number * 1e6:8.3f} us/call")
+
+
+def main(number: int = 100_000) -> None:
+    ok = FakeResponse(200)
+    legacy_response = LegacyVaultResponse({}, 200)
+    current_response = VaultResponse({}, 200)
+    no_data = FakeResponse(204)
+
+    def current_read():
+        return VaultClient._to_vault_response(ok, PREDECODED).response
+
+    bench("legacy 200", lambda: legacy_to_vault_response(ok), number)
+    bench("current 200, body accessed", current_read, number)
+    bench("legacy 204", lambda: legacy_to_vault_response(no_data), number)
+    bench(
+        "current 204",
+        lambda: VaultClient._to_vault_response(no_data, PREDECODED),
+        number,
+    )
+    bench(
+        "current 200, body never accessed",
+        lambda: VaultClient._to_vault_response(ok, PREDECODED),
+        number,
+    )
+    bench("legacy VaultResponse.__init__", lambda: LegacyVaultResponse({}, 200), number)
+    bench("current VaultResponse.__init__", lambda: VaultResponse({}, 200), number)
+    bench("legacy ok", lambda: legacy_ok(legacy_response), number)
+    bench("current VaultResponse.ok", lambda: current_response.ok, number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Measure what a short-lived program pays to read one secret: the time to import
+snek, and the time from interpreter start-up to the first response with each
+transport::
+
+    python -m benchmarks.bench_startup --repeat 20
+
+Every measurement runs in a fresh interpreter so nothing is already imported.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+from .mock_vault import MockVaultServer
+
+IMPORTS = {
+    "python -c pass": "",
+    "import snek": "import snek",
+    "snek.VaultClient": "import snek; snek.VaultClient",
+    "snek.KVSecretV2API": "import snek; snek.KVSecretV2API",
+    "import requests": "import requests",
+}
+
+FIRST_REQUEST = """
+import time
+start = time.perf_counter()
+import snek
+from snek.transport import {transport}
+client = snek.VaultClient({url!r}, "token", transport={transport}())
+api = snek.KVSecretV2API(client)
+api.read("app")
+print(time.perf_counter() - start)
+"""
+
+
+def run(code: str) -> float:
+    """Run ``code`` in a new interpreter and return the wall time in seconds."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True)
+    return time.perf_counter() - start
+
+
+def measure(code: str) -> float:
+    """Run ``code`` in a new interpreter and return the number it prints."""
+    out = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    )
+    return float(out.stdout)
+
+
+def report(name: str, samples: list) -> None:
+    print(
+        f"{name:<30} min {min(samples) * 1000:8.2f} ms"
+        f"   median {statistics.median(samples) * 1000:8.2f} ms"
+    )
+
+
+def main(repeat: int) -> None:
+    print("interpreter start-up plus import")
+    for name, code in IMPORTS.items():
+        report(name, [run(code) for _ in range(repeat)])
+
+    print("\nimport, connect and read one secret (in-process time)")
+    with MockVaultServer() as server:
+        server.store.write("secret", "app", {"username": "app"})
+        for transport in ("RequestsTransport", "HTTPClientTransport"):
+            code = FIRST_REQUEST.format(transport=transport, url=server.url)
+            report(transport, [measure(code) for _ in range(repeat)])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args().repeat)
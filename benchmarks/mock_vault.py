@@ -0,0 +1,273 @@
+"""In-process stand-in for the parts of the Vault HTTP API snek talks to.
+
+Implements the KV2 ``data``, ``metadata`` and ``config`` endpoints, the
+transit ``encrypt``, ``decrypt``, ``rewrap`` and ``hmac`` endpoints, plus
+``sys/health`` on a threaded HTTP/1.1 server, with optional per-request latency
+and error injection. It is intended for benchmarks, not for correctness: auth is
+not enforced and only the fields snek reads are returned.
+
+Example::
+
+    with MockVaultServer(latency=0.001) as server:
+        client = VaultClient(server.url, "token")
+"""
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+
+_TRANSIT = {
+    "encrypt": lambda item: {
+        "ciphertext": f"vault:v1:{item['plaintext']}",
+        "key_version": 1,
+    },
+    "decrypt": lambda item: {"plaintext": item["ciphertext"][len("vault:v1:") :]},
+    "rewrap": lambda item: {"ciphertext": item["ciphertext"], "key_version": 1},
+    "hmac": lambda item: {
+        "hmac": "vault:v1:"
+        + hashlib.sha256(base64.b64decode(item["input"])).hexdigest()
+    },
+}
+
+
+def _transit_item(
+    transform: Callable[[Dict[str, str]], Dict[str, Any]], item: Dict[str, str]
+) -> Dict[str, Any]:
+    try:
+        if "ciphertext" in item and not item["ciphertext"].startswith("vault:v1:"):
+            raise ValueError("invalid ciphertext: no prefix")
+        return transform(item)
+    except (KeyError, ValueError) as err:
+        return {"error": str(err)}
+
+
+class KV2Store:
+    """Thread-safe versioned secret store backing the mock server."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._secrets: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+
+    def write(self, mount: str, path: str, data: Dict[str, Any], cas=None) -> int:
+        with self._lock:
+            versions = self._secrets.setdefault((mount, path), [])
+            if cas is not None and cas != len(versions):
+                raise ValueError("check-and-set parameter did not match")
+            versions.append(data)
+            return len(versions)
+
+    def read(
+        self, mount: str, path: str, version: Optional[int] = None
+    ) -> Optional[Tuple[Dict[str, Any], int]]:
+        with self._lock:
+            versions = self._secrets.get((mount, path))
+            if not versions:
+                return None
+            version = version or len(versions)
+            if version > len(versions):
+                return None
+            return versions[version - 1], version
+
+    def current_version(self, mount: str, path: str) -> int:
+        with self._lock:
+            return len(self._secrets.get((mount, path), []))
+
+    def list(self, mount: str, prefix: str) -> List[str]:
+        with self._lock:
+            keys = set()
+            for secret_mount, path in self._secrets:
+                if secret_mount == mount and path.startswith(prefix):
+                    rest = path[len(prefix) :]
+                    keys.add(rest.split("/", 1)[0] + "/" if "/" in rest else rest)
+            return sorted(keys)
+
+    def delete(self, mount: str, path: str) -> None:
+        with self._lock:
+            self._secrets.pop((mount, path), None)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Buffer each response into one write and disable Nagle, otherwise delayed
+    # ACKs add ~40ms to every keep-alive request.
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    server: "_Server"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send(self, status: int, body: Optional[Dict[str, Any]] = None) -> None:
+        payload = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _body(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def _route(self, method: str) -> None:
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        body = self._body() if method in ("POST", "PUT") else {}
+        mock = self.server.mock
+        mock.requests += 1
+        if mock.latency:
+            time.sleep(mock.latency)
+        if mock.error_rate and mock.random.random() < mock.error_rate:
+            return self._send(mock.error_status, {"errors": ["injected error"]})
+
+        parts = url.path.split("/", 4)
+        if url.path == "/v1/sys/health":
+            return self._send(200, {"initialized": True, "sealed": False})
+        if len(parts) < 4 or parts[1] != "v1":
+            return self._send(404, {"errors": []})
+        mount, endpoint = parts[2], parts[3]
+        path = parts[4] if len(parts) > 4 else ""
+        store = mock.store
+
+        if endpoint in _TRANSIT and method in ("POST", "PUT"):
+            # Not encryption: the "ciphertext" is the plaintext, base64 encoded.
+            transform = _TRANSIT[endpoint]
+            items = body.get("batch_input") or [body]
+            results = [_transit_item(transform, item) for item in items]
+            # Like Vault, a batch with a failed item is answered with 400 but
+            # still carries every item's result.
+            status = 400 if any("error" in r for r in results) else 200
+            if "batch_input" in body:
+                return self._send(status, {"data": {"batch_results": results}})
+            if status != 200:
+                return self._send(status, {"errors": [results[0]["error"]]})
+            return self._send(200, {"data": results[0]})
+        if endpoint == "config" and method == "POST":
+            return self._send(204)
+        if endpoint == "data" and method == "GET":
+            version = int(query["version"][0]) if "version" in query else None
+            found = store.read(mount, path, version)
+            if found is None:
+                return self._send(404, {"errors": []})
+            data, version = found
+            metadata = {"version": version, "deletion_time": "", "destroyed": False}
+            return self._send(200, {"data": {"data": data, "metadata": metadata}})
+        if endpoint == "data" and method in ("POST", "PUT"):
+            try:
+                version = store.write(
+                    mount, path, body["data"], body.get("options", {}).get("cas")
+                )
+            except ValueError as err:
+                return self._send(400, {"errors": [str(err)]})
+            return self._send(200, {"data": {"version": version}})
+        if endpoint == "metadata" and (
+            method == "LIST" or query.get("list") == ["true"]
+        ):
+            keys = store.list(mount, path)
+            if not keys:
+                return self._send(404, {"errors": []})
+            return self._send(200, {"data": {"keys": keys}})
+        if endpoint == "metadata" and method == "GET":
+            version = store.current_version(mount, path)
+            if not version:
+                return self._send(404, {"errors": []})
+            return self._send(
+                200,
+                {
+                    "data": {
+                        "current_version": version,
+                        "oldest_version": 1,
+                        "versions": {
+                            str(v): {"deletion_time": "", "destroyed": False}
+                            for v in range(1, version + 1)
+                        },
+                    }
+                },
+            )
+        if endpoint == "metadata" and method == "DELETE":
+            store.delete(mount, path)
+            return self._send(204)
+        return self._send(405, {"errors": []})
+
+    def do_GET(self) -> None:
+        self._route("GET")
+
+    def do_POST(self) -> None:
+        self._route("POST")
+
+    def do_PUT(self) -> None:
+        self._route("PUT")
+
+    def do_LIST(self) -> None:
+        self._route("LIST")
+
+    def do_DELETE(self) -> None:
+        self._route("DELETE")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    mock: "MockVaultServer"
+
+
+class MockVaultServer:
+    """Run a Vault-API-compatible stub server on a background thread.
+
+    Args:
+        latency: seconds slept before answering each request
+        error_rate: fraction of requests answered with ``error_status``
+        error_status: status code used for injected errors
+        seed: seed for the error injection random number generator
+        host: interface to bind
+        port: port to bind, ``0`` picks a free one
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        seed: Optional[int] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.store = KV2Store()
+        self.requests = 0
+        self._server = _Server((host, port), _Handler)
+        self._server.mock = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> "MockVaultServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="mock-vault", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "MockVaultServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
@@ -0,0 +1,270 @@
+"""Client-side throughput and latency benchmarks against :mod:`mock_vault`.
+
+Run every scenario and write JSON results::
+
+    python -m benchmarks.run --ops 2000 --output results.json
+
+Compare against an earlier run, e.g. from the previous release::
+
+    python -m benchmarks.run --compare baseline.json
+
+Each scenario reports ``ops_per_sec`` plus latency percentiles in
+milliseconds: ``op_latency_ms`` for individually timed calls and
+``request_latency_ms`` for the HTTP requests the client made, collected with
+:class:`snek.instrumentation.HistogramCollector`.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from snek.cache import SecretCache
+from snek.client import VaultClient
+from snek.exceptions import SnekException
+from snek.instrumentation import HistogramCollector, LatencyHistogram
+from snek.secrets import KVSecretV2API
+from snek.transit import TransitAPI
+from snek.transport import (
+    HTTP2Transport,
+    HTTPClientTransport,
+    RequestsTransport,
+    Transport,
+)
+from snek.version import __version__
+
+from .mock_vault import MockVaultServer
+
+
+def _percentiles(histogram: LatencyHistogram) -> Optional[Dict[str, float]]:
+    if not histogram.count:
+        return None
+    return {
+        "p50": histogram.percentile(0.5) * 1000,
+        "p90": histogram.percentile(0.9) * 1000,
+        "p99": histogram.percentile(0.99) * 1000,
+        "max": histogram.max * 1000,
+    }
+
+
+#: Transports selectable with ``--transport``. The mock server only speaks
+#: HTTP/1.1, so ``http2`` measures httpx's overhead rather than multiplexing.
+TRANSPORTS: Dict[str, Callable[[argparse.Namespace], Transport]] = {
+    "requests": lambda args: RequestsTransport(pool_maxsize=args.concurrency),
+    "http": lambda args: HTTPClientTransport(),
+    "http2": lambda args: HTTP2Transport(max_connections=args.concurrency),
+}
+
+
+class Context:
+    """State shared by one scenario run: server, client, API and timers."""
+
+    def __init__(self, server: MockVaultServer, args: argparse.Namespace):
+        self.server = server
+        self.args = args
+        self.collector = HistogramCollector()
+        self.client = VaultClient(
+            server.url,
+            "token",
+            observers=[self.collector],
+            transport=TRANSPORTS[args.transport](args),
+        )
+        self.api = KVSecretV2API(self.client)
+        self.transit = TransitAPI(self.client, max_concurrency=args.concurrency)
+        self.op_latency = LatencyHistogram()
+        self.errors = 0
+
+    def timed(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Call and time one operation, counting rather than raising errors."""
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        except SnekException:
+            self.errors += 1
+            return None
+        finally:
+            self.op_latency.record(time.perf_counter() - start)
+
+    def request_latency(self) -> LatencyHistogram:
+        merged = LatencyHistogram()
+        for histogram in self.collector.histograms.values():
+            for index, count in histogram.buckets.items():
+                merged.buckets[index] = merged.buckets.get(index, 0) + count
+            merged.count += histogram.count
+            merged.total += histogram.total
+            merged.max = max(merged.max, histogram.max)
+        return merged
+
+
+def _seed(ctx: Context, count: int, prefix: str = "bench") -> List[str]:
+    paths = [f"{prefix}/{i % 16}/{i}" for i in range(count)]
+    for path in paths:
+        ctx.server.store.write("secret", path, {"value": "x" * ctx.args.size})
+    return paths
+
+
+def serial_reads(ctx: Context) -> int:
+    paths = _seed(ctx, min(ctx.args.ops, 256))
+    for i in range(ctx.args.ops):
+        ctx.timed(ctx.api.read, paths[i % len(paths)])
+    return ctx.args.ops
+
+
+def concurrent_reads(ctx: Context) -> int:
+    paths = _seed(ctx, min(ctx.args.ops, 256))
+    targets = [paths[i % len(paths)] for i in range(ctx.args.ops)]
+    results = ctx.api.read_many(targets, max_concurrency=ctx.args.concurrency)
+    ctx.errors += sum(1 for result in results if isinstance(result, SnekException))
+    return len(targets)
+
+
+def cached_reads(ctx: Context) -> int:
+    paths = _seed(ctx, 64)
+    ctx.api.cache = SecretCache(max_size=len(paths), ttl=60)
+    for i in range(ctx.args.ops):
+        ctx.timed(ctx.api.read, paths[i % len(paths)])
+    return ctx.args.ops
+
+
+def bulk_writes(ctx: Context) -> int:
+    payload = {"value": "x" * ctx.args.size}
+    with ThreadPoolExecutor(max_workers=ctx.args.concurrency) as executor:
+        list(
+            executor.map(
+                lambda i: ctx.timed(ctx.api.create_or_update, f"write/{i}", payload),
+                range(ctx.args.ops),
+            )
+        )
+    return ctx.args.ops
+
+
+def write_many(ctx: Context) -> int:
+    items = (
+        (f"write/{i}", {"value": "x" * ctx.args.size}, None)
+        for i in range(ctx.args.ops)
+    )
+    for result in ctx.api.write_many(items, max_concurrency=ctx.args.concurrency):
+        if not result.ok:
+            ctx.errors += 1
+    return ctx.args.ops
+
+
+def tree_walk(ctx: Context) -> int:
+    _seed(ctx, ctx.args.ops, prefix="tree")
+    walked = 0
+    try:
+        for _ in ctx.api.walk("tree", max_concurrency=ctx.args.concurrency):
+            walked += 1
+    except SnekException:
+        ctx.errors += 1
+    return walked
+
+
+def transit_encrypt(ctx: Context) -> int:
+    plaintext = b"x" * ctx.args.size
+    for _ in range(ctx.args.ops):
+        ctx.timed(ctx.transit.encrypt, "bench", plaintext)
+    return ctx.args.ops
+
+
+def transit_encrypt_many(ctx: Context) -> int:
+    plaintexts = (b"x" * ctx.args.size for _ in range(ctx.args.ops))
+    for result in ctx.transit.encrypt_many("bench", plaintexts):
+        if not result.ok:
+            ctx.errors += 1
+    return ctx.args.ops
+
+
+SCENARIOS: Dict[str, Callable[[Context], int]] = {
+    "serial_reads": serial_reads,
+    "concurrent_reads": concurrent_reads,
+    "cached_reads": cached_reads,
+    "bulk_writes": bulk_writes,
+    "write_many": write_many,
+    "tree_walk": tree_walk,
+    "transit_encrypt": transit_encrypt,
+    "transit_encrypt_many": transit_encrypt_many,
+}
+
+
+def run_scenario(name: str, args: argparse.Namespace) -> Dict[str, Any]:
+    with MockVaultServer(
+        latency=args.latency_ms / 1000, error_rate=args.error_rate, seed=0
+    ) as server:
+        ctx = Context(server, args)
+        start = time.perf_counter()
+        ops = SCENARIOS[name](ctx)
+        seconds = time.perf_counter() - start
+        ctx.client.close()
+    return {
+        "ops": ops,
+        "seconds": seconds,
+        "ops_per_sec": ops / seconds if seconds else 0.0,
+        "requests": server.requests,
+        "errors": ctx.errors,
+        "op_latency_ms": _percentiles(ctx.op_latency),
+        "request_latency_ms": _percentiles(ctx.request_latency()),
+    }
+
+
+def compare(baseline: Dict[str, Any], results: Dict[str, Any]) -> None:
+    """Print the throughput change of each scenario against a baseline run."""
+    print(f"{'scenario':<20} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, result in results["scenarios"].items():
+        old = baseline["scenarios"].get(name)
+        if old is None:
+            continue
+        change = result["ops_per_sec"] / old["ops_per_sec"] - 1
+        print(
+            f"{name:<20} {old['ops_per_sec']:>12.1f} "
+            f"{result['ops_per_sec']:>12.1f} {change:>+8.1%}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--size", type=int, default=256, help="secret value bytes")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--transport", choices=sorted(TRANSPORTS), default="requests")
+    parser.add_argument(
+        "--scenario", action="append", choices=sorted(SCENARIOS), dest="scenarios"
+    )
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--compare", help="baseline JSON results to compare with")
+    args = parser.parse_args(argv)
+
+    results = {
+        "snek_version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "ops": args.ops,
+            "concurrency": args.concurrency,
+            "size": args.size,
+            "latency_ms": args.latency_ms,
+            "error_rate": args.error_rate,
+            "transport": args.transport,
+        },
+        "scenarios": {
+            name: run_scenario(name, args) for name in args.scenarios or SCENARIOS
+        },
+    }
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(results, fp, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        with open(args.compare) as fp:
+            compare(json.load(fp), results)
+    return results
+
+
+if __name__ == "__main__":
+    main()
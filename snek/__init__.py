@@ -1 +1,30 @@
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
 from .version import __version_info__, __version__
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .client import VaultClient
+    from .secrets import KVSecretV2API
+
+# Public names and the submodules defining them. They are imported on first
+# access, so ``import snek`` stays cheap for programs that need little of it.
+_LAZY_ATTRIBUTES = {
+    "VaultClient": "client",
+    "KVSecretV2API": "secrets",
+}
+
+__all__ = ["KVSecretV2API", "VaultClient", "__version__", "__version_info__"]
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted({*globals(), *_LAZY_ATTRIBUTES})
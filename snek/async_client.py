@@ -0,0 +1,265 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import urljoin
+
+try:
+    import httpx
+except ImportError as err:  # pragma: no cover
+    raise ImportError(
+        "AsyncVaultClient requires httpx. Install it with `pip install snek[async]`."
+    ) from err
+
+from .client import VaultClient
+from .codec import JSONCodec, get_codec
+from .constants import HttpMethod
+from .exceptions import VaultClientException
+from .instrumentation import RequestEvent, RequestObserver, normalize_path, notify
+from .models import VaultResponse
+from .retry import RetryPolicy
+from .singleflight import AsyncSingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncVaultClient:
+    """Asyncio client for low-level HTTP communications with Vault API.
+
+    Mirrors :class:`snek.client.VaultClient`, but requests are made over a pooled
+    :class:`httpx.AsyncClient` so many calls can be in flight on one event loop.
+    Pass ``http2=True`` to multiplex them over a few HTTP/2 connections instead
+    of one connection each, which needs the ``h2`` package
+    (``pip install snek[http2]``) and an ``https`` Vault address.
+    """
+
+    def __init__(
+        self,
+        vault_addr: str,
+        token: str,
+        namespace: Optional[str] = None,
+        extra_headers: Optional[Dict[str, str]] = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        connect_timeout: Optional[float] = 10.0,
+        read_timeout: Optional[float] = 30.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        retry: Optional[RetryPolicy] = None,
+        observers: Optional[Iterable[RequestObserver]] = None,
+        coalesce_reads: bool = False,
+        codec: Optional[JSONCodec] = None,
+        http2: bool = False,
+    ):
+        # Copied so clients built from the same dict keep their own token.
+        extra_headers = dict(extra_headers or {})
+        extra_headers["X-Vault-Token"] = token
+        extra_headers["Content-Type"] = "application/json"
+        if namespace:
+            extra_headers["X-Vault-Namespace"] = namespace
+
+        self.vault_addr = vault_addr
+        self.retry = retry
+        self.observers = list(observers or [])
+        self.singleflight = AsyncSingleFlight() if coalesce_reads else None
+        self.codec = codec or get_codec()
+        self.session = httpx.AsyncClient(
+            headers=extra_headers,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+            timeout=httpx.Timeout(
+                connect=connect_timeout, read=read_timeout, write=None, pool=None
+            ),
+            transport=transport,
+            http2=http2,
+        )
+
+    async def __aenter__(self) -> "AsyncVaultClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the pooled connections held by the client."""
+        await self.session.aclose()
+
+    async def make_request(self, method: str, uri: str, **kwargs) -> VaultResponse:
+        """Internal method to make requests. Returns a :class:`VaultResponse` object.
+
+        Args:
+            method: HTTP method to invoke
+            uri: URI to call
+            **kwargs: dictionary of other arguments to pass to request.
+
+        Raises:
+            VaultClientException: Raised for connection errors or bad error codes.
+        """
+        params = kwargs.get("params")
+        if params is not None:
+            # requests silently drops ``None`` values, httpx sends them as empty
+            # strings, so strip them to keep both clients on the wire identical.
+            kwargs["params"] = {k: v for k, v in params.items() if v is not None}
+        if kwargs.get("json") is not None:
+            kwargs["content"] = self.codec.dumps(kwargs.pop("json"))
+
+        if self.retry is None:
+            return await self._send(method, uri, **kwargs)
+
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return await self._send(method, uri, **kwargs)
+            except VaultClientException as err:
+                delay = self.retry.next_delay(
+                    method, attempt, err.status_code, time.monotonic() - start
+                )
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+
+    async def _send(self, method: str, uri: str, **kwargs) -> VaultResponse:
+        """Make a single request attempt."""
+        start = time.perf_counter()
+        try:
+            res = await self.session.request(method, uri, **kwargs)
+        except (httpx.TransportError, IOError) as err:
+            if self.observers:
+                self._notify(method, uri, start, None, error=str(err))
+            raise VaultClientException(str(err))
+
+        if not self.observers:
+            return VaultClient._to_vault_response(res, self.codec, uri)
+
+        received = time.perf_counter()
+        error = None
+        try:
+            vault_response = VaultClient._to_vault_response(res, self.codec, uri)
+            vault_response.response
+            return vault_response
+        except VaultClientException as err:
+            error = err.message
+            raise
+        finally:
+            self._notify(method, uri, start, res, received, error)
+
+    def _notify(
+        self,
+        method: str,
+        uri: str,
+        start: float,
+        res: Optional[httpx.Response],
+        received: Optional[float] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        done = time.perf_counter()
+        notify(
+            self.observers,
+            RequestEvent(
+                method=method,
+                uri=uri,
+                path=normalize_path(uri),
+                status_code=res.status_code if res is not None else None,
+                elapsed=done - start,
+                # httpx reads the body before returning, so headers and transfer
+                # can't be told apart.
+                time_to_headers=None,
+                transfer_time=None,
+                response_bytes=len(res.content) if res is not None else 0,
+                decode_time=done - received if received is not None else 0.0,
+                error=error,
+            ),
+        )
+
+    async def get(
+        self, api_path: str, params: Optional[Dict[str, Optional[str]]] = None
+    ) -> VaultResponse:
+        """Make a GET request to the appropriate API path.
+
+        Args:
+            api_path: the relative API path
+            params: a dictionary of querystring parameters
+
+        Raises:
+            VaultClientException: Raised for connection or status code errors
+        """
+        uri = urljoin(self.vault_addr, api_path)
+        if self.singleflight is None:
+            return await self.make_request(HttpMethod.GET.value, uri, params=params)
+        headers = self.session.headers
+        key = (
+            uri,
+            tuple(sorted((params or {}).items())),
+            headers.get("X-Vault-Token"),
+            headers.get("X-Vault-Namespace"),
+        )
+        return await self.singleflight.do(
+            key, lambda: self.make_request(HttpMethod.GET.value, uri, params=params)
+        )
+
+    async def put(
+        self, api_path: str, data: Optional[Dict[str, Any]] = None
+    ) -> VaultResponse:
+        """Make a PUT request to the given API path.
+
+        Args:
+            api_path: the relative API path
+            data: request data as a dictionary
+
+        Raises:
+            VaultClientException: Raised for connection errors or bad error
+        """
+        return await self.make_request(
+            HttpMethod.PUT.value, urljoin(self.vault_addr, api_path), json=data
+        )
+
+    async def post(
+        self, api_path: str, data: Optional[Dict[str, Any]] = None
+    ) -> VaultResponse:
+        """Make a POST request to the given API path.
+
+        Args:
+            api_path: the relative API path
+            data: request data as a dictionary
+
+        Raises:
+            VaultClientException: Raised for connection or status code errors
+        """
+        return await self.make_request(
+            HttpMethod.POST.value, urljoin(self.vault_addr, api_path), json=data
+        )
+
+    async def list(
+        self, api_path: str, params: Optional[Dict[str, str]] = None
+    ) -> VaultResponse:
+        """Make a LIST request to the given API path.
+
+        Args:
+            api_path: the relative API path
+            params: querystring parameters
+
+        Raises:
+            VaultClientException: Raised for connection or status code errors
+        """
+        return await self.make_request(
+            HttpMethod.LIST.value, urljoin(self.vault_addr, api_path), params=params
+        )
+
+    async def delete(
+        self, api_path: str, params: Optional[Dict[str, str]] = None
+    ) -> VaultResponse:
+        """Make a DELETE request to the given API path.
+
+        Args:
+            api_path: the relative API path
+            params: querystring parameters
+
+        Raises:
+            VaultClientException: Raised for connection or status code errors
+        """
+        return await self.make_request(
+            HttpMethod.DELETE.value, urljoin(self.vault_addr, api_path), params=params
+        )
@@ -0,0 +1,101 @@
+from typing import Any, Dict, Optional
+
+from .async_client import AsyncVaultClient
+from .cache import SecretCache
+from .exceptions import (
+    KV2SecretException,
+    SecretCreateUpdateException,
+    SecretReadException,
+    VaultClientException,
+)
+from .models import VaultResponse
+from .secrets import KVSecretV2
+
+
+class AsyncKVSecretV2API:
+    """Asyncio counterpart of :class:`snek.secrets.KVSecretV2API`."""
+
+    def __init__(
+        self,
+        client: AsyncVaultClient,
+        mount_path: str = "secret",
+        cache: Optional[SecretCache] = None,
+        lazy: bool = False,
+    ):
+
+        self.client = client
+        self.cache = cache
+        self.lazy = lazy
+        self.mount_path = f"/v1/{mount_path}"
+        self.base_path = f"{self.mount_path}/data"
+        self.base_metadata_path = f"{self.mount_path}/metadata"
+
+    async def configure(
+        self,
+        max_versions: int = 0,
+        cas_required: bool = False,
+        delete_version_after: str = "0s",
+    ) -> VaultResponse:
+        configuration = {
+            "max_versions": max_versions,
+            "cas_required": cas_required,
+            "delete_version_after": delete_version_after,
+        }
+        try:
+            return await self.client.post(
+                f"{self.mount_path}/config", data=configuration
+            )
+        except VaultClientException:
+            raise KV2SecretException("Failed to configure KV-V2 engine.")
+
+    async def read(self, path: str, version: Optional[int] = None) -> KVSecretV2:
+        """Get a secret at a given path.
+
+        Raises:
+            SecretReadException: Raised if secret not found at path.
+        """
+        if self.cache is not None:
+            cached = self.cache.get((self.mount_path, path, version))
+            if cached is not None:
+                return cached
+        try:
+            res = await self.client.get(
+                f"{self.base_path}/{path}",
+                params={"version": str(version) if version is not None else version},
+            )
+            secret = KVSecretV2(vault_response=res, path=path, lazy=self.lazy)
+        except VaultClientException as err:
+            raise SecretReadException(
+                f"Failed to read secrets at {self.base_path}/{path}",
+                status_code=err.status_code,
+            )
+        if self.cache is not None:
+            self.cache.set((self.mount_path, path, version), secret)
+        return secret
+
+    async def create_or_update(
+        self,
+        path: str,
+        data: Dict[str, Any],
+        cas: Optional[int] = None,
+    ) -> KVSecretV2:
+        """Create or update a secret at a path.
+
+        Raises:
+            SecretCreateUpdateException: Raised when secret cannot be created at path.
+        """
+        payload = {"data": data, "options": {}}
+        if cas is not None:
+            payload["options"] = {"cas": cas}
+        try:
+            res = await self.client.post(f"{self.base_path}/{path}", data=payload)
+            return KVSecretV2(path=path, vault_response=res)
+        except VaultClientException as err:
+            raise SecretCreateUpdateException(
+                f"Failed to create or update secret at {self.base_path}/{path}: "
+                f"{err.message}",
+                status_code=err.status_code,
+            )
+        finally:
+            if self.cache is not None:
+                self.cache.invalidate(self.mount_path, path)
@@ -0,0 +1,257 @@
+import abc
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from .client import VaultClient
+from .constants import HttpMethod
+from .exceptions import AuthException, VaultClientException
+
+logger = logging.getLogger(__name__)
+
+
+class TokenInfo(NamedTuple):
+    """State of the token a :class:`TokenManager` is maintaining."""
+
+    #: the Vault token
+    token: str
+    #: seconds the token was valid for when last looked up, ``0`` if it never expires
+    ttl: int
+    #: whether the token can be renewed
+    renewable: bool
+    #: monotonic clock time the token was looked up, renewed or issued
+    issued_at: float
+
+    @property
+    def expires_at(self) -> Optional[float]:
+        """Monotonic clock time the token expires, ``None`` if it never does."""
+        return self.issued_at + self.ttl if self.ttl else None
+
+
+class LoginMethod(abc.ABC):
+    """Base class for auth methods that can obtain a fresh token."""
+
+    @abc.abstractmethod
+    def login(self, client: VaultClient) -> Dict[str, Any]:
+        """Log in and return the ``auth`` block of Vault's response."""
+
+
+class AppRoleLogin(LoginMethod):
+    """Log in with the AppRole auth method.
+
+    Args:
+        role_id: AppRole role ID
+        secret_id: AppRole secret ID, if the role requires one
+        mount_path: mount point of the AppRole auth method
+    """
+
+    def __init__(
+        self, role_id: str, secret_id: Optional[str] = None, mount_path: str = "approle"
+    ):
+        self.role_id = role_id
+        self.secret_id = secret_id
+        self.mount_path = mount_path
+
+    def login(self, client: VaultClient) -> Dict[str, Any]:
+        payload = {"role_id": self.role_id}
+        if self.secret_id is not None:
+            payload["secret_id"] = self.secret_id
+        res = client.make_request(
+            HttpMethod.POST.value,
+            f"{client.vault_addr.rstrip('/')}/v1/auth/{self.mount_path}/login",
+            json=payload,
+            # Login endpoints are unauthenticated, don't send a stale token.
+            headers={"X-Vault-Token": None},
+        )
+        return res.response["auth"]
+
+
+class TokenManager:
+    """Keep a client's token valid by renewing it in the background.
+
+    The token's TTL is looked up with ``auth/token/lookup-self`` and the token
+    is renewed with ``auth/token/renew-self`` once ``renew_fraction`` of its TTL
+    has passed. If the token isn't renewable, renewal fails, or the renewed TTL
+    falls below ``min_ttl`` because the token is near its max TTL, a fresh token
+    is obtained from ``login`` when one is given. New tokens are swapped into
+    the client's headers atomically, so requests never wait on renewal.
+
+    Args:
+        client: client whose token is managed
+        login: optional auth method used to obtain new tokens
+        renew_fraction: fraction of the TTL after which to renew
+        min_ttl: log in again rather than renew once the TTL drops below this
+        retry_interval: seconds to wait after a failed renewal or login
+        on_token: optional callback receiving the new :class:`TokenInfo`
+            whenever the token is renewed or replaced
+    """
+
+    def __init__(
+        self,
+        client: VaultClient,
+        login: Optional[LoginMethod] = None,
+        renew_fraction: float = 2 / 3,
+        min_ttl: float = 10.0,
+        retry_interval: float = 5.0,
+        on_token: Optional[Callable[[TokenInfo], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not 0 < renew_fraction < 1:
+            raise ValueError("renew_fraction must be between 0 and 1")
+        self.client = client
+        self.login_method = login
+        self.renew_fraction = renew_fraction
+        self.min_ttl = min_ttl
+        self.retry_interval = retry_interval
+        self.on_token = on_token
+        self._clock = clock
+        self._info: Optional[TokenInfo] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "TokenManager":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    @property
+    def token_info(self) -> Optional[TokenInfo]:
+        """The current token state, ``None`` before :meth:`start`."""
+        return self._info
+
+    def _url(self, path: str) -> str:
+        return f"{self.client.vault_addr.rstrip('/')}/v1/{path}"
+
+    def _set(self, info: TokenInfo) -> TokenInfo:
+        self.client.token = info.token
+        self._info = info
+        if self.on_token is not None:
+            try:
+                self.on_token(info)
+            except Exception:
+                logger.exception("Token callback failed")
+        return info
+
+    def lookup(self) -> TokenInfo:
+        """Look up the client's current token and start tracking it.
+
+        Raises:
+            AuthException: Raised if the token cannot be looked up.
+        """
+        try:
+            data = self.client.get("/v1/auth/token/lookup-self").response["data"]
+        except VaultClientException as err:
+            raise AuthException(f"Failed to look up token: {err.message}")
+        return self._set(
+            TokenInfo(
+                token=self.client.token,
+                ttl=int(data.get("ttl") or 0),
+                renewable=bool(data.get("renewable")),
+                issued_at=self._clock(),
+            )
+        )
+
+    def _from_auth(self, auth: Dict[str, Any]) -> TokenInfo:
+        return self._set(
+            TokenInfo(
+                token=auth["client_token"],
+                ttl=int(auth.get("lease_duration") or 0),
+                renewable=bool(auth.get("renewable")),
+                issued_at=self._clock(),
+            )
+        )
+
+    def login(self) -> TokenInfo:
+        """Obtain a new token from the login method.
+
+        Raises:
+            AuthException: Raised if there is no login method or login fails.
+        """
+        if self.login_method is None:
+            raise AuthException("No login method configured")
+        try:
+            return self._from_auth(self.login_method.login(self.client))
+        except VaultClientException as err:
+            raise AuthException(f"Failed to log in: {err.message}")
+
+    def renew(self) -> TokenInfo:
+        """Renew the current token.
+
+        Raises:
+            AuthException: Raised if the token cannot be renewed.
+        """
+        try:
+            res = self.client.post("/v1/auth/token/renew-self", data={})
+        except VaultClientException as err:
+            raise AuthException(f"Failed to renew token: {err.message}")
+        return self._from_auth(res.response["auth"])
+
+    def refresh(self) -> Optional[float]:
+        """Renew or replace the token as needed.
+
+        Returns:
+            Seconds until the next refresh is due, or ``None`` if the token
+            never expires and there is nothing left to do.
+        """
+        info = self._info
+        try:
+            if info is None:
+                info = self.login() if self.login_method else self.lookup()
+            elif info.renewable:
+                try:
+                    info = self.renew()
+                except AuthException:
+                    if self.login_method is None:
+                        raise
+                    logger.warning("Token renewal failed, logging in again")
+                    info = self.login()
+                if info.ttl and info.ttl < self.min_ttl and self.login_method:
+                    info = self.login()
+            elif self.login_method is not None:
+                info = self.login()
+        except AuthException:
+            logger.exception("Token refresh failed")
+            return self.retry_interval
+
+        if not info.ttl:
+            return None
+        if not info.renewable and self.login_method is None:
+            logger.warning("Token is not renewable and expires in %ss", info.ttl)
+            return None
+        return max(info.ttl * self.renew_fraction, 0.0)
+
+    def start(self) -> None:
+        """Look up or log in for a token, then keep it fresh in a thread.
+
+        Raises:
+            AuthException: Raised if no valid token can be obtained up front.
+        """
+        if self._thread is not None:
+            return
+        if self.login_method is not None:
+            self.login()
+        else:
+            self.lookup()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="snek-token-manager", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        info = self._info
+        if info is None or not info.ttl:
+            return
+        delay: Optional[float] = info.ttl * self.renew_fraction
+        while delay is not None and not self._stop.wait(delay):
+            delay = self.refresh()
+
+    def stop(self) -> None:
+        """Stop background renewal."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, NamedTuple, Optional, Tuple, cast
+
+#: Cache key for a KV2 read: ``(mount_path, path, version)``
+CacheKey = Tuple[str, str, Optional[int]]
+
+
+class CacheStats(NamedTuple):
+    """Point-in-time counters for a :class:`SecretCache`."""
+
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    size: int
+
+
+class SecretCache:
+    """Thread-safe, size-bounded LRU cache with per-entry TTLs.
+
+    Entries keyed on an unpinned version (``None``) expire after ``ttl`` seconds.
+    Pinned-version reads are immutable in Vault, so they only leave the cache
+    through LRU eviction.
+
+    Args:
+        max_size: maximum number of entries held before the least recently used
+            entry is evicted
+        ttl: default time to live in seconds for unpinned reads
+        clock: monotonic time source, overridable for tests
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Optional[float]]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: CacheKey) -> Optional[Any]:
+        """Return the cached value for a key, or ``None`` on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= self._clock():
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def set(self, key: CacheKey, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value.
+
+        Args:
+            key: ``(mount_path, path, version)`` tuple
+            value: value to cache
+            ttl: override the default TTL for this entry. Ignored for pinned
+                versions, which never expire.
+        """
+        if key[2] is not None:
+            expires_at = None
+        else:
+            expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, mount_path: str, path: str) -> None:
+        """Drop the latest-version entry for a path after it has been written."""
+        with self._lock:
+            self._entries.pop((mount_path, path, None), None)
+
+    def items(self) -> List[Tuple[CacheKey, Any]]:
+        """Unexpired entries, least recently used first.
+
+        Unlike :meth:`get` this does not count hits or change recency.
+        """
+        now = self._clock()
+        with self._lock:
+            return [
+                (cast(CacheKey, key), value)
+                for key, (value, expires_at) in self._entries.items()
+                if expires_at is None or expires_at > now
+            ]
+
+    def clear(self) -> None:
+        """Remove every entry. Counters are left untouched."""
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self) -> CacheStats:
+        """Hit, miss, eviction and expiration counters."""
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                expirations=self._expirations,
+                size=len(self._entries),
+            )
@@ -1,19 +1,70 @@
 import json
 import logging
-from typing import Any, Dict, Optional
-from urllib.parse import urljoin
+import time
+from functools import partial
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import urljoin, urlsplit
 
-import requests
-
-from .constants import HttpMethod, HttpStatusCode
+from .codec import JSONCodec, get_codec
+from .constants import (
+    HEALTH_ONLY_STATUS_CODES,
+    SUCCESS_STATUS_CODES,
+    HttpMethod,
+    HttpStatusCode,
+    lookup_status_code,
+)
 from .exceptions import VaultClientException
+from .governor import Governor
+from .instrumentation import RequestEvent, RequestObserver, normalize_path, notify
 from .models import VaultResponse
+from .retry import RetryPolicy
+from .singleflight import SingleFlight
+from .transport import RequestsTransport, Transport
 
 logger = logging.getLogger(__name__)
 
+NO_DATA_STATUS_CODE = HttpStatusCode.SUCCESS_NO_DATA.value
+
+
+def _is_health_check(uri: str) -> bool:
+    return urlsplit(uri).path.rstrip("/").endswith("/sys/health")
+
 
 class VaultClient:
-    """Client for low-level HTTP communications with Vault API."""
+    """Client for low-level HTTP communications with Vault API.
+
+    Args:
+        vault_addr: base address of the Vault server
+        token: Vault token sent as ``X-Vault-Token``
+        namespace: optional Vault Enterprise namespace
+        extra_headers: additional headers sent with every request
+        pool_connections: number of per-host connection pools to cache
+        pool_maxsize: maximum number of connections kept alive per host
+        pool_block: block when the pool is exhausted instead of opening
+            throwaway connections
+        connect_timeout: seconds to wait for a connection, ``None`` to wait forever
+        read_timeout: seconds to wait for a response, ``None`` to wait forever
+        adapter: an existing :class:`requests.adapters.HTTPAdapter` to use, so
+            several clients with different tokens or namespaces can share one
+            connection pool. The pool options are ignored when it is given.
+        transport: :class:`snek.transport.Transport` that sends the requests,
+            defaults to a :class:`snek.transport.RequestsTransport` built from
+            the pool options. A transport holds no per-client state, so clients
+            with different tokens and namespaces can share one and its
+            connections. Use :class:`snek.transport.HTTPClientTransport`
+            to avoid importing requests at all, or
+            :class:`snek.transport.HTTP2Transport` to multiplex concurrent
+            requests over a few HTTP/2 connections.
+        retry: optional :class:`snek.retry.RetryPolicy` for transient errors
+        observers: :class:`snek.instrumentation.RequestObserver` instances
+            notified after every request attempt
+        coalesce_reads: share one in-flight request between concurrent
+            identical GETs (same URL, params, token and namespace)
+        governor: optional :class:`snek.governor.Governor` every request
+            attempt must pass, to stay under Vault's rate limit quotas
+        codec: :class:`snek.codec.JSONCodec` used to encode request bodies and
+            decode responses, defaults to the fastest installed JSON library
+    """
 
     def __init__(
         self,
@@ -21,28 +72,96 @@ class VaultClient:
         token: str,
         namespace: Optional[str] = None,
         extra_headers: Optional[Dict[str, str]] = None,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        connect_timeout: Optional[float] = 10.0,
+        read_timeout: Optional[float] = 30.0,
+        adapter: Any = None,
+        retry: Optional[RetryPolicy] = None,
+        observers: Optional[Iterable[RequestObserver]] = None,
+        coalesce_reads: bool = False,
+        governor: Optional[Governor] = None,
+        codec: Optional[JSONCodec] = None,
+        transport: Optional[Transport] = None,
     ):
-        if extra_headers is None:
-            extra_headers = {}
-
+        # Copied so clients built from the same dict keep their own token.
+        extra_headers = dict(extra_headers or {})
         extra_headers["X-Vault-Token"] = token
         extra_headers["Content-Type"] = "application/json"
         if namespace:
             extra_headers["X-Vault-Namespace"] = namespace
 
-        self.session = requests.Session()
+        if transport is None:
+            transport = RequestsTransport(
+                adapter=adapter,
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block,
+            )
+        self.transport = transport
+        self.timeout = (connect_timeout, read_timeout)
+        self.retry = retry
+        self.observers = list(observers or [])
+        self.singleflight = SingleFlight() if coalesce_reads else None
+        self.governor = governor
+        self.codec = codec or get_codec()
+
         self.vault_addr = vault_addr
-        self.session.headers.update(extra_headers)
+        #: headers sent with every request of this client. They are passed to the
+        #: transport per request, so clients sharing one keep their own token.
+        self.headers = extra_headers
+
+    def __enter__(self) -> "VaultClient":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the connections held by the transport."""
+        self.transport.close()
+
+    @property
+    def session(self) -> Any:
+        """The :class:`requests.Session` of the default transport."""
+        return self._requests_transport().session
+
+    @property
+    def adapter(self) -> Any:
+        """The :class:`requests.adapters.HTTPAdapter` of the default transport."""
+        return self._requests_transport().adapter
+
+    def _requests_transport(self) -> RequestsTransport:
+        if not isinstance(self.transport, RequestsTransport):
+            raise AttributeError(
+                f"{type(self.transport).__name__} has no requests session or adapter"
+            )
+        return self.transport
+
+    @property
+    def token(self) -> str:
+        """Vault token sent as ``X-Vault-Token``."""
+        return self.headers["X-Vault-Token"]
+
+    @token.setter
+    def token(self, token: str) -> None:
+        # A single dict assignment: the headers are copied when each request is
+        # made, so every request sees either the old or new token.
+        self.headers["X-Vault-Token"] = token
 
     @staticmethod
-    def _get_text(res: requests.Response) -> str:
+    def _get_text(res: Any, codec: Optional[JSONCodec] = None) -> str:
+        codec = codec or get_codec()
         try:
-            return json.dumps(res.json())
-        except json.JSONDecodeError:
+            # Decoded with the codec but re-encoded with the standard library, so
+            # error messages read the same whichever codec is installed.
+            return json.dumps(codec.loads(res.content))
+        except ValueError:
             return res.text
 
     def make_request(self, method: str, uri: str, **kwargs) -> VaultResponse:
-        """Internal method to make requests. Returns a :class:`requests.Response` object.
+        """Internal method to make requests. Returns a :class:`VaultResponse` object.
 
         Args:
             method: HTTP method to invoke
@@ -52,25 +171,151 @@ class VaultClient:
         Raises:
             VaultClientException: Raised for connection errors or bad error codes.
         """
+        kwargs.setdefault("timeout", self.timeout)
+        # ``None`` values are kept so the transport removes those headers.
+        kwargs["headers"] = {**self.headers, **(kwargs.get("headers") or {})}
+        if kwargs.get("json") is not None:
+            kwargs["data"] = self.codec.dumps(kwargs.pop("json"))
+        if self.retry is None:
+            return self._attempt(method, uri, **kwargs)
+
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return self._attempt(method, uri, **kwargs)
+            except VaultClientException as err:
+                delay = self.retry.next_delay(
+                    method, attempt, err.status_code, time.monotonic() - start
+                )
+                if delay is None:
+                    raise
+                logger.debug(
+                    "Retrying %s %s in %.3fs after attempt %d failed",
+                    method,
+                    uri,
+                    delay,
+                    attempt,
+                )
+                time.sleep(delay)
 
+    def _attempt(self, method: str, uri: str, **kwargs) -> VaultResponse:
+        """Make a single request attempt once the governor admits it."""
+        if self.governor is None:
+            return self._send(method, uri, **kwargs)
+        with self.governor.slot(uri):
+            return self._send(method, uri, **kwargs)
+
+    def _send(self, method: str, uri: str, **kwargs) -> VaultResponse:
+        """Send a single request attempt."""
+        if self.observers:
+            return self._send_observed(method, uri, **kwargs)
+        try:
+            res = self.transport.request(method, uri, **kwargs)
+        except IOError as err:
+            raise VaultClientException(str(err))
+
+        return self._to_vault_response(res, self.codec, uri)
+
+    def _send_observed(self, method: str, uri: str, **kwargs) -> VaultResponse:
+        """Make a single request attempt and report it to the observers."""
+        start = time.perf_counter()
         try:
-            res = self.session.request(method, uri, **kwargs)
+            res = self.transport.request(method, uri, **kwargs)
         except IOError as err:
+            notify(
+                self.observers,
+                RequestEvent(
+                    method=method,
+                    uri=uri,
+                    path=normalize_path(uri),
+                    status_code=None,
+                    elapsed=time.perf_counter() - start,
+                    time_to_headers=None,
+                    transfer_time=None,
+                    response_bytes=0,
+                    decode_time=0.0,
+                    error=str(err),
+                ),
+            )
             raise VaultClientException(str(err))
 
-        code = HttpStatusCode(res.status_code)
+        received = time.perf_counter()
+        error = None
+        try:
+            vault_response = self._to_vault_response(res, self.codec, uri)
+            # Decode now rather than lazily so decode time can be measured.
+            vault_response.response
+            return vault_response
+        except VaultClientException as err:
+            error = err.message
+            raise
+        finally:
+            done = time.perf_counter()
+            # Transports stop the ``elapsed`` clock once headers are parsed, the
+            # rest of the round trip is spent reading the body.
+            time_to_headers = getattr(res.elapsed, "total_seconds", lambda: None)()
+            notify(
+                self.observers,
+                RequestEvent(
+                    method=method,
+                    uri=uri,
+                    path=normalize_path(uri),
+                    status_code=res.status_code,
+                    elapsed=done - start,
+                    time_to_headers=time_to_headers,
+                    transfer_time=(
+                        max(0.0, received - start - time_to_headers)
+                        if time_to_headers is not None
+                        else None
+                    ),
+                    response_bytes=len(res.content or b""),
+                    decode_time=done - received,
+                    error=error,
+                ),
+            )
 
-        if code not in [
-            HttpStatusCode.SUCCESS_DATA,
-            HttpStatusCode.SUCCESS_NO_DATA,
-            HttpStatusCode.HEALTH_PERFORMANCE_STANDBY_NODE,
-            HttpStatusCode.HEALTH_STANDBY_NODE,
-        ]:
-            text = self._get_text(res)
-            raise VaultClientException(f"{res.status_code}: {text}")
+    @classmethod
+    def _to_vault_response(
+        cls, res: Any, codec: Optional[JSONCodec] = None, uri: str = ""
+    ) -> VaultResponse:
+        """Convert an HTTP response into a :class:`VaultResponse`.
+
+        Works with any response object exposing ``status_code``, ``content`` and
+        ``text``, so it is shared by the sync and async clients. The body is
+        decoded with ``codec`` lazily on first access to
+        :attr:`VaultResponse.response`, and error bodies are only formatted if
+        the exception's message is used.
+
+        The standby codes 429 and 473 only count as success for ``sys/health``
+        requests. For any other ``uri`` 429 means a rate limit quota was hit.
+
+        Raises:
+            VaultClientException: Raised for bad status codes.
+        """
+        status = res.status_code
+        codec = codec or get_codec()
+        content = res.content
+        if status not in SUCCESS_STATUS_CODES or (
+            status in HEALTH_ONLY_STATUS_CODES and not _is_health_check(uri)
+        ):
+            raise VaultClientException(
+                lambda: f"{status}: {cls._get_text(res, codec)}",
+                status_code=lookup_status_code(status),
+                response=VaultResponse(
+                    response=None,
+                    status_code=status,
+                    loader=partial(codec.loads, content),
+                ),
+            )
+        if status == NO_DATA_STATUS_CODE:
+            return VaultResponse(response={}, status_code=status)
         return VaultResponse(
-            response=res.json() if code != HttpStatusCode.SUCCESS_NO_DATA else {},
-            status_code=res.status_code,
+            response=None,
+            status_code=status,
+            loader=partial(codec.loads, content),
+            raw=content,
         )
 
     def get(
@@ -85,8 +330,18 @@ class VaultClient:
         Raises:
             VaultClientException: Raised for connection or status code errors
         """
-        return self.make_request(
-            HttpMethod.GET.value, urljoin(self.vault_addr, api_path), params=params
+        uri = urljoin(self.vault_addr, api_path)
+        if self.singleflight is None:
+            return self.make_request(HttpMethod.GET.value, uri, params=params)
+        headers = self.headers
+        key = (
+            uri,
+            tuple(sorted((params or {}).items())),
+            headers.get("X-Vault-Token"),
+            headers.get("X-Vault-Namespace"),
+        )
+        return self.singleflight.do(
+            key, lambda: self.make_request(HttpMethod.GET.value, uri, params=params)
         )
 
     def put(
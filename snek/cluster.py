@@ -0,0 +1,250 @@
+import itertools
+import logging
+import threading
+import time
+from enum import Enum
+from typing import Any, Callable, Collection, List, Optional, Sequence, Set
+from urllib.parse import urlsplit, urlunsplit
+
+from .client import VaultClient
+from .constants import HttpMethod, HttpStatusCode, ValueStringMixin
+from .exceptions import VaultClientException
+from .models import VaultResponse
+
+logger = logging.getLogger(__name__)
+
+#: Methods that performance standbys can serve locally
+READ_METHODS = frozenset(
+    {HttpMethod.GET.value, HttpMethod.HEAD.value, HttpMethod.LIST.value}
+)
+
+
+class NodeRole(ValueStringMixin, Enum):
+    """Role of a Vault node as reported by ``sys/health``."""
+
+    ACTIVE = "active"
+    PERFORMANCE_STANDBY = "performance_standby"
+    STANDBY = "standby"
+    UNHEALTHY = "unhealthy"
+    UNKNOWN = "unknown"
+
+
+_ROLES_BY_STATUS = {
+    status.value: role
+    for status, role in (
+        (HttpStatusCode.SUCCESS_DATA, NodeRole.ACTIVE),
+        (HttpStatusCode.HEALTH_PERFORMANCE_STANDBY_NODE, NodeRole.PERFORMANCE_STANDBY),
+        (HttpStatusCode.HEALTH_STANDBY_NODE, NodeRole.STANDBY),
+    )
+}
+
+
+class VaultNode:
+    """Routing state for one node of a cluster."""
+
+    def __init__(self, addr: str):
+        self.addr = addr
+        self.role = NodeRole.UNKNOWN
+        #: requests currently in flight to this node
+        self.outstanding = 0
+        #: consecutive failed requests or health checks
+        self.failures = 0
+        #: monotonic time until which the circuit breaker keeps the node out
+        self.open_until = 0.0
+
+    def available(self, now: float) -> bool:
+        """Whether the circuit breaker lets requests through."""
+        return self.open_until <= now
+
+    def __repr__(self) -> str:
+        return (
+            f"VaultNode({self.addr!r}, role={self.role}, "
+            f"outstanding={self.outstanding})"
+        )
+
+
+class VaultClusterClient(VaultClient):
+    """Client that spreads requests over the nodes of a Vault cluster.
+
+    A background thread polls ``sys/health`` on every node to learn which one is
+    active and which are performance standbys. Reads (``GET``, ``HEAD``,
+    ``LIST``) go to the healthy performance standby with the fewest requests in
+    flight, taking turns between standbys that tie, falling back to the active
+    node; writes always go to the active node. A node that fails
+    ``failure_threshold`` requests or health checks in a row is taken out of
+    rotation for ``cooldown`` seconds, after which it is tried again, or sooner
+    if a health check succeeds.
+
+    Combine with a :class:`snek.retry.RetryPolicy` so a failed request is
+    retried: each retry skips the nodes that already failed it, as long as
+    another node is left.
+
+    Args:
+        node_addrs: base addresses of the cluster nodes
+        token: Vault token sent as ``X-Vault-Token``
+        health_interval: seconds between health polls
+        health_timeout: timeout in seconds for each health check
+        failure_threshold: consecutive failures before a node is taken out
+        cooldown: seconds a failed node stays out of rotation
+        **kwargs: other :class:`snek.client.VaultClient` arguments
+    """
+
+    def __init__(
+        self,
+        node_addrs: Sequence[str],
+        token: str,
+        health_interval: float = 5.0,
+        health_timeout: float = 2.0,
+        failure_threshold: int = 3,
+        cooldown: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+        **kwargs: Any,
+    ):
+        if not node_addrs:
+            raise ValueError("At least one node address is required")
+        super().__init__(node_addrs[0], token, **kwargs)
+        self.nodes = [VaultNode(addr) for addr in node_addrs]
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._turn = itertools.count()
+        # Nodes that failed an attempt of the request the thread is making.
+        self._local = threading.local()
+
+    def __enter__(self) -> "VaultClusterClient":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+        self.close()
+
+    def check_health(self) -> None:
+        """Poll ``sys/health`` on every node once and update their roles."""
+        for node in self.nodes:
+            url = f"{node.addr.rstrip('/')}/v1/sys/health"
+            try:
+                res = self.transport.request(
+                    HttpMethod.GET.value, url, timeout=self.health_timeout
+                )
+                role = _ROLES_BY_STATUS.get(res.status_code, NodeRole.UNHEALTHY)
+            except IOError:
+                role = NodeRole.UNHEALTHY
+            with self._lock:
+                node.role = role
+                if role is NodeRole.UNHEALTHY:
+                    self._record_failure(node)
+                else:
+                    node.failures = 0
+                    node.open_until = 0.0
+
+    def _record_failure(self, node: VaultNode) -> None:
+        node.failures += 1
+        if node.failures >= self.failure_threshold:
+            node.open_until = self._clock() + self.cooldown
+            logger.warning("Taking Vault node %s out of rotation", node.addr)
+
+    def select_node(
+        self, method: str, exclude: Collection[VaultNode] = ()
+    ) -> VaultNode:
+        """Pick the node that should serve a request with this method.
+
+        Args:
+            method: HTTP method of the request
+            exclude: nodes to avoid, used anyway if no other node is left
+        """
+        now = self._clock()
+        with self._lock:
+            nodes = [node for node in self.nodes if node not in exclude] or self.nodes
+            candidates = [node for node in nodes if node.available(now)]
+            if method in READ_METHODS:
+                standbys = [
+                    node
+                    for node in candidates
+                    if node.role is NodeRole.PERFORMANCE_STANDBY
+                ]
+                if standbys:
+                    least = min(node.outstanding for node in standbys)
+                    tied = [node for node in standbys if node.outstanding == least]
+                    return tied[next(self._turn) % len(tied)]
+            for node in candidates:
+                if node.role is NodeRole.ACTIVE:
+                    return node
+            # Roles unknown or every node tripped: try whatever is least bad.
+            for node in candidates:
+                if node.role is NodeRole.UNKNOWN:
+                    return node
+            return min(nodes, key=lambda node: node.open_until)
+
+    def make_request(self, method: str, uri: str, **kwargs) -> VaultResponse:
+        self._local.failed = set()
+        try:
+            return super().make_request(method, uri, **kwargs)
+        finally:
+            del self._local.failed
+
+    def _send(self, method: str, uri: str, **kwargs) -> VaultResponse:
+        failed: Set[VaultNode] = getattr(self._local, "failed", set())
+        node = self.select_node(method, exclude=failed)
+        node_base = urlsplit(node.addr)
+        parts = urlsplit(uri)
+        node_uri = urlunsplit(
+            (node_base.scheme, node_base.netloc, parts.path, parts.query, "")
+        )
+        with self._lock:
+            node.outstanding += 1
+        try:
+            res = super()._send(method, node_uri, **kwargs)
+        except VaultClientException as err:
+            failed.add(node)
+            status = getattr(err.status_code, "value", err.status_code)
+            with self._lock:
+                if not isinstance(status, int) or status >= 500:
+                    self._record_failure(node)
+            raise
+        finally:
+            with self._lock:
+                node.outstanding -= 1
+        with self._lock:
+            node.failures = 0
+        return res
+
+    def start(self) -> None:
+        """Check health once, then keep polling in a background thread."""
+        if self._thread is not None:
+            return
+        self.check_health()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="snek-cluster-health", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.health_interval):
+            try:
+                self.check_health()
+            except Exception:
+                logger.exception("Vault health check failed")
+
+    def stop(self) -> None:
+        """Stop health polling."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def healthy_nodes(self) -> List[VaultNode]:
+        """Nodes currently eligible for requests."""
+        now = self._clock()
+        return [
+            node
+            for node in self.nodes
+            if node.available(now)
+            and node.role in (NodeRole.ACTIVE, NodeRole.PERFORMANCE_STANDBY)
+        ]
@@ -0,0 +1,77 @@
+import json
+from typing import Any, Callable, Dict, NamedTuple, Optional, Union
+
+
+class JSONCodec(NamedTuple):
+    """JSON functions used by the clients to encode requests and decode responses.
+
+    Any pair of callables with these signatures can be used, see
+    :func:`get_codec` for the built-in ones.
+    """
+
+    name: str
+    #: decode UTF-8 encoded JSON
+    loads: Callable[[Union[bytes, str]], Any]
+    #: encode an object as UTF-8 JSON
+    dumps: Callable[[Any], bytes]
+
+
+def _stdlib() -> JSONCodec:
+    return JSONCodec(
+        name="json",
+        loads=json.loads,
+        dumps=lambda obj: json.dumps(obj).encode(),
+    )
+
+
+def _orjson() -> JSONCodec:
+    import orjson
+
+    return JSONCodec(name="orjson", loads=orjson.loads, dumps=orjson.dumps)
+
+
+def _ujson() -> JSONCodec:
+    import ujson
+
+    return JSONCodec(
+        name="ujson",
+        loads=ujson.loads,
+        dumps=lambda obj: ujson.dumps(obj, ensure_ascii=False).encode(),
+    )
+
+
+#: Built-in codecs, in order of preference
+CODECS: Dict[str, Callable[[], JSONCodec]] = {
+    "orjson": _orjson,
+    "ujson": _ujson,
+    "json": _stdlib,
+}
+
+_default: Optional[JSONCodec] = None
+
+
+def get_codec(name: Optional[str] = None) -> JSONCodec:
+    """Return a built-in codec.
+
+    Args:
+        name: ``"orjson"``, ``"ujson"`` or ``"json"``. If not given, the fastest
+            installed library is used, falling back to the standard library.
+
+    Raises:
+        ImportError: Raised if the named codec's library is not installed.
+        ValueError: Raised for an unknown codec name.
+    """
+    global _default
+    if name is not None:
+        if name not in CODECS:
+            raise ValueError(f"Unknown JSON codec {name!r}")
+        return CODECS[name]()
+    if _default is None:
+        for factory in CODECS.values():
+            try:
+                _default = factory()
+                break
+            except ImportError:
+                continue
+    assert _default is not None
+    return _default
@@ -1,4 +1,5 @@
 from enum import Enum
+from typing import Union
 
 
 class ValueStringMixin:
@@ -32,3 +33,34 @@ class HttpStatusCode(ValueStringMixin, Enum):
     INTERNAL_SERVER_ERROR = 500
     THIRD_PARTY_ERROR = 502
     VAULT_MAINTENANCE = 503
+
+
+#: Integer status codes Vault uses for successful responses
+SUCCESS_STATUS_CODES = frozenset(
+    {
+        HttpStatusCode.SUCCESS_DATA.value,
+        HttpStatusCode.SUCCESS_NO_DATA.value,
+        HttpStatusCode.HEALTH_PERFORMANCE_STANDBY_NODE.value,
+        HttpStatusCode.HEALTH_STANDBY_NODE.value,
+    }
+)
+
+#: Codes in :data:`SUCCESS_STATUS_CODES` that only mean success for ``sys/health``.
+#: Elsewhere Vault answers 429 when a rate limit quota is exceeded.
+HEALTH_ONLY_STATUS_CODES = frozenset(
+    {
+        HttpStatusCode.HEALTH_PERFORMANCE_STANDBY_NODE.value,
+        HttpStatusCode.HEALTH_STANDBY_NODE.value,
+    }
+)
+
+_STATUS_CODES_BY_VALUE = {code.value: code for code in HttpStatusCode}
+
+
+def lookup_status_code(code: int) -> Union[HttpStatusCode, int]:
+    """Return the :class:`HttpStatusCode` for an integer code.
+
+    Codes Vault does not document, such as 412, are returned unchanged instead
+    of raising ``ValueError``.
+    """
+    return _STATUS_CODES_BY_VALUE.get(code, code)
@@ -1,6 +1,7 @@
-from typing import Optional
+from typing import Callable, Optional, Union
 
 from .constants import HttpStatusCode
+from .models import VaultResponse
 
 
 class SnekException(Exception):
@@ -10,11 +11,42 @@ class SnekException(Exception):
 
 
 class VaultClientException(SnekException):
-    """Error with client communication."""
-
-    def __init__(self, message: str, status_code: Optional[HttpStatusCode] = None):
-        self.message = message
+    """Error with client communication.
+
+    The message may be given as a callable, which is called the first time the
+    message is used, so formatting an error body costs nothing when the
+    exception is caught and handled without being rendered.
+    """
+
+    def __init__(
+        self,
+        message: Union[str, Callable[[], str]],
+        status_code: Optional[Union[HttpStatusCode, int]] = None,
+        response: Optional[VaultResponse] = None,
+    ):
+        self._message = message
         self.status_code = status_code
+        #: the error response, its body decoded on first access to
+        #: :attr:`VaultResponse.response`; ``None`` for connection errors
+        self.response = response
+
+    @property
+    def message(self) -> str:
+        if callable(self._message):
+            self._message = self._message()
+        return self._message
+
+    def __str__(self) -> str:
+        return self.message
+
+    def __reduce__(self):
+        return type(self), (self.message, self.status_code)
+
+
+class AuthException(SnekException):
+    """Error obtaining, looking up or renewing a token."""
+
+    pass
 
 
 class KV2SecretException(SnekException):
@@ -24,12 +56,63 @@ class KV2SecretException(SnekException):
 class SecretCreateUpdateException(SnekException):
     """Error creating or updating a secret."""
 
-    pass
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[Union[HttpStatusCode, int]] = None,
+    ):
+        super().__init__(message)
+        self.message = message
+        #: status code of the failed request, ``None`` for connection errors
+        self.status_code = status_code
 
 
 class SecretReadException(SnekException):
     """Error getting a secret."""
 
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[Union[HttpStatusCode, int]] = None,
+    ):
+        super().__init__(message)
+        self.message = message
+        #: status code of the failed request, ``None`` for connection errors
+        self.status_code = status_code
+
+
+class TransitException(SnekException):
+    """Error using the transit secrets engine."""
+
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[Union[HttpStatusCode, int]] = None,
+    ):
+        super().__init__(message)
+        self.message = message
+        #: status code of the failed request, ``None`` for connection errors and
+        #: errors reported for a single batch item
+        self.status_code = status_code
+
+
+class LeaseException(SnekException):
+    """Error renewing, revoking or getting a lease."""
+
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[Union[HttpStatusCode, int]] = None,
+    ):
+        super().__init__(message)
+        self.message = message
+        #: status code of the failed request, ``None`` if no request failed
+        self.status_code = status_code
+
+
+class SnapshotException(SnekException):
+    """Error exporting or importing a snapshot."""
+
     pass
 
 
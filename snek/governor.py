@@ -0,0 +1,237 @@
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Dict, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .instrumentation import LatencyHistogram
+from .ratelimit import TokenBucket
+
+
+class Priority(IntEnum):
+    """Priority class of a request; lower values are admitted first."""
+
+    INTERACTIVE = 0
+    NORMAL = 1
+    BACKGROUND = 2
+
+
+_priority: ContextVar[Priority] = ContextVar("snek_priority", default=Priority.NORMAL)
+
+
+@contextmanager
+def priority(value: Priority) -> Iterator[None]:
+    """Run the requests made in this block with the given priority.
+
+    The priority is kept in a context variable, so it applies to the current
+    thread or asyncio task only. The bulk helpers such as
+    :meth:`snek.secrets.KVSecretV2API.write_many` run their workers in a copy
+    of the caller's context, so their requests get the priority too. Generators
+    send requests as they are consumed, so consume them inside the block.
+
+    Example::
+
+        with priority(Priority.BACKGROUND):
+            results = list(api.write_many(items))
+    """
+    token = _priority.set(value)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> Priority:
+    """Priority requests made right now would be admitted with."""
+    return _priority.get()
+
+
+class Limit(NamedTuple):
+    """Limits applied by a :class:`Governor` to a set of requests."""
+
+    #: requests started per second, unlimited if ``None``
+    rate: Optional[float] = None
+    #: requests that may start at once after an idle period, at least 1,
+    #: defaults to ``rate``
+    burst: Optional[float] = None
+    #: requests allowed in flight at once, unlimited if ``None``
+    max_in_flight: Optional[int] = None
+
+
+class GateStats(NamedTuple):
+    """Counters for one limit of a :class:`Governor`."""
+
+    #: requests admitted so far
+    admitted: int
+    #: admitted requests that had to queue
+    delayed: int
+    #: total seconds requests spent queued
+    wait_time: float
+    #: longest time a request spent queued
+    max_wait: float
+    #: requests currently queued
+    queued: int
+    #: requests currently in flight
+    in_flight: int
+
+
+class _Gate:
+    """Admits requests under one :class:`Limit`, highest priority first."""
+
+    def __init__(self, limit: Limit):
+        self.limit = limit
+        self.bucket = (
+            TokenBucket(limit.rate, limit.burst) if limit.rate is not None else None
+        )
+        self._cond = threading.Condition()
+        self._waiters: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+        self.in_flight = 0
+        self.admitted = 0
+        self.delayed = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+
+    def _ready(self) -> float:
+        """Seconds until the head of the queue may go, ``-1`` if it must wait
+        for a request to finish."""
+        max_in_flight = self.limit.max_in_flight
+        if max_in_flight is not None and self.in_flight >= max_in_flight:
+            return -1.0
+        return self.bucket.wait_time() if self.bucket is not None else 0.0
+
+    def acquire(self, priority: Priority) -> float:
+        """Block until admitted and return the seconds spent waiting."""
+        start = time.monotonic()
+        with self._cond:
+            entry = (int(priority), next(self._seq))
+            heapq.heappush(self._waiters, entry)
+            queued = False
+            try:
+                while True:
+                    if self._waiters[0] == entry:
+                        delay = self._ready()
+                        if delay == 0.0 and (
+                            self.bucket is None or self.bucket.try_acquire()
+                        ):
+                            break
+                        queued = True
+                        self._cond.wait(delay if delay > 0 else None)
+                    else:
+                        queued = True
+                        self._cond.wait()
+            finally:
+                # Leave the queue whether admitted or interrupted, and let the
+                # next waiter check whether it can go.
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+            self.in_flight += 1
+            waited = time.monotonic() - start
+            self.admitted += 1
+            if queued:
+                self.delayed += 1
+            self.wait_time += waited
+            self.max_wait = max(self.max_wait, waited)
+            return waited
+
+    def release(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def stats(self) -> GateStats:
+        with self._cond:
+            return GateStats(
+                admitted=self.admitted,
+                delayed=self.delayed,
+                wait_time=self.wait_time,
+                max_wait=self.max_wait,
+                queued=len(self._waiters),
+                in_flight=self.in_flight,
+            )
+
+
+class Governor:
+    """Client-side rate limiter and concurrency limit for Vault requests.
+
+    Keeps a client under Vault's rate limit quotas so a burst of background work
+    does not trip them for every other client sharing the quota. Each request
+    attempt passes a global :class:`Limit` and the limit of the longest
+    matching path prefix, if any. When requests queue, the highest
+    :class:`Priority` goes first and equal priorities go in arrival order; set
+    the priority of a block of code with :func:`priority`.
+
+    Example::
+
+        governor = Governor(
+            Limit(rate=200, max_in_flight=32),
+            path_limits={"secret/data/batch/": Limit(rate=20, max_in_flight=4)},
+        )
+        client = VaultClient(addr, token, governor=governor)
+
+    Args:
+        limit: limit applied to all requests
+        path_limits: limits for API path prefixes, relative to ``/v1/``
+    """
+
+    def __init__(
+        self,
+        limit: Limit = Limit(),
+        path_limits: Optional[Mapping[str, Limit]] = None,
+    ):
+        self._global = _Gate(limit)
+        self._gates: Dict[str, _Gate] = {
+            prefix.lstrip("/"): _Gate(path_limit)
+            for prefix, path_limit in (path_limits or {}).items()
+        }
+        # Longest prefix first so the most specific limit wins.
+        self._prefixes = sorted(self._gates, key=len, reverse=True)
+        self._lock = threading.Lock()
+        #: time spent queued per priority, in seconds
+        self.wait_histograms: Dict[Priority, LatencyHistogram] = {
+            level: LatencyHistogram() for level in Priority
+        }
+
+    def _gates_for(self, uri: str) -> List[_Gate]:
+        path = urlsplit(uri).path
+        if path.startswith("/v1/"):
+            path = path[len("/v1/") :]
+        for prefix in self._prefixes:
+            if path.startswith(prefix):
+                return [self._gates[prefix], self._global]
+        return [self._global]
+
+    @contextmanager
+    def slot(self, uri: str, level: Optional[Priority] = None) -> Iterator[None]:
+        """Wait for permission to send a request to ``uri`` and hold it.
+
+        Args:
+            uri: request URI, used to find the path limit
+            level: priority, defaults to :func:`current_priority`
+        """
+        if level is None:
+            level = current_priority()
+        admitted: List[_Gate] = []
+        waited = 0.0
+        try:
+            for gate in self._gates_for(uri):
+                waited += gate.acquire(level)
+                admitted.append(gate)
+            with self._lock:
+                self.wait_histograms[level].record(waited)
+            yield
+        finally:
+            for gate in reversed(admitted):
+                gate.release()
+
+    def stats(self) -> Dict[str, GateStats]:
+        """Counters per limit, keyed by path prefix with ``""`` for the global one."""
+        stats = {"": self._global.stats()}
+        for prefix, gate in self._gates.items():
+            stats[prefix] = gate.stats()
+        return stats
@@ -0,0 +1,187 @@
+import logging
+import math
+import re
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Pattern, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+#: Rules mapping concrete API paths onto templates, applied in order
+PATH_TEMPLATES: List[Tuple[Pattern, str]] = [
+    (
+        re.compile(r"^(/v1/[^/]+)/(data|metadata|delete|undelete|destroy)/.+$"),
+        r"\1/\2/{path}",
+    ),
+    (re.compile(r"^/v1/sys/leases/(lookup|renew|revoke)/.+$"), r"/v1/sys/leases/\1"),
+    (
+        re.compile(
+            r"^(/v1/[^/]+)/(encrypt|decrypt|rewrap|hmac|datakey/[^/]+|keys)/[^/]+$"
+        ),
+        r"\1/\2/{name}",
+    ),
+]
+
+
+def normalize_path(uri: str) -> str:
+    """Reduce a request URI to an API path template.
+
+    Scheme, host and querystring are dropped and secret paths are collapsed so
+    that metrics group by endpoint rather than by individual secret, e.g.
+    ``http://vault:8200/v1/secret/data/app/db?version=2`` becomes
+    ``/v1/secret/data/{path}``.
+    """
+    path = urlsplit(uri).path or "/"
+    for pattern, template in PATH_TEMPLATES:
+        if pattern.match(path):
+            return pattern.sub(template, path)
+    return path
+
+
+class RequestEvent(NamedTuple):
+    """Measurements for a single HTTP attempt made by a Vault client."""
+
+    #: HTTP method
+    method: str
+    #: full request URI
+    uri: str
+    #: API path template, see :func:`normalize_path`
+    path: str
+    #: HTTP status code, ``None`` if no response was received
+    status_code: Optional[int]
+    #: wall time in seconds from sending the request to having a VaultResponse
+    elapsed: float
+    #: seconds until response headers were parsed, if the transport reports it
+    time_to_headers: Optional[float]
+    #: seconds spent reading the response body, if ``time_to_headers`` is known
+    transfer_time: Optional[float]
+    #: size of the response body in bytes
+    response_bytes: int
+    #: seconds spent decoding the body and building the VaultResponse
+    decode_time: float
+    #: error message if the attempt raised
+    error: Optional[str] = None
+
+
+class RequestObserver:
+    """Base class for receiving a :class:`RequestEvent` per request attempt."""
+
+    def on_request(self, event: RequestEvent) -> None:
+        """Called after every request attempt, successful or not."""
+        pass
+
+
+def notify(observers: Iterable[RequestObserver], event: RequestEvent) -> None:
+    """Deliver an event to observers. Observer errors are logged, not raised."""
+    for observer in observers:
+        try:
+            observer.on_request(event)
+        except Exception:
+            logger.exception("Request observer %r failed", observer)
+
+
+class LatencyHistogram:
+    """Log-bucketed histogram of durations in seconds.
+
+    Buckets grow geometrically by ``growth`` from ``min_value`` so percentiles
+    are accurate to within that relative error with constant memory.
+    """
+
+    def __init__(self, min_value: float = 1e-5, growth: float = 1.05):
+        self.min_value = min_value
+        self.growth = growth
+        self._log_growth = math.log(growth)
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value: float) -> None:
+        if value <= self.min_value:
+            index = 0
+        else:
+            index = int(math.ceil(math.log(value / self.min_value) / self._log_growth))
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        """Return the upper bound of the bucket holding the ``q`` quantile."""
+        if not self.count:
+            return 0.0
+        rank = max(1, int(math.ceil(q * self.count)))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.max, self.min_value * self.growth**index)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class HistogramCollector(RequestObserver):
+    """In-memory observer tracking latency histograms per method and endpoint.
+
+    Example::
+
+        collector = HistogramCollector()
+        client = VaultClient(addr, token, observers=[collector])
+        ...
+        collector.summary()["GET /v1/secret/data/{path}"]["p99"]
+    """
+
+    def __init__(self, min_value: float = 1e-5, growth: float = 1.05):
+        self._min_value = min_value
+        self._growth = growth
+        self._lock = threading.Lock()
+        self.histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self.errors: Dict[Tuple[str, str], int] = {}
+        self.response_bytes: Dict[Tuple[str, str], int] = {}
+
+    def on_request(self, event: RequestEvent) -> None:
+        key = (event.method, event.path)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram(
+                    self._min_value, self._growth
+                )
+            histogram.record(event.elapsed)
+            self.response_bytes[key] = (
+                self.response_bytes.get(key, 0) + event.response_bytes
+            )
+            if event.error is not None:
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+    def percentile(self, method: str, path: str, q: float) -> float:
+        """Return the ``q`` latency quantile in seconds for an endpoint."""
+        with self._lock:
+            histogram = self.histograms.get((method, path))
+            return histogram.percentile(q) if histogram is not None else 0.0
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Return count, errors, bytes, mean, p50, p90, p99 and max per endpoint."""
+        with self._lock:
+            return {
+                f"{method} {path}": {
+                    "count": histogram.count,
+                    "errors": self.errors.get((method, path), 0),
+                    "bytes": self.response_bytes.get((method, path), 0),
+                    "mean": histogram.mean,
+                    "p50": histogram.percentile(0.5),
+                    "p90": histogram.percentile(0.9),
+                    "p99": histogram.percentile(0.99),
+                    "max": histogram.max,
+                }
+                for (method, path), histogram in self.histograms.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+            self.errors.clear()
+            self.response_bytes.clear()
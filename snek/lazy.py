@@ -0,0 +1,197 @@
+"""Decode parts of a JSON document on demand.
+
+Large KV2 secrets are mostly one or two big string values. Instead of decoding a
+whole response body, these helpers find the byte span of each member of a JSON
+object, skipping over strings with :meth:`bytes.find`, so only the members that
+are actually used get decoded.
+"""
+import json
+import re
+from typing import IO, Any, Dict, Iterator, Mapping, Optional, Tuple, Union
+
+Buffer = Union[bytes, bytearray]
+
+_SPECIAL = re.compile(rb'["{}\[\]]')
+_SCALAR_END = re.compile(rb"[,}\]\s]")
+_HIGH_SURROGATE = re.compile(rb"\\u[dD][89abAB][0-9a-fA-F]{2}")
+_WHITESPACE = b" \t\r\n"
+_QUOTE, _BACKSLASH = ord('"'), ord("\\")
+_OPEN = b"{["
+
+
+def _skip_whitespace(raw: Buffer, pos: int) -> int:
+    while pos < len(raw) and raw[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+
+def _string_end(raw: Buffer, pos: int) -> int:
+    """Return the offset just past the JSON string starting at ``pos``."""
+    start = pos + 1
+    while True:
+        quote = raw.find(b'"', start)
+        if quote < 0:
+            raise ValueError(f"Unterminated string at offset {pos}")
+        escapes = quote
+        while raw[escapes - 1] == _BACKSLASH:
+            escapes -= 1
+        if (quote - escapes) % 2 == 0:
+            return quote + 1
+        start = quote + 1
+
+
+def _value_end(raw: Buffer, pos: int) -> int:
+    """Return the offset just past the JSON value starting at ``pos``."""
+    if raw[pos] == _QUOTE:
+        return _string_end(raw, pos)
+    if raw[pos] not in _OPEN:
+        match = _SCALAR_END.search(raw, pos)
+        return match.start() if match else len(raw)
+    depth = 0
+    while True:
+        match = _SPECIAL.search(raw, pos)
+        if match is None:
+            raise ValueError(f"Unterminated value at offset {pos}")
+        pos = match.start()
+        if raw[pos] == _QUOTE:
+            pos = _string_end(raw, pos)
+            continue
+        depth += 1 if raw[pos] in _OPEN else -1
+        pos += 1
+        if not depth:
+            return pos
+
+
+def index_object(raw: Buffer, start: int = 0) -> Dict[str, Tuple[int, int]]:
+    """Map each member of the JSON object at ``start`` to its value's span.
+
+    Args:
+        raw: UTF-8 encoded JSON
+        start: offset of the object, leading whitespace is skipped
+
+    Returns:
+        ``{key: (start, end)}`` offsets into ``raw`` of each member's value.
+
+    Raises:
+        ValueError: Raised if there is no well-formed object at ``start``.
+    """
+    pos = _skip_whitespace(raw, start)
+    if pos >= len(raw) or raw[pos] != ord("{"):
+        raise ValueError(f"Expected a JSON object at offset {pos}")
+    spans: Dict[str, Tuple[int, int]] = {}
+    pos = _skip_whitespace(raw, pos + 1)
+    if raw[pos : pos + 1] == b"}":
+        return spans
+    try:
+        while True:
+            if raw[pos] != _QUOTE:
+                break
+            end = _string_end(raw, pos)
+            key = json.loads(raw[pos:end])
+            pos = _skip_whitespace(raw, end)
+            if raw[pos] != ord(":"):
+                break
+            pos = _skip_whitespace(raw, pos + 1)
+            end = _value_end(raw, pos)
+            spans[key] = (pos, end)
+            pos = _skip_whitespace(raw, end)
+            if raw[pos] == ord("}"):
+                return spans
+            if raw[pos] != ord(","):
+                break
+            pos = _skip_whitespace(raw, pos + 1)
+    except IndexError:
+        pass
+    raise ValueError(f"Malformed JSON object at offset {start}")
+
+
+def _string_chunks(raw: Buffer, start: int, end: int, size: int) -> Iterator[str]:
+    """Decode the JSON string spanning ``raw[start:end]`` ``size`` bytes at a time."""
+    pos, end = start + 1, end - 1
+    while pos < end:
+        cut = min(pos + size, end)
+        if cut < end:
+            # Never split an escape sequence or a surrogate pair: back up to
+            # the start of the last run of backslashes near the boundary...
+            backslash = raw.rfind(b"\\", max(pos, cut - 12), cut)
+            if backslash >= 0:
+                cut = backslash
+                while cut > pos and raw[cut - 1] == _BACKSLASH:
+                    cut -= 1
+                if cut - 6 >= pos and _HIGH_SURROGATE.fullmatch(raw[cut - 6 : cut]):
+                    cut -= 6
+                    while cut > pos and raw[cut - 1] == _BACKSLASH:
+                        cut -= 1
+            # Nor a multi-byte UTF-8 character.
+            while cut > pos and 0x80 <= raw[cut] < 0xC0:
+                cut -= 1
+            if cut <= pos:
+                cut = min(pos + size, end)
+        yield json.loads(b'"' + raw[pos:cut] + b'"')
+        pos = cut
+
+
+class LazyValue(Mapping[str, Any]):
+    """Read-only mapping over a JSON object that decodes members on access.
+
+    The object is indexed on first use and each member is decoded the first
+    time it is read, then kept. The raw bytes are shared, not copied.
+
+    Args:
+        raw: UTF-8 encoded JSON containing the object
+        start: offset of the object in ``raw``
+    """
+
+    __slots__ = ("_raw", "_start", "_spans", "_decoded")
+
+    def __init__(self, raw: Buffer, start: int = 0):
+        self._raw = raw
+        self._start = start
+        self._spans: Optional[Dict[str, Tuple[int, int]]] = None
+        self._decoded: Dict[str, Any] = {}
+
+    @property
+    def spans(self) -> Dict[str, Tuple[int, int]]:
+        if self._spans is None:
+            self._spans = index_object(self._raw, self._start)
+        return self._spans
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return self._decoded[key]
+        except KeyError:
+            pass
+        start, end = self.spans[key]
+        value = self._decoded[key] = json.loads(self._raw[start:end])
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.spans)
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def __repr__(self) -> str:
+        return f"LazyValue({list(self.spans)!r})"
+
+    def raw(self, key: str) -> memoryview:
+        """The undecoded JSON of a member, without copying it."""
+        start, end = self.spans[key]
+        return memoryview(self._raw)[start:end]
+
+    def write_to(self, key: str, fp: IO[bytes], chunk_size: int = 64 * 1024) -> int:
+        """Write a member to a binary file without decoding it all at once.
+
+        Strings are written as UTF-8 text, decoded ``chunk_size`` bytes at a
+        time. Other values are written as their JSON text.
+
+        Returns:
+            Number of bytes written.
+        """
+        start, end = self.spans[key]
+        if self._raw[start] != _QUOTE:
+            return fp.write(memoryview(self._raw)[start:end])
+        written = 0
+        for chunk in _string_chunks(self._raw, start, end, max(chunk_size, 64)):
+            written += fp.write(chunk.encode())
+        return written
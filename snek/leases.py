@@ -0,0 +1,468 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    NamedTuple,
+    Optional,
+)
+
+from .client import VaultClient
+from .exceptions import LeaseException, VaultClientException
+from .models import VaultResponse
+
+logger = logging.getLogger(__name__)
+
+#: Returns a response with a fresh lease, e.g. a read of ``database/creds/app``
+FetchCallable = Callable[[], VaultResponse]
+
+
+class Lease(NamedTuple):
+    """A lease and the secret data that came with it."""
+
+    lease_id: str
+    #: seconds the lease was valid for when issued or last renewed
+    duration: int
+    renewable: bool
+    #: monotonic clock time the lease was issued or last renewed
+    issued_at: float
+    #: ``data`` of the response, e.g. the username and password
+    data: Dict[str, Any]
+
+    @property
+    def expires_at(self) -> Optional[float]:
+        """Monotonic clock time the lease expires, ``None`` if it never does."""
+        return self.issued_at + self.duration if self.duration else None
+
+    @classmethod
+    def from_response(cls, response: VaultResponse, issued_at: float) -> "Lease":
+        """Read the lease of a response.
+
+        Raises:
+            ValueError: Raised if the response has no lease.
+        """
+        body = response.response
+        if not body.get("lease_id"):
+            raise ValueError("Response has no lease")
+        return cls(
+            lease_id=body["lease_id"],
+            duration=int(body.get("lease_duration") or 0),
+            renewable=bool(body.get("renewable")),
+            issued_at=issued_at,
+            data=body.get("data") or {},
+        )
+
+
+class TimerWheel:
+    """Hashed timer wheel holding one deadline per key.
+
+    Scheduling and cancelling are O(1) whatever the number of timers, and
+    :meth:`advance` only looks at the slots the clock moved through. Deadlines
+    fire up to one ``tick`` late.
+
+    Args:
+        tick: seconds covered by one slot
+        slots: number of slots; deadlines further out than ``tick * slots``
+            wait in their slot for extra turns of the wheel
+        start: clock time the wheel starts at
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 512, start: float = 0.0):
+        if tick <= 0 or slots < 1:
+            raise ValueError("tick must be positive and slots at least 1")
+        self.tick = tick
+        self._slots: List[Dict[Hashable, float]] = [{} for _ in range(slots)]
+        self._where: Dict[Hashable, int] = {}
+        self._cursor = int(start // tick)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        """Fire ``key`` at ``deadline``, replacing any timer it already has."""
+        with self._lock:
+            self._cancel(key)
+            # Never behind the cursor, or the timer would wait a whole turn.
+            index = max(int(deadline // self.tick), self._cursor) % len(self._slots)
+            self._slots[index][key] = deadline
+            self._where[key] = index
+
+    def cancel(self, key: Hashable) -> None:
+        with self._lock:
+            self._cancel(key)
+
+    def _cancel(self, key: Hashable) -> None:
+        index = self._where.pop(key, None)
+        if index is not None:
+            del self._slots[index][key]
+
+    def advance(self, now: float) -> List[Hashable]:
+        """Move the wheel to ``now`` and return the keys that are due."""
+        due: List[Hashable] = []
+        with self._lock:
+            target = int(now // self.tick)
+            # One full turn visits every slot, no need to go round again.
+            steps = min(target - self._cursor, len(self._slots) - 1)
+            for offset in range(steps + 1):
+                slot = self._slots[(target - offset) % len(self._slots)]
+                for key, deadline in list(slot.items()):
+                    if deadline <= now:
+                        del slot[key]
+                        del self._where[key]
+                        due.append(key)
+            self._cursor = max(self._cursor, target)
+        return due
+
+
+class _Entry(NamedTuple):
+    lease: Lease
+    fetch: Optional[FetchCallable]
+
+
+class LeaseManager:
+    """Keep the leases of dynamic secrets alive from one background thread.
+
+    Leases are tracked from any :class:`snek.models.VaultResponse` that has
+    one. Each lease is renewed with ``sys/leases/renew`` once
+    ``renew_fraction`` of its duration has passed, give or take ``jitter`` of
+    that delay so leases issued together are not all renewed together.
+    Renewals are scheduled on a :class:`TimerWheel` advanced by a single
+    thread, and leases due in the same tick are renewed concurrently on a
+    small pool.
+
+    When a lease cannot be renewed because it is not renewable, renewal
+    fails, or Vault grants less than ``min_ttl`` because the lease reached its
+    max TTL, new credentials are obtained with the lease's ``fetch`` callable,
+    if it has one, well before the old ones expire. :meth:`credentials` never
+    touches the network and returns the newest valid credentials. The old
+    lease is left to expire so connections using it are not cut off.
+
+    Leases still tracked, and replaced leases that have not expired yet, are
+    revoked on :meth:`stop`.
+
+    Example::
+
+        leases = LeaseManager(client)
+        leases.register("db", lambda: client.get("/v1/database/creds/app"))
+        leases.start()
+        password = leases.credentials("db")["password"]
+
+    Args:
+        client: client used for renewal and revocation
+        renew_fraction: fraction of a lease's duration after which to renew it
+        jitter: maximum random change of each renewal delay, as a fraction
+        increment: seconds of extension to request on renewal, Vault's
+            default if not given
+        min_ttl: fetch new credentials rather than renew once a renewal
+            grants less than this many seconds
+        retry_interval: seconds to wait after a failed renewal or fetch
+        tick: timer wheel resolution in seconds
+        max_workers: maximum number of renewals in flight
+        clock: monotonic time source, overridable for tests
+    """
+
+    def __init__(
+        self,
+        client: VaultClient,
+        renew_fraction: float = 2 / 3,
+        jitter: float = 0.1,
+        increment: Optional[int] = None,
+        min_ttl: float = 10.0,
+        retry_interval: float = 5.0,
+        tick: float = 1.0,
+        max_workers: int = 4,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not 0 < renew_fraction < 1:
+            raise ValueError("renew_fraction must be between 0 and 1")
+        if not 0 <= jitter < 1:
+            raise ValueError("jitter must be at least 0 and below 1")
+        self.client = client
+        self.renew_fraction = renew_fraction
+        self.jitter = jitter
+        self.increment = increment
+        self.min_ttl = min_ttl
+        self.retry_interval = retry_interval
+        self.max_workers = max_workers
+        self._clock = clock
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _Entry] = {}
+        #: replaced leases by ID, left to expire unless revoked on :meth:`stop`
+        self._superseded: Dict[str, Lease] = {}
+        self.wheel = TimerWheel(tick=tick, start=clock())
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def __enter__(self) -> "LeaseManager":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _schedule(self, name: str, lease: Lease) -> None:
+        if not lease.duration:
+            return
+        delay = lease.duration * self.renew_fraction
+        delay *= 1 + self._random.uniform(-self.jitter, self.jitter)
+        self.wheel.schedule(name, lease.issued_at + delay)
+
+    def _retry(self, name: str, lease: Lease) -> None:
+        """Try again later, but drop the lease once it has expired."""
+        now = self._clock()
+        expires_at = lease.expires_at
+        if expires_at is not None and now >= expires_at:
+            logger.warning("Lease %s for %s expired", lease.lease_id, name)
+            self._forget(name, lease)
+            return
+        self.wheel.schedule(name, now + self.retry_interval)
+
+    def _supersede(self, lease: Lease) -> None:
+        """Remember a replaced lease so it can be revoked. Call with the lock
+        held."""
+        now = self._clock()
+        self._superseded = {
+            lease_id: old
+            for lease_id, old in self._superseded.items()
+            if old.expires_at is None or old.expires_at > now
+        }
+        self._superseded[lease.lease_id] = lease
+
+    def _forget(self, name: str, lease: Lease) -> None:
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry.lease.lease_id == lease.lease_id:
+                del self._entries[name]
+                self.wheel.cancel(name)
+
+    def track(
+        self,
+        response: VaultResponse,
+        name: Optional[str] = None,
+        fetch: Optional[FetchCallable] = None,
+    ) -> Lease:
+        """Start managing the lease of a response.
+
+        Args:
+            response: response with a ``lease_id``
+            name: name to get the credentials by, the lease ID if not given.
+                An existing lease with the same name is replaced.
+            fetch: optional callable returning a response with a new lease,
+                used when the lease can no longer be renewed
+
+        Raises:
+            ValueError: Raised if the response has no lease.
+        """
+        lease = Lease.from_response(response, self._clock())
+        name = lease.lease_id if name is None else name
+        with self._lock:
+            old = self._entries.get(name)
+            if old is not None and old.lease.lease_id != lease.lease_id:
+                self._supersede(old.lease)
+            self._entries[name] = _Entry(lease, fetch)
+        self._schedule(name, lease)
+        return lease
+
+    def register(self, name: str, fetch: FetchCallable) -> Lease:
+        """Fetch credentials now and keep them valid.
+
+        Raises:
+            LeaseException: Raised if the credentials cannot be fetched.
+            ValueError: Raised if the response has no lease.
+        """
+        try:
+            response = fetch()
+        except VaultClientException as err:
+            raise LeaseException(
+                f"Failed to fetch credentials for {name}: {err.message}",
+                status_code=err.status_code,
+            )
+        return self.track(response, name=name, fetch=fetch)
+
+    def lease(self, name: str) -> Optional[Lease]:
+        """The current lease for a name, ``None`` if there is none."""
+        entry = self._entries.get(name)
+        return entry.lease if entry is not None else None
+
+    def credentials(self, name: str) -> Dict[str, Any]:
+        """Return the newest valid credentials for a name without blocking.
+
+        Raises:
+            LeaseException: Raised if there is no unexpired lease for the name.
+        """
+        lease = self.lease(name)
+        if lease is None:
+            raise LeaseException(f"No lease for {name}")
+        expires_at = lease.expires_at
+        if expires_at is not None and self._clock() >= expires_at:
+            raise LeaseException(f"Lease {lease.lease_id} for {name} has expired")
+        return lease.data
+
+    def renew(self, name: str) -> Lease:
+        """Renew a lease now and reschedule it.
+
+        Raises:
+            LeaseException: Raised if the lease is unknown or cannot be renewed.
+        """
+        lease = self.lease(name)
+        if lease is None:
+            raise LeaseException(f"No lease for {name}")
+        payload: Dict[str, Any] = {"lease_id": lease.lease_id}
+        if self.increment is not None:
+            payload["increment"] = self.increment
+        try:
+            body = self.client.put("/v1/sys/leases/renew", data=payload).response
+        except VaultClientException as err:
+            raise LeaseException(
+                f"Failed to renew lease {lease.lease_id}: {err.message}",
+                status_code=err.status_code,
+            )
+        renewed = lease._replace(
+            duration=int(body.get("lease_duration") or 0),
+            renewable=bool(body.get("renewable")),
+            issued_at=self._clock(),
+        )
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry.lease.lease_id != lease.lease_id:
+                return renewed
+            self._entries[name] = entry._replace(lease=renewed)
+        self._schedule(name, renewed)
+        return renewed
+
+    def revoke(self, name: str) -> None:
+        """Revoke a lease and stop managing it.
+
+        Raises:
+            LeaseException: Raised if the lease cannot be revoked.
+        """
+        with self._lock:
+            entry = self._entries.pop(name, None)
+        self.wheel.cancel(name)
+        if entry is not None:
+            self._revoke_lease(entry.lease.lease_id)
+
+    def _revoke_lease(self, lease_id: str) -> None:
+        try:
+            self.client.put("/v1/sys/leases/revoke", data={"lease_id": lease_id})
+        except VaultClientException as err:
+            raise LeaseException(
+                f"Failed to revoke lease {lease_id}: {err.message}",
+                status_code=err.status_code,
+            )
+
+    def refresh(self, name: str) -> None:
+        """Renew a lease, or replace it with fetched credentials, as needed.
+
+        Failures are logged and retried after ``retry_interval``.
+        """
+        entry = self._entries.get(name)
+        if entry is None:
+            return
+        lease = entry.lease
+        if lease.renewable:
+            try:
+                renewed = self.renew(name)
+            except LeaseException:
+                logger.warning("Failed to renew lease %s for %s", lease.lease_id, name)
+            else:
+                if entry.fetch is None or renewed.duration >= self.min_ttl:
+                    return
+                lease = renewed
+        if entry.fetch is None:
+            self._retry(name, lease)
+            return
+        try:
+            fresh = Lease.from_response(entry.fetch(), self._clock())
+        except (VaultClientException, ValueError):
+            logger.warning("Failed to fetch new credentials for %s", name)
+            self._retry(name, lease)
+            return
+        with self._lock:
+            current = self._entries.get(name)
+            if current is None:
+                return
+            self._supersede(current.lease)
+            self._entries[name] = _Entry(fresh, entry.fetch)
+        self._schedule(name, fresh)
+
+    def tick(self) -> List[str]:
+        """Refresh every lease that is due and return their names."""
+        due = [str(name) for name in self.wheel.advance(self._clock())]
+        if not due:
+            return due
+        executor = self._executor
+        if executor is None:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                list(pool.map(self.refresh, due))
+        else:
+            list(executor.map(self.refresh, due))
+        return due
+
+    def start(self) -> None:
+        """Start renewing leases in a background thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self._thread = threading.Thread(
+            target=self._run, name="snek-lease-manager", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.wheel.tick):
+            try:
+                self.tick()
+            except Exception:
+                logger.exception("Lease renewal round failed")
+
+    def stop(self, revoke: bool = True) -> None:
+        """Stop renewing and, by default, revoke every lease still tracked and
+        every replaced lease that has not expired."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if revoke:
+
+            def _revoke(name: str) -> None:
+                try:
+                    self.revoke(name)
+                except LeaseException:
+                    logger.warning("Failed to revoke the lease for %s", name)
+
+            def _revoke_superseded(lease: Lease) -> None:
+                try:
+                    self._revoke_lease(lease.lease_id)
+                except LeaseException:
+                    logger.warning("Failed to revoke replaced lease %s", lease.lease_id)
+
+            now = self._clock()
+            with self._lock:
+                names = list(self._entries)
+                superseded = [
+                    lease
+                    for lease in self._superseded.values()
+                    if lease.expires_at is None or lease.expires_at > now
+                ]
+                self._superseded = {}
+            if names or superseded:
+                with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                    list(pool.map(_revoke, names))
+                    list(pool.map(_revoke_superseded, superseded))
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
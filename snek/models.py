@@ -1,30 +1,67 @@
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Union
 
-from .constants import HttpStatusCode
+from .constants import SUCCESS_STATUS_CODES, HttpStatusCode, lookup_status_code
 
 
 class VaultResponse:
-    """Base wrapper class for responses from Vault."""
+    """Base wrapper class for responses from Vault.
+
+    The JSON body can be supplied already decoded as ``response`` or as a
+    ``loader`` callable, in which case it is only decoded the first time
+    :attr:`response` is accessed. The undecoded body can be kept as ``raw`` for
+    consumers that decode only part of it; it is dropped once the whole body
+    has been decoded.
+    """
+
+    __slots__ = ("_response", "_loader", "_status_code", "_code", "errors", "raw")
 
     def __init__(
         self,
-        response: Dict[str, Any],
+        response: Optional[Dict[str, Any]],
         status_code: Union[HttpStatusCode, int],
         errors: Optional[List[str]] = None,
+        loader: Optional[Callable[[], Dict[str, Any]]] = None,
+        raw: Optional[bytes] = None,
     ):
-        self.response = response
-        if isinstance(status_code, HttpStatusCode):
-            self.status_code = status_code
-        else:
-            self.status_code = HttpStatusCode(status_code)
+        self._response = response
+        self._loader = loader
+        #: undecoded body, until :attr:`response` is first accessed
+        self.raw = raw
+        self.status_code = status_code
         self.errors = errors
 
+    @property
+    def status_code(self) -> Union[HttpStatusCode, int]:
+        """Status of the response, a plain ``int`` for codes Vault doesn't use."""
+        return self._status_code
+
+    @status_code.setter
+    def status_code(self, value: Union[HttpStatusCode, int]) -> None:
+        if isinstance(value, HttpStatusCode):
+            self._status_code: Union[HttpStatusCode, int] = value
+            self._code: int = value.value
+        else:
+            self._status_code = lookup_status_code(value)
+            self._code = value
+
+    @property
+    def response(self) -> Dict[str, Any]:
+        """Decoded JSON body of the response."""
+        # Read the loader once so threads sharing a response can't race on it.
+        loader = self._loader
+        if loader is not None:
+            self._response = loader()
+            self._loader = None
+            self.raw = None
+        return self._response  # type: ignore
+
+    @response.setter
+    def response(self, value: Dict[str, Any]) -> None:
+        self._response = value
+        self._loader = None
+        self.raw = None
+
     @property
     def ok(self) -> bool:
         """Return whether status errors exist."""
-        return self.status_code in [
-            HttpStatusCode.SUCCESS_DATA,
-            HttpStatusCode.SUCCESS_NO_DATA,
-            HttpStatusCode.HEALTH_PERFORMANCE_STANDBY_NODE,
-            HttpStatusCode.HEALTH_STANDBY_NODE,
-        ]
+        return self._code in SUCCESS_STATUS_CODES
@@ -0,0 +1,256 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, cast
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError as err:  # pragma: no cover
+    raise ImportError(
+        "PersistentSecretCache requires cryptography. "
+        "Install it with `pip install snek[persistent]`."
+    ) from err
+
+from .cache import CacheKey, SecretCache
+from .constants import HttpStatusCode
+from .exceptions import SecretReadException
+from .models import VaultResponse
+from .secrets import KVSecretV2, KVSecretV2API
+
+logger = logging.getLogger(__name__)
+
+_FORMAT_VERSION = 1
+
+
+def generate_key() -> bytes:
+    """Generate a new key for :class:`PersistentSecretCache`."""
+    return Fernet.generate_key()
+
+
+class RevalidationResult(NamedTuple):
+    """Outcome of :meth:`PersistentSecretCache.revalidate`."""
+
+    #: entries still at the current version
+    unchanged: int
+    #: entries re-read because Vault has a newer version
+    updated: int
+    #: entries dropped because the secret no longer exists
+    removed: int
+    #: entries that could not be checked and were left to expire
+    failed: int
+
+
+class PersistentSecretCache(SecretCache):
+    """:class:`snek.cache.SecretCache` that survives restarts in an encrypted file.
+
+    Entries loaded from ``path`` are served straight away, so a freshly started
+    worker does not have to wait on Vault. They are then checked with
+    :meth:`revalidate`, usually in the background via
+    :meth:`start_revalidation`, which compares each unpinned entry against the
+    KV2 metadata ``current_version`` and re-reads only the secrets that changed.
+
+    The file is encrypted and authenticated with Fernet using ``key``, written
+    atomically with owner-only permissions, and ignored with a warning if it
+    cannot be decrypted. It is written by :meth:`flush`, at the end of
+    :meth:`revalidate` and when the cache is used as a context manager.
+
+    Example::
+
+        cache = PersistentSecretCache("/var/cache/app/secrets", key)
+        api = KVSecretV2API(client, cache=cache)
+        cache.start_revalidation(api)
+
+    Args:
+        path: file the cache is stored in
+        key: Fernet key, see :func:`generate_key`
+        max_size: maximum number of entries held
+        ttl: time to live in seconds for unpinned reads, including those loaded
+            from disk
+        max_age: ignore a file written more than this many seconds ago,
+            ``None`` to always load it
+        clock: monotonic time source, overridable for tests
+    """
+
+    def __init__(
+        self,
+        path: str,
+        key: bytes,
+        max_size: int = 1024,
+        ttl: float = 60.0,
+        max_age: Optional[float] = 24 * 60 * 60,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__(max_size=max_size, ttl=ttl, clock=clock)
+        self.path = path
+        self.max_age = max_age
+        self._fernet = Fernet(key)
+        self._file_lock = threading.Lock()
+        #: unpinned keys loaded from disk and not yet revalidated
+        self._unverified: Set[CacheKey] = set()
+        self.load()
+
+    def __enter__(self) -> "PersistentSecretCache":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.flush()
+
+    def load(self) -> int:
+        """Load entries from the file, returning how many were loaded."""
+        try:
+            with open(self.path, "rb") as fp:
+                token = fp.read()
+        except FileNotFoundError:
+            return 0
+        try:
+            document = json.loads(self._fernet.decrypt(token))
+        except (InvalidToken, ValueError):
+            logger.warning("Ignoring unreadable secret cache file %s", self.path)
+            return 0
+        if document.get("format") != _FORMAT_VERSION:
+            return 0
+        if (
+            self.max_age is not None
+            and time.time() - document.get("stored_at", 0) > self.max_age
+        ):
+            return 0
+
+        entries = document.get("entries", [])
+        for mount_path, path, version, data in entries:
+            secret = KVSecretV2(
+                path=path,
+                version=version,
+                vault_response=VaultResponse({"data": data}, 200),
+            )
+            key = (mount_path, path, version)
+            self.set(key, secret)
+            if version is None:
+                with self._lock:
+                    self._unverified.add(key)
+        return len(entries)
+
+    def flush(self) -> None:
+        """Write the current entries to the file."""
+        with self._lock:
+            entries = [
+                [*cast(CacheKey, key), value.data]
+                for key, (value, _) in self._entries.items()
+                if getattr(value, "data", None) is not None
+            ]
+        document = {
+            "format": _FORMAT_VERSION,
+            "stored_at": time.time(),
+            "entries": entries,
+        }
+        token = self._fernet.encrypt(json.dumps(document).encode())
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with self._file_lock:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".snek-cache-")
+            try:
+                with os.fdopen(fd, "wb") as fp:
+                    fp.write(token)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+    def set(self, key: CacheKey, value: Any, ttl: Optional[float] = None) -> None:
+        super().set(key, value, ttl=ttl)
+        with self._lock:
+            self._unverified.discard(key)
+
+    def invalidate(self, mount_path: str, path: str) -> None:
+        super().invalidate(mount_path, path)
+        with self._lock:
+            self._unverified.discard((mount_path, path, None))
+
+    def clear(self) -> None:
+        super().clear()
+        with self._lock:
+            self._unverified.clear()
+
+    def _revalidate_one(self, api: KVSecretV2API, key: CacheKey) -> str:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return "removed"
+        secret: KVSecretV2 = entry[0]
+        path = key[1]
+        try:
+            current = api.current_version(path)
+        except SecretReadException as err:
+            if err.status_code == HttpStatusCode.INVALID_PATH:
+                self._invalidate_layers(api, key)
+                return "removed"
+            return "failed"
+        if secret.version == current:
+            # Still current: restart the TTL without going back to Vault.
+            self.set(key, secret)
+            return "unchanged"
+        try:
+            # Also stores it in ``api``'s cache when that is another layer.
+            fresh = api.read(path, use_cache=False)
+        except SecretReadException:
+            self._invalidate_layers(api, key)
+            return "removed"
+        self.set(key, fresh)
+        return "updated"
+
+    def _invalidate_layers(self, api: KVSecretV2API, key: CacheKey) -> None:
+        """Drop an entry from this cache and from ``api``'s, if that is another."""
+        self.invalidate(key[0], key[1])
+        if api.cache is not None and api.cache is not self:
+            api.cache.invalidate(key[0], key[1])
+
+    def revalidate(
+        self, api: KVSecretV2API, max_concurrency: int = 8
+    ) -> RevalidationResult:
+        """Check entries loaded from disk against Vault, then flush.
+
+        Only unpinned entries for ``api``'s mount that have not been fetched
+        from Vault or written since loading are checked; pinned versions are
+        immutable.
+
+        Args:
+            api: API the cache is attached to
+            max_concurrency: maximum number of metadata requests in flight
+        """
+        with self._lock:
+            keys = [key for key in self._unverified if key[0] == api.mount_path]
+        counts: Dict[str, int] = {}
+        if keys:
+            workers = min(max_concurrency, len(keys))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                outcomes: List[str] = list(
+                    executor.map(lambda key: self._revalidate_one(api, key), keys)
+                )
+            for outcome in outcomes:
+                counts[outcome] = counts.get(outcome, 0) + 1
+        self.flush()
+        return RevalidationResult(
+            unchanged=counts.get("unchanged", 0),
+            updated=counts.get("updated", 0),
+            removed=counts.get("removed", 0),
+            failed=counts.get("failed", 0),
+        )
+
+    def start_revalidation(
+        self, api: KVSecretV2API, max_concurrency: int = 8
+    ) -> threading.Thread:
+        """Run :meth:`revalidate` on a background thread and return it."""
+
+        def _run() -> None:
+            try:
+                self.revalidate(api, max_concurrency=max_concurrency)
+            except Exception:
+                logger.exception("Secret cache revalidation failed")
+
+        thread = threading.Thread(
+            target=_run, name="snek-cache-revalidate", daemon=True
+        )
+        thread.start()
+        return thread
@@ -0,0 +1,78 @@
+import threading
+import time
+from typing import Callable, Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting the rate of some operation.
+
+    Tokens accrue at ``rate`` per second up to ``burst``. :meth:`acquire`
+    reserves tokens immediately, letting the balance go negative, and sleeps
+    outside the lock until the reservation is covered, so waiters are served in
+    the order they arrived.
+
+    Args:
+        rate: tokens added per second
+        burst: maximum tokens that can accrue, at least 1, defaults to ``rate``
+            or 1 if that is lower
+
+    Raises:
+        ValueError: Raised if ``rate`` is not positive or ``burst`` is below 1,
+            as a bucket that can never hold a whole token would block forever.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        if self.burst < 1:
+            raise ValueError("burst must be at least 1")
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = clock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Take ``tokens`` and return the seconds to wait before using them."""
+        with self._lock:
+            self._refill(self._clock())
+            self._tokens -= tokens
+            return max(-self._tokens / self.rate, 0.0)
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until ``tokens`` would be available, without taking them."""
+        with self._lock:
+            self._refill(self._clock())
+            return max((tokens - self._tokens) / self.rate, 0.0)
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take ``tokens`` only if they are available right now."""
+        with self._lock:
+            self._refill(self._clock())
+            if self._tokens < tokens:
+                return False
+            self._tokens -= tokens
+            return True
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Take ``tokens``, blocking until they are available.
+
+        Returns:
+            Seconds spent waiting.
+        """
+        delay = self.reserve(tokens)
+        if delay:
+            self._sleep(delay)
+        return delay
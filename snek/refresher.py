@@ -0,0 +1,166 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .cache import SecretCache
+from .exceptions import SecretReadException
+from .secrets import KVSecretV2, KVSecretV2API
+
+logger = logging.getLogger(__name__)
+
+#: Called as ``callback(path, new_secret, old_secret)`` when a version changes
+ChangeCallback = Callable[[str, KVSecretV2, KVSecretV2], None]
+
+
+class SecretRefresher:
+    """Keep a set of hot secrets fresh in the background.
+
+    Registered paths are checked every ``interval`` seconds on a bounded worker
+    pool, downloading the data only when the KV2 metadata reports a new
+    version. :meth:`get` never touches the network: it returns the last secret that
+    was read successfully, so a slow or failing Vault only makes values stale.
+
+    Example::
+
+        refresher = SecretRefresher(KVSecretV2API(client), interval=30)
+        refresher.register("app/db", on_change=rotate_pool)
+        refresher.start()
+        password = refresher.get("app/db").value["password"]
+
+    Args:
+        api: KV2 API used for reads
+        interval: seconds between refresh rounds
+        max_workers: maximum number of reads in flight during a round
+        on_error: optional callback receiving ``(path, exception)`` when a
+            refresh fails
+        caches: further cache layers, such as a persistent or shared cache,
+            that refreshed secrets are written through to. ``api.cache`` is
+            always updated by the read itself.
+    """
+
+    def __init__(
+        self,
+        api: KVSecretV2API,
+        interval: float = 30.0,
+        max_workers: int = 4,
+        on_error: Optional[Callable[[str, Exception], None]] = None,
+        caches: Iterable[SecretCache] = (),
+    ):
+        self.api = api
+        self.interval = interval
+        self.max_workers = max_workers
+        self.on_error = on_error
+        self.caches: List[SecretCache] = [c for c in caches if c is not api.cache]
+        self._lock = threading.Lock()
+        self._callbacks: Dict[str, Optional[ChangeCallback]] = {}
+        self._secrets: Dict[str, KVSecretV2] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def __enter__(self) -> "SecretRefresher":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def register(self, path: str, on_change: Optional[ChangeCallback] = None) -> None:
+        """Start refreshing a path.
+
+        Args:
+            path: secret path relative to the API's mount
+            on_change: called when the KV2 metadata version of the path changes
+        """
+        with self._lock:
+            self._callbacks[path] = on_change
+
+    def unregister(self, path: str) -> None:
+        """Stop refreshing a path and forget its value."""
+        with self._lock:
+            self._callbacks.pop(path, None)
+            self._secrets.pop(path, None)
+
+    def get(self, path: str) -> Optional[KVSecretV2]:
+        """Return the last good value for a path without blocking.
+
+        Returns ``None`` if the path has not been read successfully yet.
+        """
+        return self._secrets.get(path)
+
+    def refresh(self, paths: Optional[Iterable[str]] = None) -> None:
+        """Run one refresh round and wait for it to finish.
+
+        Args:
+            paths: paths to refresh, all registered paths if not given
+        """
+        with self._lock:
+            targets = list(self._callbacks if paths is None else paths)
+        if not targets:
+            return
+        executor = self._executor
+        if executor is None:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                list(pool.map(self._refresh_one, targets))
+        else:
+            list(executor.map(self._refresh_one, targets))
+
+    def _refresh_one(self, path: str) -> None:
+        try:
+            secret = self.api.read_if_changed(path, self._secrets.get(path))
+        except SecretReadException as err:
+            logger.warning("Failed to refresh %s, serving last good value", path)
+            if self.on_error is not None:
+                self.on_error(path, err)
+            return
+        if secret is None:
+            return
+        for cache in self.caches:
+            cache.set((self.api.mount_path, path, None), secret)
+
+        with self._lock:
+            if path not in self._callbacks:
+                return
+            previous = self._secrets.get(path)
+            self._secrets[path] = secret
+            callback = self._callbacks[path]
+
+        if (
+            callback is not None
+            and previous is not None
+            and previous.version != secret.version
+        ):
+            try:
+                callback(path, secret, previous)
+            except Exception:
+                logger.exception("Change callback for %s failed", path)
+
+    def start(self) -> None:
+        """Load every registered path once, then keep refreshing in a thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self.refresh()
+        self._thread = threading.Thread(
+            target=self._run, name="snek-secret-refresher", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Secret refresh round failed")
+
+    def stop(self) -> None:
+        """Stop the background thread and release the worker pool."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
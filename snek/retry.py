@@ -0,0 +1,121 @@
+import random
+from typing import Callable, FrozenSet, Iterable, NamedTuple, Optional, Union
+
+from .constants import HttpMethod, HttpStatusCode
+
+#: Status codes Vault returns for transient failures such as leader elections
+DEFAULT_RETRY_STATUSES = frozenset(
+    {
+        HttpStatusCode.INTERNAL_SERVER_ERROR,
+        HttpStatusCode.THIRD_PARTY_ERROR,
+        HttpStatusCode.VAULT_MAINTENANCE,
+    }
+)
+
+#: Idempotent methods that are safe to retry by default
+DEFAULT_RETRY_METHODS = frozenset(
+    {HttpMethod.GET.value, HttpMethod.HEAD.value, HttpMethod.LIST.value}
+)
+
+
+class RetryEvent(NamedTuple):
+    """Passed to :attr:`RetryPolicy.on_retry` before each backoff sleep."""
+
+    #: HTTP method of the request being retried
+    method: str
+    #: number of the attempt that just failed, starting at 1
+    attempt: int
+    #: seconds the client will sleep before the next attempt
+    delay: float
+    #: status code of the failed attempt, ``None`` for connection errors
+    status_code: Optional[Union[HttpStatusCode, int]]
+
+
+class RetryPolicy:
+    """Retry transient Vault errors with exponential backoff and full jitter.
+
+    The delay before attempt ``n + 1`` is drawn uniformly from
+    ``[0, min(backoff_max, backoff_base * 2 ** (n - 1))]``.
+
+    Args:
+        max_attempts: total attempts per call, including the first
+        backoff_base: upper bound in seconds of the first backoff
+        backoff_max: cap in seconds on any single backoff
+        deadline: give up once this many seconds have passed since the first
+            attempt, or would pass during the next backoff
+        retry_statuses: status codes that are considered transient
+        retry_methods: HTTP methods that may be retried. Defaults to idempotent
+            reads only, so a ``POST`` is never sent twice unless asked for.
+        retry_connection_errors: also retry when no response was received
+        on_retry: metrics hook called with a :class:`RetryEvent` before sleeping
+        rng: source of random floats in ``[0, 1)``, overridable for tests
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        backoff_base: float = 0.1,
+        backoff_max: float = 5.0,
+        deadline: Optional[float] = None,
+        retry_statuses: Iterable[Union[HttpStatusCode, int]] = DEFAULT_RETRY_STATUSES,
+        retry_methods: Iterable[Union[HttpMethod, str]] = DEFAULT_RETRY_METHODS,
+        retry_connection_errors: bool = True,
+        on_retry: Optional[Callable[[RetryEvent], None]] = None,
+        rng: Callable[[], float] = random.random,
+    ):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.deadline = deadline
+        self.retry_statuses: FrozenSet[int] = frozenset(
+            code.value if isinstance(code, HttpStatusCode) else code
+            for code in retry_statuses
+        )
+        self.retry_methods: FrozenSet[str] = frozenset(str(m) for m in retry_methods)
+        self.retry_connection_errors = retry_connection_errors
+        self.on_retry = on_retry
+        self._rng = rng
+
+    def backoff(self, attempt: int) -> float:
+        """Return a jittered delay to wait after a failed ``attempt``."""
+        ceiling = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        return ceiling * self._rng()
+
+    def is_retryable(
+        self, method: str, status_code: Optional[Union[HttpStatusCode, int]]
+    ) -> bool:
+        """Return whether a failure of this method and status may be retried."""
+        if method not in self.retry_methods:
+            return False
+        if status_code is None:
+            return self.retry_connection_errors
+        return getattr(status_code, "value", status_code) in self.retry_statuses
+
+    def next_delay(
+        self,
+        method: str,
+        attempt: int,
+        status_code: Optional[Union[HttpStatusCode, int]],
+        elapsed: float,
+    ) -> Optional[float]:
+        """Decide whether to retry a failed attempt.
+
+        Args:
+            method: HTTP method of the request
+            attempt: number of the attempt that just failed, starting at 1
+            status_code: status code of the failure, ``None`` for connection errors
+            elapsed: seconds since the first attempt started
+
+        Returns:
+            Seconds to sleep before retrying, or ``None`` to give up.
+        """
+        if attempt >= self.max_attempts or not self.is_retryable(method, status_code):
+            return None
+        delay = self.backoff(attempt)
+        if self.deadline is not None and elapsed + delay >= self.deadline:
+            return None
+        if self.on_retry is not None:
+            self.on_retry(RetryEvent(method, attempt, delay, status_code))
+        return delay
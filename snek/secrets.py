@@ -1,22 +1,56 @@
+import contextvars
 import json
-from typing import Any, Dict, Optional
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from enum import Enum
+from typing import (
+    IO,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
 
+from .cache import SecretCache
 from .client import VaultClient
+from .constants import HttpStatusCode, ValueStringMixin
 from .exceptions import (
     KV2SecretException,
     SecretCreateUpdateException,
     SecretReadException,
     VaultClientException,
 )
+from .lazy import LazyValue, index_object
 from .models import VaultResponse
+from .ratelimit import TokenBucket
+
+#: A ``(path, data, cas)`` item for :meth:`KVSecretV2API.write_many`
+WriteItem = Tuple[str, Dict[str, Any], Optional[int]]
+
+
+_UNSET: Any = object()
 
 
 class KVSecretV2:
-    """Representation of a secret returned from the KV2 engine"""
+    """Representation of a secret returned from the KV2 engine
+
+    With ``lazy`` set, the response body is not decoded up front: :attr:`value`
+    is a :class:`snek.lazy.LazyValue` that decodes each key on first access and
+    :meth:`write_value` can stream a key to a file. Accessing :attr:`data`
+    decodes the whole body. Lazy mode needs the raw body, so it falls back to
+    decoding eagerly when the response was already decoded, e.g. by observers.
+    """
+
+    __slots__ = ("path", "version", "vault_response", "_data", "_value", "_raw_data")
 
     #: Vault path
     path: str
-    #: version (if given)
+    #: KV2 version, from the response metadata unless given
     version: Optional[int]
     #: raw response from Vault for secret path
     vault_response: Optional[VaultResponse]
@@ -26,30 +60,160 @@ class KVSecretV2:
         path: str,
         version: Optional[int] = None,
         vault_response: Optional[VaultResponse] = None,
+        lazy: bool = False,
     ):
-        if vault_response is not None:
-            self.vault_response = vault_response
-            self.data = vault_response.response["data"]
-        else:
-            self.data = None
         self.path = path
+        self.vault_response = vault_response
+        self._data: Any = None
+        self._value: Optional[LazyValue] = None
+        self._raw_data: Optional[memoryview] = None
+        metadata = None
+        raw = vault_response.raw if lazy and vault_response is not None else None
+        if isinstance(raw, (bytes, bytearray)):
+            self._data = _UNSET
+            metadata = self._index(raw)
+        elif vault_response is not None:
+            self._data = vault_response.response["data"]
+            # Reads nest the version under ``metadata``, writes return the
+            # metadata itself.
+            if isinstance(self._data, dict):
+                metadata = self._data.get("metadata", self._data)
+        if version is None and vault_response is not None:
+            if isinstance(metadata, dict):
+                version = metadata.get("version")
         self.version = version
 
+    def _index(self, raw: Union[bytes, bytearray]) -> Any:
+        """Locate ``data`` and ``data.data`` in the raw body, decode only
+        ``data.metadata`` and return it."""
+        start, end = index_object(raw)["data"]
+        self._raw_data = memoryview(raw)[start:end]
+        if raw[start : start + 1] != b"{":
+            return None
+        spans = index_object(raw, start)
+        if "data" in spans and raw[spans["data"][0]] == ord("{"):
+            self._value = LazyValue(raw, spans["data"][0])
+        metadata = spans.get("metadata")
+        if metadata is None:
+            return None
+        return json.loads(bytes(raw[metadata[0] : metadata[1]]))
+
+    @property
+    def data(self) -> Any:
+        """The ``data`` block of the response: ``data`` and ``metadata``."""
+        if self._data is _UNSET:
+            self._data = json.loads(bytes(self._raw_data or b"null"))
+        return self._data
+
     @property
-    def value(self) -> Dict[str, Any]:
-        """Value of the secret."""
-        return self.data["data"] if "data" in self.data else None
+    def value(self) -> Mapping[str, Any]:
+        """Value of the secret.
+
+        In lazy mode this is a read-only :class:`snek.lazy.LazyValue`, use
+        ``dict(secret.value)`` where a plain dict is needed, e.g. to serialize it.
+        """
+        if self._value is not None:
+            return self._value
+        return self.data.get("data")
+
+    def write_value(self, key: str, fp: IO[bytes], chunk_size: int = 64 * 1024) -> int:
+        """Write one key of the value to a binary file.
+
+        Strings are written as UTF-8 text, anything else as JSON. In lazy mode
+        the key is decoded ``chunk_size`` bytes at a time, so even a very large
+        value is never held in memory twice.
+
+        Returns:
+            Number of bytes written.
+        """
+        if self._value is not None:
+            return self._value.write_to(key, fp, chunk_size)
+        item = self.value[key]
+        return fp.write((item if isinstance(item, str) else json.dumps(item)).encode())
 
     def __str__(self) -> str:
+        if self._data is _UNSET and self._raw_data is not None:
+            return f"{self.path}: {bytes(self._raw_data).decode()}"
+        # Text output uses the standard library, like error messages, so it
+        # does not depend on which codec is installed.
         return f"{self.path}: {json.dumps(self.data)}"
 
 
+class WriteStatus(ValueStringMixin, Enum):
+    """Outcome of one write in :meth:`KVSecretV2API.write_many`."""
+
+    OK = "ok"
+    #: the ``cas`` value did not match the current version
+    CAS_CONFLICT = "cas_conflict"
+    #: the token may not write the path
+    PERMISSION_DENIED = "permission_denied"
+    #: connection error, rate limiting or a 5xx; retrying may succeed
+    TRANSIENT = "transient"
+    #: any other error, retrying as-is will not help
+    FAILED = "failed"
+
+
+class WriteResult(NamedTuple):
+    """Result of one write in :meth:`KVSecretV2API.write_many`."""
+
+    #: position of the item in the input
+    position: int
+    path: str
+    status: WriteStatus
+    #: version written, for successful writes
+    version: Optional[int] = None
+    error: Optional[SecretCreateUpdateException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status is WriteStatus.OK
+
+    @property
+    def retryable(self) -> bool:
+        """Whether writing the same item again may succeed."""
+        return self.status is WriteStatus.TRANSIENT
+
+
+def _write_status(err: SecretCreateUpdateException) -> WriteStatus:
+    status = getattr(err.status_code, "value", err.status_code)
+    if not isinstance(status, int):
+        return WriteStatus.TRANSIENT
+    # 429 is returned when a rate limit quota is exceeded
+    if status == 429 or status >= 500:
+        return WriteStatus.TRANSIENT
+    if status == HttpStatusCode.FORBIDDEN.value:
+        return WriteStatus.PERMISSION_DENIED
+    if (
+        status == HttpStatusCode.INVALID_REQUEST.value
+        and "check-and-set" in err.message
+    ):
+        return WriteStatus.CAS_CONFLICT
+    return WriteStatus.FAILED
+
+
 class KVSecretV2API:
-    """Instance configured with a client to connect to the KV2 secrets engine."""
+    """Instance configured with a client to connect to the KV2 secrets engine.
 
-    def __init__(self, client: VaultClient, mount_path: str = "secret"):
+    Args:
+        client: client used to talk to Vault
+        mount_path: mount point of the KV2 engine
+        cache: optional :class:`snek.cache.SecretCache` consulted by :meth:`read`
+            and invalidated by :meth:`create_or_update`
+        lazy: return secrets whose value is decoded key by key on access, see
+            :class:`KVSecretV2`
+    """
+
+    def __init__(
+        self,
+        client: VaultClient,
+        mount_path: str = "secret",
+        cache: Optional[SecretCache] = None,
+        lazy: bool = False,
+    ):
 
         self.client = client
+        self.cache = cache
+        self.lazy = lazy
         self.mount_path = f"/v1/{mount_path}"
         self.base_path = f"{self.mount_path}/data"
         self.base_metadata_path = f"{self.mount_path}/metadata"
@@ -70,22 +234,233 @@ class KVSecretV2API:
         except VaultClientException:
             raise KV2SecretException("Failed to configure KV-V2 engine.")
 
-    def read(self, path: str, version: Optional[int] = None) -> Optional[KVSecretV2]:
+    def read(
+        self, path: str, version: Optional[int] = None, use_cache: bool = True
+    ) -> KVSecretV2:
         """Get a secret at a given path.
 
+        Args:
+            path: secret path relative to the mount
+            version: version to read, latest if not given
+            use_cache: consult the cache before going to Vault. The cache is
+                updated with the result either way.
+
         Raises:
-            SecretGetException: Raised if secret not found at path.
+            SecretReadException: Raised if secret not found at path.
         """
+        if use_cache and self.cache is not None:
+            cached = self.cache.get((self.mount_path, path, version))
+            if cached is not None:
+                return cached
         try:
             res = self.client.get(
                 f"{self.base_path}/{path}",
                 params={"version": str(version) if version is not None else version},
             )
-            return KVSecretV2(vault_response=res, path=path)
-        except VaultClientException:
+            secret = KVSecretV2(vault_response=res, path=path, lazy=self.lazy)
+        except VaultClientException as err:
             raise SecretReadException(
-                f"Failed to read secrets at {self.base_path}/{path}"
+                f"Failed to read secrets at {self.base_path}/{path}",
+                status_code=err.status_code,
             )
+        if self.cache is not None:
+            self.cache.set((self.mount_path, path, version), secret)
+        return secret
+
+    def read_metadata(self, path: str) -> Dict[str, Any]:
+        """Get the KV2 metadata of a secret without reading its data.
+
+        Raises:
+            SecretReadException: Raised if the metadata cannot be read.
+        """
+        try:
+            res = self.client.get(f"{self.base_metadata_path}/{path}")
+        except VaultClientException as err:
+            raise SecretReadException(
+                f"Failed to read metadata at {self.base_metadata_path}/{path}",
+                status_code=err.status_code,
+            )
+        return res.response["data"]
+
+    def current_version(self, path: str) -> int:
+        """Get the latest version of a secret from its metadata.
+
+        Raises:
+            SecretReadException: Raised if the metadata cannot be read.
+        """
+        return self.read_metadata(path)["current_version"]
+
+    def read_if_changed(
+        self, path: str, known: Optional[KVSecretV2] = None
+    ) -> Optional[KVSecretV2]:
+        """Read a secret only if its latest version differs from a known one.
+
+        Checks the metadata ``current_version`` first, which is much cheaper
+        than downloading and comparing the data.
+
+        Args:
+            path: secret path relative to the mount
+            known: the secret as last seen, taken from the cache if not given.
+                Without one the secret is read unconditionally.
+
+        Returns:
+            The newly read secret, or ``None`` if ``known`` is still current.
+
+        Raises:
+            SecretReadException: Raised if the secret cannot be read.
+        """
+        if known is None and self.cache is not None:
+            known = self.cache.get((self.mount_path, path, None))
+        if known is None or known.version is None:
+            return self.read(path, use_cache=False)
+        if self.current_version(path) == known.version:
+            if self.cache is not None:
+                # Still current, so restart its TTL.
+                self.cache.set((self.mount_path, path, None), known)
+            return None
+        return self.read(path, use_cache=False)
+
+    def read_many(
+        self, paths: Iterable[str], max_concurrency: int = 8
+    ) -> List[Union[KVSecretV2, SecretReadException]]:
+        """Read many secrets concurrently over the client's shared session.
+
+        Reads run on a thread pool of at most ``max_concurrency`` workers. Keep
+        it at or below the client's connection pool size so workers do not
+        queue for a connection.
+
+        Args:
+            paths: secret paths to read
+            max_concurrency: maximum number of reads in flight
+
+        Returns:
+            One entry per path, in input order: the :class:`KVSecretV2` read, or
+            the :class:`SecretReadException` raised while reading it.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        paths = list(paths)
+        if not paths:
+            return []
+
+        def _read(path: str) -> Union[KVSecretV2, SecretReadException]:
+            try:
+                return self.read(path)
+            except SecretReadException as err:
+                return err
+
+        workers = min(max_concurrency, len(paths))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Each read runs in a copy of the caller's context, so workers
+            # inherit context variables such as the governor priority.
+            futures = [
+                executor.submit(contextvars.copy_context().run, _read, path)
+                for path in paths
+            ]
+            return [future.result() for future in futures]
+
+    def list(self, path: str = "") -> List[str]:
+        """List the keys directly under a path.
+
+        Keys ending in ``/`` are subdirectories. A path with nothing under it
+        returns an empty list.
+
+        Raises:
+            SecretReadException: Raised if the path cannot be listed.
+        """
+        try:
+            res = self.client.list(f"{self.base_metadata_path}/{path}")
+        except VaultClientException as err:
+            if err.status_code == HttpStatusCode.INVALID_PATH:
+                return []
+            raise SecretReadException(
+                f"Failed to list secrets at {self.base_metadata_path}/{path}",
+                status_code=err.status_code,
+            )
+        return res.response["data"]["keys"]
+
+    def walk(
+        self,
+        prefix: str = "",
+        max_depth: Optional[int] = None,
+        include_secrets: bool = False,
+        max_concurrency: int = 8,
+    ) -> Iterator[Union[str, Tuple[str, Union[KVSecretV2, SecretReadException]]]]:
+        """Recursively walk the metadata tree under a prefix.
+
+        Subdirectories are listed concurrently on a pool of ``max_concurrency``
+        workers and leaf paths are yielded as soon as their directory has been
+        listed, so the full tree is never held in memory. Keys are taken from
+        fetched listings only as workers free up, innermost directory first,
+        so wide trees do not build up a queue of paths. Results are yielded in
+        completion order, not sorted.
+
+        Args:
+            prefix: directory to start from, relative to the mount
+            max_depth: do not descend more than this many levels below
+                ``prefix``. ``1`` yields only the keys directly under it.
+            include_secrets: read each leaf and yield ``(path, secret)`` pairs,
+                where a failed read is yielded as its
+                :class:`SecretReadException`
+            max_concurrency: maximum number of LIST and read requests in flight
+
+        Raises:
+            SecretReadException: Raised if a directory cannot be listed.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if prefix and not prefix.endswith("/"):
+            prefix = f"{prefix}/"
+
+        def _read(path: str) -> Union[KVSecretV2, SecretReadException]:
+            try:
+                return self.read(path)
+            except SecretReadException as err:
+                return err
+
+        # Listings whose children have not all been taken yet, innermost last.
+        # Children are taken lazily and only while a worker is free, so the
+        # frontier is at most one listing per level per in-flight LIST.
+        listings: List[Tuple[str, int, Iterator[str]]] = []
+        pending: Dict[Future, Tuple[str, Optional[int]]] = {}
+        executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        try:
+            context = contextvars.copy_context()
+            pending[executor.submit(context.run, self.list, prefix)] = (prefix, 1)
+            while listings or pending:
+                while len(pending) < max_concurrency and listings:
+                    directory, level, keys = listings[-1]
+                    key = next(keys, None)
+                    if key is None:
+                        listings.pop()
+                        continue
+                    child = f"{directory}{key}"
+                    context = contextvars.copy_context()
+                    if not key.endswith("/"):
+                        if include_secrets:
+                            pending[executor.submit(context.run, _read, child)] = (
+                                child,
+                                None,
+                            )
+                        else:
+                            yield child
+                    elif max_depth is None or level < max_depth:
+                        pending[executor.submit(context.run, self.list, child)] = (
+                            child,
+                            level + 1,
+                        )
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, depth = pending.pop(future)
+                    if depth is None:
+                        yield path, future.result()
+                    else:
+                        listings.append((path, depth, iter(future.result())))
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
 
     def create_or_update(
         self,
@@ -104,7 +479,75 @@ class KVSecretV2API:
         try:
             res = self.client.post(f"{self.base_path}/{path}", data=payload)
             return KVSecretV2(path=path, vault_response=res)
-        except VaultClientException:
+        except VaultClientException as err:
             raise SecretCreateUpdateException(
-                f"Failed to create or update secret at {self.base_path}/{path}"
+                f"Failed to create or update secret at {self.base_path}/{path}: "
+                f"{err.message}",
+                status_code=err.status_code,
             )
+        finally:
+            if self.cache is not None:
+                self.cache.invalidate(self.mount_path, path)
+
+    def write_many(
+        self,
+        items: Iterable[WriteItem],
+        max_concurrency: int = 8,
+        rate_limit: Optional[float] = None,
+    ) -> Iterator[WriteResult]:
+        """Create or update many secrets concurrently.
+
+        Items are pulled from ``items`` only as workers free up, so a large
+        generator is never materialized. A failed write does not stop the
+        others; its :class:`WriteResult` says whether it was a CAS conflict, a
+        permission error or a transient failure, so failed items can be retried
+        selectively. Results are yielded in completion order, use
+        :attr:`WriteResult.position` to match them to the input. Nothing is written
+        until the returned iterator is consumed.
+
+        Args:
+            items: ``(path, data, cas)`` tuples, ``cas`` may be ``None``
+            max_concurrency: maximum number of writes in flight
+            rate_limit: maximum writes started per second, unlimited if not given
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        bucket = TokenBucket(rate_limit) if rate_limit is not None else None
+
+        def _write(index: int, item: WriteItem) -> WriteResult:
+            path, data, cas = item
+            if bucket is not None:
+                bucket.acquire()
+            try:
+                secret = self.create_or_update(path, data, cas=cas)
+            except SecretCreateUpdateException as err:
+                return WriteResult(index, path, _write_status(err), error=err)
+            version = (secret.data or {}).get("version")
+            return WriteResult(index, path, WriteStatus.OK, version=version)
+
+        source = enumerate(items)
+        pending: Dict[Future, int] = {}
+        executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        try:
+            exhausted = False
+            while True:
+                while not exhausted and len(pending) < max_concurrency:
+                    try:
+                        index, item = next(source)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    future = executor.submit(
+                        contextvars.copy_context().run, _write, index, item
+                    )
+                    pending[future] = index
+                if not pending:
+                    return
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del pending[future]
+                    yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
@@ -0,0 +1,490 @@
+"""Secret cache shared by all the processes on a host.
+
+A pre-fork server such as gunicorn runs many worker processes that each read
+the same secrets. :class:`SecretCacheServer` holds one copy of each secret and
+serves it over a Unix socket, and :class:`SharedSecretCache` is the cache
+workers plug into :class:`snek.secrets.KVSecretV2API`. A write through any
+worker invalidates the entry for all of them, and the server process is the
+single refresher that keeps hot entries current.
+
+Example gunicorn configuration::
+
+    def on_starting(server):
+        server.secret_cache = SecretCacheServer(
+            "/run/app/secrets.sock", api=KVSecretV2API(VaultClient(addr, token))
+        )
+        server.secret_cache.start()
+
+    def on_exit(server):
+        server.secret_cache.stop()
+
+and in the application::
+
+    api = KVSecretV2API(client, cache=SharedSecretCache("/run/app/secrets.sock"))
+"""
+import io
+import logging
+import os
+import socket
+import socketserver
+import stat
+import struct
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .cache import CacheKey, CacheStats, SecretCache
+from .codec import JSONCodec, get_codec
+from .constants import HttpStatusCode
+from .exceptions import SecretReadException
+from .models import VaultResponse
+from .secrets import KVSecretV2, KVSecretV2API
+
+logger = logging.getLogger(__name__)
+
+# Every message is a 4 byte big-endian length followed by the payload. Requests
+# are a JSON header, followed by the encoded secret for ``set``. Replies to
+# ``get`` are the encoded secret, empty on a miss, replies to ``items`` a JSON
+# array of ``[mount_path, path, version, secret]`` entries, and JSON otherwise.
+# The server keeps secrets encoded and never decodes them.
+_HEADER = struct.Struct(">I")
+_MAX_MESSAGE = 64 * 1024 * 1024
+
+
+def _write_message(sock: socket.socket, payload: bytes) -> None:
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _read_message(fp: io.BufferedIOBase) -> Optional[bytes]:
+    """Read one message, ``None`` if the peer closed the connection."""
+    header = fp.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    (size,) = _HEADER.unpack(header)
+    if size > _MAX_MESSAGE:
+        raise ValueError(f"Message of {size} bytes is too large")
+    payload = fp.read(size)
+    return payload if len(payload) == size else None
+
+
+def _key(value: List[Any]) -> CacheKey:
+    mount_path, path, version = value
+    return (str(mount_path), str(path), int(version) if version is not None else None)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "_UnixServer"
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.owner._lock:
+            self.server.owner._connections.add(self.request)
+
+    def finish(self) -> None:
+        with self.server.owner._lock:
+            self.server.owner._connections.discard(self.request)
+        super().finish()
+
+    def handle(self) -> None:
+        owner = self.server.owner
+        while True:
+            try:
+                request = _read_message(self.rfile)
+                if request is None:
+                    return
+                reply = owner._handle(owner.codec.loads(request), self.rfile)
+                _write_message(self.request, reply)
+            except (OSError, ValueError, KeyError, TypeError) as err:
+                logger.warning("Dropping shared cache connection: %s", err)
+                return
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    owner: "SecretCacheServer"
+
+
+class SecretCacheServer:
+    """Host-local cache daemon for :class:`SharedSecretCache` clients.
+
+    Run one per host, in the pre-fork server's master process or a sidecar.
+    Entries are held in a :class:`snek.cache.SecretCache`. With an ``api``, a
+    background thread re-checks every ``refresh_interval`` seconds the
+    latest-version entries for its mount that were used within the last
+    ``ttl``, via :meth:`snek.secrets.KVSecretV2API.read_if_changed`, so hot
+    secrets are kept current and do not expire under the workers while cold
+    ones are left to expire.
+
+    The socket is created with owner-only permissions; keep it in a directory
+    only the application's user can reach.
+
+    Args:
+        socket_path: path of the Unix socket to listen on
+        api: KV2 API used to refresh entries. It must not have a cache itself.
+        max_size: maximum number of entries held
+        ttl: time to live in seconds for latest-version entries
+        refresh_interval: seconds between refresh rounds, defaults to half of
+            ``ttl``
+        max_workers: maximum number of refresh reads in flight
+        clock: monotonic time source, overridable for tests
+    """
+
+    def __init__(
+        self,
+        socket_path: str,
+        api: Optional[KVSecretV2API] = None,
+        max_size: int = 1024,
+        ttl: float = 60.0,
+        refresh_interval: Optional[float] = None,
+        max_workers: int = 4,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if api is not None and api.cache is not None:
+            raise ValueError("The refresh API must not have a cache")
+        self.socket_path = socket_path
+        self.api = api
+        self.cache = SecretCache(max_size=max_size, ttl=ttl, clock=clock)
+        self.refresh_interval = (
+            ttl / 2 if refresh_interval is None else refresh_interval
+        )
+        self.max_workers = max_workers
+        self.codec = get_codec()
+        self._clock = clock
+        self._lock = threading.Lock()
+        #: last time each entry was read or stored
+        self._used: Dict[CacheKey, float] = {}
+        self._server: Optional[_UnixServer] = None
+        self._connections: Set[socket.socket] = set()
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+
+    def __enter__(self) -> "SecretCacheServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def _touch(self, key: CacheKey) -> None:
+        with self._lock:
+            self._used[key] = self._clock()
+
+    def _handle(self, request: Dict[str, Any], rfile: io.BufferedIOBase) -> bytes:
+        op = request["op"]
+        if op == "get":
+            key = _key(request["key"])
+            entry = self.cache.get(key)
+            if entry is None:
+                return b""
+            self._touch(key)
+            return entry[1]
+        if op == "set":
+            key = _key(request["key"])
+            body = _read_message(rfile)
+            if body is None:
+                raise ValueError("Missing value")
+            self.cache.set(key, (request.get("version"), body), ttl=request.get("ttl"))
+            self._touch(key)
+        elif op == "invalidate":
+            self.cache.invalidate(request["mount_path"], request["path"])
+        elif op == "clear":
+            self.cache.clear()
+        elif op == "stats":
+            return self.codec.dumps(self.cache.stats._asdict())
+        elif op == "items":
+            # Splice the encoded secrets into the reply instead of decoding them.
+            return b"[%s]" % b",".join(
+                b"[%s,%s]" % (self.codec.dumps(list(key))[1:-1], entry[1])
+                for key, entry in self.cache.items()
+            )
+        else:
+            raise ValueError(f"Unknown operation {op!r}")
+        return b"{}"
+
+    def _refresh_one(self, key: CacheKey, entry: Tuple[Optional[int], bytes]) -> str:
+        assert self.api is not None
+        mount_path, path, _ = key
+        known = KVSecretV2(path=path, version=entry[0])
+        try:
+            secret = self.api.read_if_changed(path, known)
+        except SecretReadException as err:
+            if err.status_code == HttpStatusCode.INVALID_PATH:
+                self.cache.invalidate(mount_path, path)
+                return "removed"
+            logger.warning("Failed to refresh %s, leaving it to expire", path)
+            return "failed"
+        if secret is None:
+            # Still current: restart the TTL without downloading it again.
+            self.cache.set(key, entry)
+            return "unchanged"
+        self.cache.set(key, (secret.version, _encode(self.codec, secret)))
+        return "updated"
+
+    def refresh(self) -> Dict[str, int]:
+        """Run one refresh round and wait for it to finish.
+
+        Returns:
+            Number of entries per outcome: ``unchanged``, ``updated``,
+            ``removed`` or ``failed``.
+        """
+        if self.api is None:
+            return {}
+        entries = self.cache.items()
+        horizon = self._clock() - self.cache.ttl
+        with self._lock:
+            # Forget evicted and expired entries.
+            live = {key for key, _ in entries}
+            self._used = {k: t for k, t in self._used.items() if k in live}
+            targets = [
+                (key, entry)
+                for key, entry in entries
+                if key[2] is None
+                and key[0] == self.api.mount_path
+                and self._used.get(key, horizon) > horizon
+            ]
+        counts: Dict[str, int] = {}
+        if targets:
+            workers = min(self.max_workers, len(targets))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for outcome in executor.map(lambda t: self._refresh_one(*t), targets):
+                    counts[outcome] = counts.get(outcome, 0) + 1
+        return counts
+
+    def start(self) -> None:
+        """Listen on the socket and, with an ``api``, start refreshing.
+
+        Raises:
+            OSError: Raised if another server is already listening on the socket.
+        """
+        if self._server is not None:
+            return
+        self._remove_stale_socket()
+        # Created owner-only rather than chmod-ed after listening, which would
+        # leave a window with the default permissions.
+        umask = os.umask(0o177)
+        try:
+            server = _UnixServer(self.socket_path, _Handler)
+        finally:
+            os.umask(umask)
+        server.owner = self
+        self._server = server
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(
+                target=server.serve_forever,
+                args=(0.1,),
+                name="snek-shared-cache-server",
+                daemon=True,
+            )
+        ]
+        if self.api is not None:
+            self._threads.append(
+                threading.Thread(
+                    target=self._run, name="snek-shared-cache-refresher", daemon=True
+                )
+            )
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        """Stop serving, stop refreshing and remove the socket."""
+        server = self._server
+        if server is None:
+            return
+        self._stop.set()
+        server.shutdown()
+        server.server_close()
+        # Disconnect clients so they reconnect to the next server.
+        with self._lock:
+            connections = list(self._connections)
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        for thread in self._threads:
+            thread.join()
+        self._server = None
+        self._threads = []
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Shared cache refresh round failed")
+
+    def _remove_stale_socket(self) -> None:
+        try:
+            mode = os.stat(self.socket_path).st_mode
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(mode):
+            raise OSError(f"{self.socket_path} exists and is not a socket")
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except OSError:
+            os.unlink(self.socket_path)
+            return
+        finally:
+            probe.close()
+        raise OSError(f"A server is already listening on {self.socket_path}")
+
+
+def _encode(codec: JSONCodec, secret: KVSecretV2) -> bytes:
+    return codec.dumps({"version": secret.version, "data": secret.data})
+
+
+def _decode(key: CacheKey, document: Dict[str, Any]) -> KVSecretV2:
+    return KVSecretV2(
+        path=key[1],
+        version=document["version"],
+        vault_response=VaultResponse({"data": document["data"]}, 200),
+    )
+
+
+class SharedSecretCache(SecretCache):
+    """:class:`snek.cache.SecretCache` stored in a :class:`SecretCacheServer`.
+
+    Every operation is a round trip over the server's Unix socket, so all
+    processes see the same entries and a write through any of them
+    invalidates the entry everywhere. Each process opens its own connection,
+    also after a fork. If the server cannot be reached reads are misses and
+    writes are dropped with a warning, so requests fall through to Vault.
+
+    Args:
+        socket_path: path of the server's Unix socket
+        timeout: seconds to wait for the server
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 1.0):
+        super().__init__()
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.codec = get_codec()
+        self._conn_lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._rfile: Optional[io.BufferedIOBase] = None
+        # The connection and its lock must not be shared with forked children.
+        ref = weakref.ref(self)
+        os.register_at_fork(after_in_child=lambda: _reset(ref))
+
+    def __len__(self) -> int:
+        return self.stats.size
+
+    def _after_fork(self) -> None:
+        self._conn_lock = threading.Lock()
+        self._sock = None
+        self._rfile = None
+
+    def _close(self) -> None:
+        if self._rfile is not None:
+            self._rfile.close()
+        if self._sock is not None:
+            self._sock.close()
+        self._sock = None
+        self._rfile = None
+
+    def _request(
+        self, header: Dict[str, Any], body: Optional[bytes] = None
+    ) -> Optional[bytes]:
+        """Send a request and return the reply, ``None`` if the server is down or
+        the reply is malformed."""
+        with self._conn_lock:
+            # Retry once, the server may have restarted since the last request.
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                        sock.settimeout(self.timeout)
+                        try:
+                            sock.connect(self.socket_path)
+                        except OSError:
+                            sock.close()
+                            raise
+                        self._sock, self._rfile = sock, sock.makefile("rb")
+                    assert self._rfile is not None
+                    _write_message(self._sock, self.codec.dumps(header))
+                    if body is not None:
+                        _write_message(self._sock, body)
+                    reply = _read_message(self._rfile)
+                    if reply is None:
+                        raise ConnectionError("Connection closed by the server")
+                    return reply
+                except ValueError as err:
+                    # The connection is out of step with the server, start over.
+                    self._close()
+                    logger.warning(
+                        "Bad reply from shared secret cache %s: %s",
+                        self.socket_path,
+                        err,
+                    )
+                    return None
+                except OSError as err:
+                    self._close()
+                    if attempt:
+                        logger.warning(
+                            "Shared secret cache %s unavailable: %s",
+                            self.socket_path,
+                            err,
+                        )
+        return None
+
+    def get(self, key: CacheKey) -> Optional[KVSecretV2]:
+        """Return the cached secret for a key, or ``None`` on a miss."""
+        reply = self._request({"op": "get", "key": list(key)})
+        if not reply:
+            return None
+        try:
+            return _decode(key, self.codec.loads(reply))
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Bad entry in shared secret cache %s", self.socket_path)
+            return None
+
+    def set(self, key: CacheKey, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a :class:`snek.secrets.KVSecretV2` for every process."""
+        if getattr(value, "data", None) is None:
+            return
+        self._request(
+            {"op": "set", "key": list(key), "version": value.version, "ttl": ttl},
+            _encode(self.codec, value),
+        )
+
+    def invalidate(self, mount_path: str, path: str) -> None:
+        self._request({"op": "invalidate", "mount_path": mount_path, "path": path})
+
+    def items(self) -> List[Tuple[CacheKey, Any]]:
+        """Unexpired entries of the server, least recently used first. Empty if
+        it cannot be reached."""
+        reply = self._request({"op": "items"})
+        if reply is None:
+            return []
+        entries = []
+        for *fields, document in self.codec.loads(reply):
+            key = _key(fields)
+            entries.append((key, _decode(key, document)))
+        return entries
+
+    def clear(self) -> None:
+        self._request({"op": "clear"})
+
+    @property
+    def stats(self) -> CacheStats:
+        """Counters of the server's cache, all zero if it cannot be reached."""
+        reply = self._request({"op": "stats"})
+        if reply is None:
+            return CacheStats(hits=0, misses=0, evictions=0, expirations=0, size=0)
+        return CacheStats(**self.codec.loads(reply))
+
+
+def _reset(ref: "weakref.ReferenceType[SharedSecretCache]") -> None:
+    cache = ref()
+    if cache is not None:
+        cache._after_fork()
@@ -0,0 +1,96 @@
+import threading
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Optional,
+    TypeVar,
+)
+
+if TYPE_CHECKING:  # pragma: no cover
+    import asyncio
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Collapse concurrent identical calls into one.
+
+    While a call for a key is in flight, other threads calling :meth:`do` with
+    the same key wait for it and receive its result, or have its exception
+    raised, instead of making their own call.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        #: number of calls that were served by another thread's in-flight call
+        self.coalesced = 0
+
+    def do(self, key: Hashable, func: Callable[[], T]) -> T:
+        """Run ``func`` unless a call for ``key`` is in flight, then share it."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as err:
+            call.error = err
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """Asyncio counterpart of :class:`SingleFlight` for a single event loop.
+
+    The shared call runs as its own task, so cancelling one waiter does not
+    cancel the request for the others.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        #: number of calls that were served by another coroutine's call
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """Await ``func()`` unless a call for ``key`` is in flight, then share it."""
+        # Imported here: asyncio is slow to import and only coroutines need it,
+        # by which time an event loop has already loaded it.
+        import asyncio
+
+        task = self._tasks.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(func())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return await asyncio.shield(task)
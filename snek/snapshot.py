@@ -0,0 +1,234 @@
+"""Stream KV2 mounts to and from line-delimited JSON snapshot files.
+
+Each line of a snapshot is a JSON object ``{"path", "version", "data"}``.
+Compressed snapshots are a sequence of gzip members, one per batch, which any
+gzip reader decodes as a single stream.
+"""
+import contextvars
+import gzip
+import io
+import json
+import logging
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import IO, Any, Deque, Dict, Iterator, NamedTuple, Optional, Tuple, cast
+
+from .exceptions import SecretCreateUpdateException, SnapshotException
+from .secrets import KVSecretV2, KVSecretV2API
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+class SnapshotResult(NamedTuple):
+    """Outcome of an export or import."""
+
+    #: secrets written to the snapshot or to Vault in this run
+    written: int
+    #: secrets that failed and were skipped
+    skipped: int
+
+
+def _load_checkpoint(path: Optional[str]) -> Dict[str, Any]:
+    if path is None or not os.path.exists(path):
+        return {}
+    with open(path) as fp:
+        return json.load(fp)
+
+
+def _save_checkpoint(path: Optional[str], state: Dict[str, Any]) -> None:
+    if path is None:
+        return
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as fp:
+        json.dump(state, fp)
+    os.replace(tmp, path)
+
+
+def _ordered_leaves(
+    api: KVSecretV2API, directory: str, after: Optional[str]
+) -> Iterator[str]:
+    """Yield leaf paths under a directory in lexicographic order.
+
+    Sorting siblings and descending depth first yields full paths in sorted
+    order, which lets an export resume by skipping everything up to ``after``.
+    """
+    for key in sorted(api.list(directory)):
+        child = f"{directory}{key}"
+        if key.endswith("/"):
+            # Skip subtrees that lie entirely before the checkpoint.
+            if after is None or child > after or after.startswith(child):
+                yield from _ordered_leaves(api, child, after)
+        elif after is None or child > after:
+            yield child
+
+
+def _batches(paths: Iterator[str], size: int) -> Iterator[list]:
+    batch = []
+    for path in paths:
+        batch.append(path)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export_mount(
+    api: KVSecretV2API,
+    snapshot_path: str,
+    prefix: str = "",
+    compress: bool = False,
+    checkpoint_path: Optional[str] = None,
+    max_concurrency: int = 8,
+    batch_size: int = 64,
+    skip_errors: bool = False,
+) -> SnapshotResult:
+    """Export every secret under a prefix to a snapshot file.
+
+    Secrets are read ``batch_size`` at a time with
+    :meth:`KVSecretV2API.read_many` and appended to the file, so memory use is
+    bounded by one batch. After each batch the file offset and last path are
+    saved to ``checkpoint_path``; running the export again with the same
+    checkpoint truncates any partially written batch and carries on from there.
+
+    Args:
+        api: KV2 API to export from
+        snapshot_path: file to write
+        prefix: directory to export, relative to the mount
+        compress: gzip each batch
+        checkpoint_path: file used to record progress, enabling resume
+        max_concurrency: maximum number of reads in flight
+        batch_size: number of secrets read and written per batch
+        skip_errors: log and skip unreadable secrets instead of raising
+
+    Raises:
+        SnapshotException: Raised if a secret cannot be read and ``skip_errors``
+            is not set.
+    """
+    if prefix and not prefix.endswith("/"):
+        prefix = f"{prefix}/"
+    state = _load_checkpoint(checkpoint_path)
+    offset = state.get("offset", 0)
+    after = state.get("path")
+    count = skipped = 0
+
+    with open(snapshot_path, "r+b" if offset else "wb") as fp:
+        fp.truncate(offset)
+        fp.seek(offset)
+        for batch in _batches(_ordered_leaves(api, prefix, after), batch_size):
+            buffer = io.BytesIO()
+            for path, secret in zip(batch, api.read_many(batch, max_concurrency)):
+                if not isinstance(secret, KVSecretV2):
+                    if not skip_errors:
+                        raise SnapshotException(f"Failed to export {path}: {secret}")
+                    logger.warning("Skipping unreadable secret %s", path)
+                    skipped += 1
+                    continue
+                # ``data`` rather than ``value``, which is not a dict in lazy mode.
+                data = secret.data
+                record = {
+                    "path": path,
+                    "version": data.get("metadata", {}).get("version"),
+                    "data": data.get("data"),
+                }
+                buffer.write(json.dumps(record).encode())
+                buffer.write(b"\n")
+                count += 1
+
+            chunk = buffer.getvalue()
+            if compress and chunk:
+                chunk = gzip.compress(chunk)
+            fp.write(chunk)
+            fp.flush()
+            os.fsync(fp.fileno())
+            offset += len(chunk)
+            _save_checkpoint(checkpoint_path, {"offset": offset, "path": batch[-1]})
+
+    return SnapshotResult(written=count, skipped=skipped)
+
+
+def _open_snapshot(snapshot_path: str) -> IO[bytes]:
+    with open(snapshot_path, "rb") as fp:
+        magic = fp.read(2)
+    if magic == GZIP_MAGIC:
+        return cast(IO[bytes], gzip.open(snapshot_path, "rb"))
+    return open(snapshot_path, "rb")
+
+
+def import_mount(
+    api: KVSecretV2API,
+    snapshot_path: str,
+    cas: Optional[int] = None,
+    checkpoint_path: Optional[str] = None,
+    max_concurrency: int = 8,
+    checkpoint_every: int = 64,
+    skip_errors: bool = False,
+) -> SnapshotResult:
+    """Restore a snapshot file into a KV2 mount.
+
+    Records are streamed from the file and written with up to
+    ``max_concurrency`` concurrent :meth:`KVSecretV2API.create_or_update`
+    calls. The number of records completed in file order is saved to
+    ``checkpoint_path`` every ``checkpoint_every`` records, so a rerun with the
+    same checkpoint skips work that is already done.
+
+    Args:
+        api: KV2 API to restore into
+        snapshot_path: snapshot file, compressed or not
+        cas: check-and-set value sent with every write. ``0`` only creates
+            secrets that don't exist yet.
+        checkpoint_path: file used to record progress, enabling resume
+        max_concurrency: maximum number of writes in flight
+        checkpoint_every: records between checkpoint saves
+        skip_errors: log and skip failed writes instead of raising
+
+    Raises:
+        SnapshotException: Raised if a write fails and ``skip_errors`` is not set.
+    """
+    done = _load_checkpoint(checkpoint_path).get("line", 0)
+    count = skipped = 0
+    window: Deque[Tuple[str, Future]] = deque()
+
+    def _drain(until: int) -> None:
+        nonlocal count, skipped, done
+        while len(window) > until:
+            path, future = window.popleft()
+            try:
+                future.result()
+                count += 1
+            except SecretCreateUpdateException as err:
+                if not skip_errors:
+                    raise SnapshotException(f"Failed to import {path}: {err}")
+                logger.warning("Skipping secret %s that failed to import", path)
+                skipped += 1
+            done += 1
+            if done % checkpoint_every == 0:
+                _save_checkpoint(checkpoint_path, {"line": done})
+
+    with _open_snapshot(snapshot_path) as fp, ThreadPoolExecutor(
+        max_workers=max_concurrency
+    ) as executor:
+        try:
+            records = (line for line in fp if line.strip())
+            for number, line in enumerate(records):
+                if number < done:
+                    continue
+                record = json.loads(line)
+                future = executor.submit(
+                    contextvars.copy_context().run,
+                    api.create_or_update,
+                    record["path"],
+                    record["data"],
+                    cas,
+                )
+                window.append((record["path"], future))
+                _drain(max_concurrency)
+            _drain(0)
+        finally:
+            for _, future in window:
+                future.cancel()
+            _save_checkpoint(checkpoint_path, {"line": done})
+    return SnapshotResult(written=count, skipped=skipped)
@@ -0,0 +1,577 @@
+import base64
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from .cache import SecretCache
+from .client import VaultClient
+from .exceptions import TransitException, VaultClientException
+from .singleflight import SingleFlight
+
+#: Plaintext, or ``(plaintext, context)`` for keys with derivation enabled
+PlaintextItem = Union[bytes, Tuple[bytes, Optional[bytes]]]
+#: Ciphertext, or ``(ciphertext, context)`` for keys with derivation enabled
+CiphertextItem = Union[str, Tuple[str, Optional[bytes]]]
+
+# Bytes of JSON around each batch item's values, used to estimate request size.
+_ITEM_OVERHEAD = 32
+
+
+class TransitResult(NamedTuple):
+    """Outcome of one item of a batch operation of :class:`TransitAPI`."""
+
+    #: index of the item in the input
+    position: int
+    #: ciphertext or HMAC as a string, or plaintext as bytes; ``None`` on error
+    value: Optional[Union[str, bytes]]
+    #: version of the key used, when Vault reports it
+    key_version: Optional[int] = None
+    #: error reported by Vault for the item or its whole batch
+    error: Optional[str] = None
+    #: status code when the whole batch failed, ``None`` otherwise
+    status_code: Optional[Any] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class DataKey(NamedTuple):
+    """Data key generated by the transit engine for client-side encryption."""
+
+    #: key to encrypt data with locally
+    plaintext: bytes
+    #: the key wrapped by the transit key, to store alongside the data
+    ciphertext: str
+    #: version of the transit key that wrapped it
+    key_version: Optional[int] = None
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+def _item(field: str, value: str, context: Optional[bytes]) -> Dict[str, str]:
+    item = {field: value}
+    if context is not None:
+        item["context"] = _b64(context)
+    return item
+
+
+def _split(item: Union[PlaintextItem, CiphertextItem]) -> Tuple[Any, Optional[bytes]]:
+    if isinstance(item, tuple):
+        return item
+    return item, None
+
+
+def _unwrapped_id(name: str, ciphertext: str, context: Optional[bytes]) -> str:
+    # The key name and context are part of the identity: the same ciphertext
+    # must not unwrap under another key, or another context with derived keys.
+    # Key names cannot contain "/", so the name ends at the first one.
+    identity = f"{name}/{ciphertext}"
+    return identity if context is None else f"{identity}|{_b64(context)}"
+
+
+def _batch_result(position: int, item: Dict[str, Any], field: str) -> TransitResult:
+    error = item.get("error")
+    if error:
+        return TransitResult(position, None, error=error)
+    value = item[field]
+    return TransitResult(
+        position,
+        base64.b64decode(value) if field == "plaintext" else value,
+        key_version=item.get("key_version"),
+    )
+
+
+def _error_batch_results(err: VaultClientException) -> Optional[List[Dict[str, Any]]]:
+    """The per-item results in the body of a failed batch request, if any."""
+    if err.response is None:
+        return None
+    try:
+        items = err.response.response["data"]["batch_results"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    return items if isinstance(items, list) else None
+
+
+class DataKeyCache:
+    """Reuses data keys for envelope encryption and remembers unwrapped ones.
+
+    Generating a data key is a Vault call, so :meth:`TransitAPI.data_key` hands
+    out the same key for up to ``max_age`` seconds or ``max_uses`` calls. Keys
+    generated here and keys unwrapped by :meth:`TransitAPI.unwrap_data_key`
+    are remembered by ciphertext for ``max_age`` seconds, so decrypting
+    records encrypted with a recent key needs no Vault call.
+
+    Plaintext keys are held in this process's memory for that long; size
+    ``max_age`` and ``max_uses`` to your key rotation policy.
+
+    Args:
+        max_age: seconds a data key is reused and an unwrapped key is kept
+        max_uses: times a data key is handed out before a new one is
+            generated, unlimited if ``None``
+        max_size: maximum number of unwrapped keys kept
+        clock: monotonic time source, overridable for tests
+    """
+
+    def __init__(
+        self,
+        max_age: float = 300.0,
+        max_uses: Optional[int] = None,
+        max_size: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_age = max_age
+        self.max_uses = max_uses
+        self._clock = clock
+        self._lock = threading.Lock()
+        #: current key per ``(mount, name, context, bits)``: key, created, uses
+        self._current: Dict[Tuple[Any, ...], Tuple[DataKey, float, int]] = {}
+        self._generating = SingleFlight()
+        self._unwrapped = SecretCache(max_size=max_size, ttl=max_age, clock=clock)
+
+    def checkout(
+        self, key: Tuple[Any, ...], generate: Callable[[], DataKey]
+    ) -> DataKey:
+        """Return the current data key for ``key``, generating one if needed."""
+        with self._lock:
+            entry = self._current.get(key)
+            if (
+                entry is not None
+                and self._clock() - entry[1] < self.max_age
+                and (self.max_uses is None or entry[2] < self.max_uses)
+            ):
+                self._current[key] = (entry[0], entry[1], entry[2] + 1)
+                return entry[0]
+        # Generated outside the lock so other keys are not held up, and once
+        # per key so concurrent callers share the new key.
+        data_key = self._generating.do(key, lambda: self._generate(key, generate))
+        with self._lock:
+            entry = self._current.get(key)
+            if entry is not None and entry[0] is data_key:
+                self._current[key] = (entry[0], entry[1], entry[2] + 1)
+        return data_key
+
+    def _generate(
+        self, key: Tuple[Any, ...], generate: Callable[[], DataKey]
+    ) -> DataKey:
+        mount_path, name, context, _ = key
+        data_key = generate()
+        self.remember(
+            mount_path, name, data_key.ciphertext, context, data_key.plaintext
+        )
+        with self._lock:
+            self._current[key] = (data_key, self._clock(), 0)
+        return data_key
+
+    def unwrapped(
+        self, mount_path: str, name: str, ciphertext: str, context: Optional[bytes]
+    ) -> Optional[bytes]:
+        """Return a remembered plaintext key, or ``None``."""
+        return self._unwrapped.get(
+            (mount_path, _unwrapped_id(name, ciphertext, context), None)
+        )
+
+    def remember(
+        self,
+        mount_path: str,
+        name: str,
+        ciphertext: str,
+        context: Optional[bytes],
+        plaintext: bytes,
+    ) -> None:
+        self._unwrapped.set(
+            (mount_path, _unwrapped_id(name, ciphertext, context), None), plaintext
+        )
+
+    def clear(self) -> None:
+        """Forget every key."""
+        with self._lock:
+            self._current.clear()
+        self._unwrapped.clear()
+
+
+class TransitAPI:
+    """Instance configured with a client to use the transit secrets engine.
+
+    The ``*_many`` methods send items in ``batch_input`` requests. Items are
+    pulled from the input as batches are built, and a batch is closed once it
+    reaches ``max_batch_items`` items or about ``max_batch_bytes`` of encoded
+    input. Up to ``max_concurrency`` batches are in flight at once and results
+    are yielded in input order, one :class:`TransitResult` per item. A failed
+    item or batch does not stop the others. Nothing is sent until the returned
+    iterator is consumed.
+
+    Example::
+
+        transit = TransitAPI(client)
+        ciphertexts = [r.value for r in transit.encrypt_many("orders", records)]
+
+    Args:
+        client: client used to talk to Vault
+        mount_path: mount point of the transit engine
+        max_batch_items: maximum number of items per request
+        max_batch_bytes: approximate maximum size of the items of a request,
+            keep it well under Vault's ``max_request_size``
+        max_concurrency: maximum number of batches in flight
+        datakey_cache: optional :class:`DataKeyCache` used by :meth:`data_key`
+            and :meth:`unwrap_data_key`
+    """
+
+    def __init__(
+        self,
+        client: VaultClient,
+        mount_path: str = "transit",
+        max_batch_items: int = 1000,
+        max_batch_bytes: int = 4 * 1024 * 1024,
+        max_concurrency: int = 4,
+        datakey_cache: Optional[DataKeyCache] = None,
+    ):
+        if max_batch_items < 1:
+            raise ValueError("max_batch_items must be at least 1")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.client = client
+        self.mount_path = f"/v1/{mount_path}"
+        self.max_batch_items = max_batch_items
+        self.max_batch_bytes = max_batch_bytes
+        self.max_concurrency = max_concurrency
+        self.datakey_cache = datakey_cache
+
+    def _batches(
+        self, items: Iterable[Dict[str, str]]
+    ) -> Iterator[List[Dict[str, str]]]:
+        batch: List[Dict[str, str]] = []
+        size = 0
+        for item in items:
+            item_size = sum(len(value) for value in item.values()) + _ITEM_OVERHEAD
+            if batch and (
+                len(batch) >= self.max_batch_items
+                or size + item_size > self.max_batch_bytes
+            ):
+                yield batch
+                batch, size = [], 0
+            batch.append(item)
+            size += item_size
+        if batch:
+            yield batch
+
+    def _send_batch(
+        self,
+        path: str,
+        batch: List[Dict[str, str]],
+        params: Dict[str, Any],
+        field: str,
+        start: int,
+    ) -> List[TransitResult]:
+        try:
+            res = self.client.post(path, data={**params, "batch_input": batch})
+        except VaultClientException as err:
+            # Vault answers 400 (or 500) when any item fails, but the body still
+            # has every item's result, so only the failed items are lost.
+            items = _error_batch_results(err)
+            if items is None or len(items) != len(batch):
+                return [
+                    TransitResult(
+                        start + i, None, error=err.message, status_code=err.status_code
+                    )
+                    for i in range(len(batch))
+                ]
+        else:
+            items = res.response["data"]["batch_results"]
+        return [_batch_result(start + i, item, field) for i, item in enumerate(items)]
+
+    def _stream(
+        self,
+        path: str,
+        items: Iterable[Dict[str, str]],
+        field: str,
+        params: Dict[str, Any],
+    ) -> Iterator[TransitResult]:
+        batches = self._batches(items)
+        pending: Deque[Future] = deque()
+        position = 0
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        try:
+            while True:
+                while len(pending) < self.max_concurrency:
+                    batch = next(batches, None)
+                    if batch is None:
+                        break
+                    # A copy of the caller's context carries its governor
+                    # priority into the worker.
+                    pending.append(
+                        executor.submit(
+                            contextvars.copy_context().run,
+                            self._send_batch,
+                            path,
+                            batch,
+                            params,
+                            field,
+                            position,
+                        )
+                    )
+                    position += len(batch)
+                if not pending:
+                    return
+                # Wait for the oldest batch so results come out in input order,
+                # while later batches keep running.
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def _one(
+        self, path: str, item: Dict[str, str], field: str, params: Dict[str, Any]
+    ) -> Any:
+        (result,) = self._send_batch(path, [item], params, field, 0)
+        if result.error is not None:
+            raise TransitException(
+                f"Transit request to {path} failed: {result.error}",
+                status_code=result.status_code,
+            )
+        return result.value
+
+    @staticmethod
+    def _key_version(key_version: Optional[int]) -> Dict[str, Any]:
+        return {} if key_version is None else {"key_version": key_version}
+
+    def encrypt_many(
+        self,
+        name: str,
+        plaintexts: Iterable[PlaintextItem],
+        key_version: Optional[int] = None,
+    ) -> Iterator[TransitResult]:
+        """Encrypt many plaintexts with a named key.
+
+        Args:
+            name: transit key name
+            plaintexts: plaintexts, or ``(plaintext, context)`` tuples
+            key_version: key version to encrypt with, latest if not given
+
+        Returns:
+            Results in input order whose value is the ciphertext.
+        """
+        items = (
+            _item("plaintext", _b64(plaintext), context)
+            for plaintext, context in map(_split, plaintexts)
+        )
+        return self._stream(
+            f"{self.mount_path}/encrypt/{name}",
+            items,
+            "ciphertext",
+            self._key_version(key_version),
+        )
+
+    def decrypt_many(
+        self, name: str, ciphertexts: Iterable[CiphertextItem]
+    ) -> Iterator[TransitResult]:
+        """Decrypt many ciphertexts with a named key.
+
+        Args:
+            name: transit key name
+            ciphertexts: ciphertexts, or ``(ciphertext, context)`` tuples
+
+        Returns:
+            Results in input order whose value is the plaintext bytes.
+        """
+        items = (
+            _item("ciphertext", ciphertext, context)
+            for ciphertext, context in map(_split, ciphertexts)
+        )
+        return self._stream(f"{self.mount_path}/decrypt/{name}", items, "plaintext", {})
+
+    def rewrap_many(
+        self,
+        name: str,
+        ciphertexts: Iterable[CiphertextItem],
+        key_version: Optional[int] = None,
+    ) -> Iterator[TransitResult]:
+        """Re-encrypt many ciphertexts with the latest or a given key version,
+        without exposing the plaintexts.
+
+        Returns:
+            Results in input order whose value is the new ciphertext.
+        """
+        items = (
+            _item("ciphertext", ciphertext, context)
+            for ciphertext, context in map(_split, ciphertexts)
+        )
+        return self._stream(
+            f"{self.mount_path}/rewrap/{name}",
+            items,
+            "ciphertext",
+            self._key_version(key_version),
+        )
+
+    def hmac_many(
+        self,
+        name: str,
+        inputs: Iterable[bytes],
+        algorithm: str = "sha2-256",
+        key_version: Optional[int] = None,
+    ) -> Iterator[TransitResult]:
+        """Compute the HMAC of many inputs with a named key.
+
+        Returns:
+            Results in input order whose value is the ``vault:v1:...`` HMAC.
+        """
+        items = ({"input": _b64(data)} for data in inputs)
+        return self._stream(
+            f"{self.mount_path}/hmac/{name}/{algorithm}",
+            items,
+            "hmac",
+            self._key_version(key_version),
+        )
+
+    def encrypt(
+        self,
+        name: str,
+        plaintext: bytes,
+        context: Optional[bytes] = None,
+        key_version: Optional[int] = None,
+    ) -> str:
+        """Encrypt one plaintext and return the ciphertext.
+
+        Raises:
+            TransitException: Raised if Vault cannot encrypt it.
+        """
+        return self._one(
+            f"{self.mount_path}/encrypt/{name}",
+            _item("plaintext", _b64(plaintext), context),
+            "ciphertext",
+            self._key_version(key_version),
+        )
+
+    def decrypt(
+        self, name: str, ciphertext: str, context: Optional[bytes] = None
+    ) -> bytes:
+        """Decrypt one ciphertext and return the plaintext.
+
+        Raises:
+            TransitException: Raised if Vault cannot decrypt it.
+        """
+        return self._one(
+            f"{self.mount_path}/decrypt/{name}",
+            _item("ciphertext", ciphertext, context),
+            "plaintext",
+            {},
+        )
+
+    def rewrap(
+        self,
+        name: str,
+        ciphertext: str,
+        context: Optional[bytes] = None,
+        key_version: Optional[int] = None,
+    ) -> str:
+        """Re-encrypt one ciphertext and return the new ciphertext.
+
+        Raises:
+            TransitException: Raised if Vault cannot rewrap it.
+        """
+        return self._one(
+            f"{self.mount_path}/rewrap/{name}",
+            _item("ciphertext", ciphertext, context),
+            "ciphertext",
+            self._key_version(key_version),
+        )
+
+    def hmac(
+        self,
+        name: str,
+        data: bytes,
+        algorithm: str = "sha2-256",
+        key_version: Optional[int] = None,
+    ) -> str:
+        """Compute the HMAC of one input.
+
+        Raises:
+            TransitException: Raised if Vault cannot compute it.
+        """
+        return self._one(
+            f"{self.mount_path}/hmac/{name}/{algorithm}",
+            {"input": _b64(data)},
+            "hmac",
+            self._key_version(key_version),
+        )
+
+    def generate_data_key(
+        self, name: str, context: Optional[bytes] = None, bits: int = 256
+    ) -> DataKey:
+        """Generate a new data key wrapped by a named key, bypassing the cache.
+
+        Raises:
+            TransitException: Raised if Vault cannot generate it.
+        """
+        path = f"{self.mount_path}/datakey/plaintext/{name}"
+        payload: Dict[str, Any] = {"bits": bits}
+        if context is not None:
+            payload["context"] = _b64(context)
+        try:
+            res = self.client.post(path, data=payload)
+        except VaultClientException as err:
+            raise TransitException(
+                f"Failed to generate a data key at {path}: {err.message}",
+                status_code=err.status_code,
+            )
+        data = res.response["data"]
+        return DataKey(
+            plaintext=base64.b64decode(data["plaintext"]),
+            ciphertext=data["ciphertext"],
+            key_version=data.get("key_version"),
+        )
+
+    def data_key(
+        self, name: str, context: Optional[bytes] = None, bits: int = 256
+    ) -> DataKey:
+        """Data key to encrypt data locally with, reused from the
+        :class:`DataKeyCache` if there is one.
+
+        Store :attr:`DataKey.ciphertext` with the encrypted data and recover the
+        key with :meth:`unwrap_data_key`.
+
+        Raises:
+            TransitException: Raised if a new key cannot be generated.
+        """
+        if self.datakey_cache is None:
+            return self.generate_data_key(name, context=context, bits=bits)
+        return self.datakey_cache.checkout(
+            (self.mount_path, name, context, bits),
+            lambda: self.generate_data_key(name, context=context, bits=bits),
+        )
+
+    def unwrap_data_key(
+        self, name: str, ciphertext: str, context: Optional[bytes] = None
+    ) -> bytes:
+        """Recover the plaintext of a data key from its ciphertext.
+
+        Raises:
+            TransitException: Raised if Vault cannot decrypt it.
+        """
+        cache = self.datakey_cache
+        if cache is not None:
+            plaintext = cache.unwrapped(self.mount_path, name, ciphertext, context)
+            if plaintext is not None:
+                return plaintext
+        plaintext = self.decrypt(name, ciphertext, context=context)
+        if cache is not None:
+            cache.remember(self.mount_path, name, ciphertext, context, plaintext)
+        return plaintext
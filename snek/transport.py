@@ -0,0 +1,362 @@
+import abc
+import select
+import socket
+import ssl
+import threading
+import time
+import weakref
+from datetime import timedelta
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from typing import (
+    Any,
+    Dict,
+    Mapping,
+    MutableMapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+from urllib.parse import urlencode, urlsplit
+
+#: A single timeout in seconds, or a ``(connect, read)`` pair as in requests
+Timeout = Union[None, float, Tuple[Optional[float], Optional[float]]]
+
+
+class Transport(abc.ABC):
+    """Sends HTTP requests on behalf of :class:`snek.client.VaultClient` objects.
+
+    A transport holds connections but no credentials: each client passes its
+    token and namespace as ``headers`` to :meth:`request`, so clients with
+    different tokens and namespaces can safely share one transport.
+
+    ``headers`` are sent with every request through the transport. Headers
+    passed to :meth:`request` are merged over them, and a ``None`` value removes
+    a header for that request, as with :class:`requests.Session`.
+    """
+
+    headers: MutableMapping[str, Any]
+
+    def __enter__(self) -> "Transport":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    @abc.abstractmethod
+    def request(self, method: str, url: str, **kwargs: Any) -> Any:
+        """Send one request and read the whole response.
+
+        Args:
+            method: HTTP method to invoke
+            url: absolute URL to call
+            **kwargs: ``params``, ``data``, ``headers`` and ``timeout``, with the
+                same meaning as for :meth:`requests.Session.request`
+
+        Returns:
+            An object exposing ``status_code``, ``content``, ``text`` and
+            ``elapsed``, the time until the response headers were parsed.
+
+        Raises:
+            IOError: Raised for connection errors and timeouts.
+        """
+
+    def close(self) -> None:
+        """Close the connections held by the transport."""
+
+
+class RequestsTransport(Transport):
+    """The default transport, a :class:`requests.Session` with a pooled adapter.
+
+    requests is imported when the transport is created rather than when
+    :mod:`snek` is, so programs using another transport never load it.
+
+    Args:
+        adapter: an existing :class:`requests.adapters.HTTPAdapter` to use, so
+            several clients can share one connection pool. The pool options
+            are ignored when it is given.
+        pool_connections: number of per-host connection pools to cache
+        pool_maxsize: maximum number of connections kept alive per host
+        pool_block: block when the pool is exhausted instead of opening
+            throwaway connections
+    """
+
+    def __init__(
+        self,
+        adapter: Any = None,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+    ):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        if adapter is None:
+            adapter = HTTPAdapter(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block,
+            )
+        self.adapter = adapter
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.headers = self.session.headers
+
+    def request(self, method: str, url: str, **kwargs: Any) -> Any:
+        return self.session.request(method, url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class TransportResponse(NamedTuple):
+    """A fully read response returned by :class:`HTTPClientTransport`."""
+
+    status_code: int
+    content: bytes
+    headers: Dict[str, str]
+    elapsed: timedelta
+
+    @property
+    def text(self) -> str:
+        """The body decoded as UTF-8."""
+        return self.content.decode("utf-8", errors="replace")
+
+
+def _merge_headers(
+    shared: Mapping[str, str], headers: Optional[Mapping[str, Optional[str]]]
+) -> Dict[str, str]:
+    """Merge per-request headers over the shared ones, ``None`` removing one."""
+    merged = dict(shared)
+    for name, value in (headers or {}).items():
+        if value is None:
+            merged.pop(name, None)
+        else:
+            merged[name] = value
+    return merged
+
+
+def _split_timeout(timeout: Timeout) -> Tuple[Optional[float], Optional[float]]:
+    """The ``(connect, read)`` timeouts for a requests-style ``timeout``."""
+    if isinstance(timeout, tuple):
+        return timeout
+    return timeout, timeout
+
+
+def _dropped(sock: socket.socket) -> bool:
+    """Whether an idle keep-alive socket was closed by the server.
+
+    An idle connection has nothing to read, so a readable socket means the
+    server sent EOF or garbage and the connection cannot be reused.
+    """
+    try:
+        if hasattr(select, "poll"):
+            poller = select.poll()
+            poller.register(sock, select.POLLIN)
+            return bool(poller.poll(0))
+        return bool(select.select([sock], [], [], 0)[0])
+    except (OSError, ValueError):
+        return True
+
+
+class HTTPClientTransport(Transport):
+    """Minimal keep-alive transport built on the standard library's
+    :mod:`http.client`.
+
+    Each thread keeps one persistent connection per host, so a single-threaded
+    program reuses one connection for every request and a thread pool opens at
+    most one per worker. Importing and creating it is much cheaper than
+    requests and urllib3, which suits CLI tools and short-lived jobs.
+
+    There are no proxy, redirect or retry features: Vault answers directly, and
+    :class:`snek.retry.RetryPolicy` handles retries above the transport.
+
+    Args:
+        headers: headers sent with every request
+        ssl_context: :class:`ssl.SSLContext` used for ``https`` URLs, defaults
+            to one trusting the system's certificate authorities
+    """
+
+    def __init__(
+        self,
+        headers: Optional[Mapping[str, str]] = None,
+        ssl_context: Optional[ssl.SSLContext] = None,
+    ):
+        self.headers = dict(headers or {})
+        self.ssl_context = ssl_context
+        self._local = threading.local()
+        self._connections: "weakref.WeakSet[HTTPConnection]" = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def _connection(self, scheme: str, netloc: str) -> HTTPConnection:
+        """The calling thread's connection to ``netloc``, created on first use."""
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+        conn = connections.get((scheme, netloc))
+        if conn is not None:
+            if conn.sock is not None and _dropped(conn.sock):
+                conn.close()
+            return conn
+
+        if scheme == "https":
+            if self.ssl_context is None:
+                self.ssl_context = ssl.create_default_context()
+            conn = HTTPSConnection(netloc, context=self.ssl_context)
+        elif scheme == "http":
+            conn = HTTPConnection(netloc)
+        else:
+            raise ValueError(f"Unsupported URL scheme {scheme!r}")
+        connections[(scheme, netloc)] = conn
+        with self._lock:
+            self._connections.add(conn)
+        return conn
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        params: Optional[Mapping[str, Any]] = None,
+        data: Union[None, str, bytes] = None,
+        headers: Optional[Mapping[str, Optional[str]]] = None,
+        timeout: Timeout = None,
+        **kwargs: Any,
+    ) -> TransportResponse:
+        if kwargs:
+            raise TypeError(f"Unsupported request arguments: {', '.join(kwargs)}")
+        parts = urlsplit(url)
+        target = parts.path or "/"
+        encoded = urlencode(
+            {k: v for k, v in (params or {}).items() if v is not None}, doseq=True
+        )
+        query = [q for q in (parts.query, encoded) if q]
+        if query:
+            target = f"{target}?{'&'.join(query)}"
+
+        merged = _merge_headers(self.headers, headers)
+        if isinstance(data, str):
+            data = data.encode()
+        connect_timeout, read_timeout = _split_timeout(timeout)
+
+        conn = self._connection(parts.scheme, parts.netloc)
+        start = time.perf_counter()
+        try:
+            conn.timeout = connect_timeout
+            conn.request(method, target, body=data, headers=merged)
+            if conn.sock is not None:
+                conn.sock.settimeout(read_timeout)
+            response = conn.getresponse()
+            elapsed = time.perf_counter() - start
+            content = response.read()
+        except HTTPException as err:
+            conn.close()
+            # Malformed or truncated responses are connection errors to callers.
+            raise ConnectionError(str(err) or type(err).__name__) from err
+        except OSError:
+            conn.close()
+            raise
+        return TransportResponse(
+            status_code=response.status,
+            content=content,
+            headers=dict(response.getheaders()),
+            elapsed=timedelta(seconds=elapsed),
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            connections = list(self._connections)
+        for conn in connections:
+            conn.close()
+
+
+class HTTP2Transport(Transport):
+    """HTTP/2 transport that multiplexes concurrent requests over a few
+    connections, built on :class:`httpx.Client`.
+
+    With requests every in-flight call needs its own TCP and TLS connection.
+    Here threads sharing a client send their requests as streams on the same
+    connection, so hundreds of concurrent calls need only ``max_connections``
+    sockets and handshakes. HTTP/2 is negotiated with ALPN, so it needs an
+    ``https`` Vault address. Plain ``http`` addresses and servers without
+    HTTP/2 use HTTP/1.1.
+
+    Share one transport between all clients of a process: it holds no tokens or
+    namespaces, each :class:`snek.client.VaultClient` sends its own with every
+    request.
+
+    Args:
+        headers: headers sent with every request
+        max_connections: maximum number of connections to open
+        verify: ``False`` to skip certificate verification, a CA bundle path, or
+            an :class:`ssl.SSLContext`
+        transport: an :class:`httpx.BaseTransport` to send requests through
+            instead of the network, mostly useful for tests
+
+    Raises:
+        ImportError: Raised when httpx or h2 is not installed.
+    """
+
+    def __init__(
+        self,
+        headers: Optional[Mapping[str, str]] = None,
+        max_connections: int = 4,
+        verify: Union[bool, str, ssl.SSLContext] = True,
+        transport: Any = None,
+    ):
+        try:
+            import h2  # noqa: F401
+            import httpx
+        except ImportError as err:
+            raise ImportError(
+                "HTTP2Transport requires httpx and h2. "
+                "Install them with `pip install snek[http2]`."
+            ) from err
+
+        self._httpx = httpx
+        self.headers = dict(headers or {})
+        self.client = httpx.Client(
+            http2=True,
+            verify=verify,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            transport=transport,
+        )
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        params: Optional[Mapping[str, Any]] = None,
+        data: Union[None, str, bytes] = None,
+        headers: Optional[Mapping[str, Optional[str]]] = None,
+        timeout: Timeout = None,
+        **kwargs: Any,
+    ) -> Any:
+        if kwargs:
+            raise TypeError(f"Unsupported request arguments: {', '.join(kwargs)}")
+        httpx = self._httpx
+        merged = _merge_headers(self.headers, headers)
+        connect_timeout, read_timeout = _split_timeout(timeout)
+        try:
+            return self.client.request(
+                method,
+                url,
+                # requests silently drops ``None`` values, httpx sends them as
+                # empty strings.
+                params={k: v for k, v in (params or {}).items() if v is not None},
+                content=data,
+                headers=merged,
+                timeout=httpx.Timeout(
+                    connect=connect_timeout, read=read_timeout, write=None, pool=None
+                ),
+            )
+        except httpx.TransportError as err:
+            raise ConnectionError(str(err) or type(err).__name__) from err
+
+    def close(self) -> None:
+        self.client.close()
@@ -80,6 +80,32 @@ def test_client(test_vault):
 
 @pytest.fixture
 def mock_http_call(mocker):
-    mock_request = mocker.patch("snek.client.requests.Session.request")
-    mock_request.return_value.json.return_value = {}
+    mock_request = mocker.patch("requests.Session.request")
+    mock_request.return_value.content = b"{}"
     return mock_request
+
+
+@pytest.fixture
+def mock_vault_client(mocker):
+    """A mocked :class:`VaultClient`, for tests of the APIs built on it."""
+    return mocker.Mock(spec=VaultClient)
+
+
+class FakeClock:
+    """Monotonic clock moved by setting ``now``, with a ``sleep`` that only
+    records how long it was asked to wait."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
@@ -0,0 +1,177 @@
+import asyncio
+import json
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from snek.async_client import AsyncVaultClient  # noqa: E402
+from snek.constants import HttpMethod, HttpStatusCode  # noqa: E402
+from snek.exceptions import VaultClientException  # noqa: E402
+from snek.retry import RetryPolicy  # noqa: E402
+
+
+def make_client(handler, **kwargs):
+    return AsyncVaultClient(
+        "http://localhost:8200/",
+        "abc123",
+        transport=httpx.MockTransport(handler),
+        **kwargs,
+    )
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_headers():
+    client = make_client(lambda req: httpx.Response(200), namespace="foo")
+    assert client.session.headers["X-Vault-Namespace"] == "foo"
+    assert client.session.headers["X-Vault-Token"] == "abc123"
+
+
+def test_extra_headers_not_modified():
+    extra_headers = {"X-A": "1"}
+    first = AsyncVaultClient("http://localhost:8200/", "a", extra_headers=extra_headers)
+    second = AsyncVaultClient(
+        "http://localhost:8200/", "b", extra_headers=extra_headers
+    )
+    assert extra_headers == {"X-A": "1"}
+    assert first.session.headers["X-Vault-Token"] == "a"
+    assert second.session.headers["X-Vault-Token"] == "b"
+    assert second.session.headers["X-A"] == "1"
+
+
+def test_make_request():
+    def handler(request):
+        assert request.headers["X-Vault-Token"] == "abc123"
+        return httpx.Response(200, json={"initialized": True})
+
+    async def go():
+        async with make_client(handler) as client:
+            return await client.get("/v1/sys/init")
+
+    res = run(go())
+    assert res.status_code == HttpStatusCode.SUCCESS_DATA
+    assert res.response == {"initialized": True}
+
+
+def test_make_request_no_data():
+    async def go():
+        async with make_client(lambda req: httpx.Response(204)) as client:
+            return await client.post("/v1/secret/config", data={"foo": "bar"})
+
+    res = run(go())
+    assert res.response == {}
+    assert res.status_code == HttpStatusCode.SUCCESS_NO_DATA
+
+
+def test_make_request_bad_code():
+    async def go():
+        handler = lambda req: httpx.Response(403, json={"foo": "bar"})  # noqa: E731
+        async with make_client(handler) as client:
+            await client.get("/v1/sys/init")
+
+    with pytest.raises(VaultClientException, match='{"foo": "bar"}'):
+        run(go())
+
+
+def test_make_request_error():
+    def handler(request):
+        raise httpx.ConnectError("Connection failure")
+
+    async def go():
+        async with make_client(handler) as client:
+            await client.get("/v1/sys/init")
+
+    with pytest.raises(VaultClientException, match="Connection failure"):
+        run(go())
+
+
+@pytest.mark.parametrize(
+    "verb,method",
+    [
+        ("get", HttpMethod.GET),
+        ("list", HttpMethod.LIST),
+        ("delete", HttpMethod.DELETE),
+    ],
+)
+def test_params_verbs(verb, method):
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200, json={})
+
+    async def go():
+        async with make_client(handler) as client:
+            await getattr(client, verb)("/v1/sys/madeup", {"foo": "bar", "v": None})
+
+    run(go())
+    assert seen[0].method == method.value
+    assert str(seen[0].url) == "http://localhost:8200/v1/sys/madeup?foo=bar"
+
+
+@pytest.mark.parametrize(
+    "verb,method", [("put", HttpMethod.PUT), ("post", HttpMethod.POST)]
+)
+def test_data_verbs(verb, method):
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200, json={})
+
+    async def go():
+        async with make_client(handler) as client:
+            await getattr(client, verb)("/v1/sys/madeup", data={"foo": "bar"})
+
+    run(go())
+    assert seen[0].method == method.value
+    assert json.loads(seen[0].content) == {"foo": "bar"}
+    assert seen[0].headers["Content-Type"] == "application/json"
+
+
+def test_make_request_retries():
+    responses = [httpx.Response(503, json={}), httpx.Response(200, json={"a": 1})]
+
+    async def go():
+        client = make_client(
+            lambda req: responses.pop(0), retry=RetryPolicy(backoff_base=0)
+        )
+        async with client:
+            return await client.get("/v1/sys/init")
+
+    assert run(go()).response == {"a": 1}
+    assert responses == []
+
+
+def test_coalesce_reads():
+    seen = []
+
+    async def handler(request):
+        seen.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"data": {}})
+
+    async def go():
+        async with make_client(handler, coalesce_reads=True) as client:
+            return await asyncio.gather(
+                *(client.get("/v1/secret/data/foo") for _ in range(5))
+            )
+
+    results = run(go())
+    assert len(seen) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_http2():
+    pytest.importorskip("h2")
+
+    async def go():
+        async with make_client(
+            lambda req: httpx.Response(200, json={"a": 1}), http2=True
+        ) as client:
+            return await client.get("/v1/secret/foo")
+
+    assert run(go()).response == {"a": 1}
@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from snek.async_client import AsyncVaultClient  # noqa: E402
+from snek.async_secrets import AsyncKVSecretV2API  # noqa: E402
+from snek.constants import HttpStatusCode  # noqa: E402
+from snek.exceptions import (  # noqa: E402
+    KV2SecretException,
+    SecretCreateUpdateException,
+    SecretReadException,
+)
+
+
+def make_api(handler):
+    client = AsyncVaultClient(
+        "http://localhost:8200/", "abc123", transport=httpx.MockTransport(handler)
+    )
+    return AsyncKVSecretV2API(client)
+
+
+class TestAsyncKVSecretV2API:
+    def test_read(self):
+        def handler(request):
+            assert request.url.path == "/v1/secret/data/foo/bar"
+            assert request.url.params.get("version") == "2"
+            return httpx.Response(
+                200, json={"data": {"data": {"foo": "bar"}, "metadata": {}}}
+            )
+
+        secret = asyncio.run(make_api(handler).read("foo/bar", version=2))
+        assert secret.path == "foo/bar"
+        assert secret.value == {"foo": "bar"}
+
+    def test_read_raises_error(self):
+        api = make_api(lambda req: httpx.Response(404, json={"errors": []}))
+        with pytest.raises(SecretReadException):
+            asyncio.run(api.read("foo/bar"))
+
+    def test_create_or_update(self):
+        def handler(request):
+            assert json.loads(request.content) == {
+                "data": {"foo": "bar"},
+                "options": {"cas": 0},
+            }
+            return httpx.Response(200, json={"data": {"version": 1}})
+
+        secret = asyncio.run(
+            make_api(handler).create_or_update("foo/bar", {"foo": "bar"}, 0)
+        )
+        assert secret.data == {"version": 1}
+
+    def test_create_or_update_fails(self):
+        api = make_api(lambda req: httpx.Response(400, json={"errors": []}))
+        with pytest.raises(SecretCreateUpdateException):
+            asyncio.run(api.create_or_update("foo/bar", {"foo": "bar"}))
+
+    def test_configure(self):
+        res = asyncio.run(make_api(lambda req: httpx.Response(204)).configure())
+        assert res.status_code == HttpStatusCode.SUCCESS_NO_DATA
+
+    def test_configure_fails(self):
+        api = make_api(lambda req: httpx.Response(403, json={"errors": []}))
+        with pytest.raises(KV2SecretException):
+            asyncio.run(api.configure())
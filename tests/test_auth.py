@@ -0,0 +1,144 @@
+import json
+
+import pytest
+from snek.auth import AppRoleLogin, LoginMethod, TokenInfo, TokenManager
+from snek.client import VaultClient
+from snek.exceptions import AuthException, VaultClientException
+from snek.models import VaultResponse
+
+
+class StaticLogin(LoginMethod):
+    def __init__(self):
+        self.count = 0
+
+    def login(self, client):
+        self.count += 1
+        return {
+            "client_token": f"login-{self.count}",
+            "lease_duration": 60,
+            "renewable": True,
+        }
+
+
+@pytest.fixture
+def client(mocker):
+    client = VaultClient("http://localhost:8200/", "initial")
+    mocker.patch.object(client, "get")
+    mocker.patch.object(client, "post")
+    client.get.return_value = VaultResponse(
+        {"data": {"ttl": 30, "renewable": True}}, 200
+    )
+    client.post.return_value = VaultResponse(
+        {"auth": {"client_token": "initial", "lease_duration": 30, "renewable": True}},
+        200,
+    )
+    return client
+
+
+def test_token_property():
+    client = VaultClient("http://localhost:8200/", "abc")
+    client.token = "def"
+    assert client.headers["X-Vault-Token"] == "def"
+    assert client.token == "def"
+
+
+def test_token_info_expires_at():
+    assert TokenInfo("t", 10, True, 5.0).expires_at == 15.0
+    assert TokenInfo("t", 0, False, 5.0).expires_at is None
+
+
+class TestTokenManager:
+    def test_lookup(self, client, clock):
+        clock.now = 100.0
+        manager = TokenManager(client, clock=clock)
+        info = manager.lookup()
+        assert info == TokenInfo("initial", 30, True, 100.0)
+        client.get.assert_called_with("/v1/auth/token/lookup-self")
+
+    def test_lookup_fails(self, client):
+        client.get.side_effect = VaultClientException("403: denied")
+        with pytest.raises(AuthException):
+            TokenManager(client).lookup()
+
+    def test_refresh_renews(self, client):
+        seen = []
+        manager = TokenManager(client, on_token=seen.append)
+        manager.lookup()
+        assert manager.refresh() == pytest.approx(20)
+        client.post.assert_called_with("/v1/auth/token/renew-self", data={})
+        assert len(seen) == 2
+
+    def test_refresh_falls_back_to_login(self, client):
+        login = StaticLogin()
+        manager = TokenManager(client, login=login)
+        manager.lookup()
+        client.post.side_effect = VaultClientException("403: expired")
+        manager.refresh()
+        assert client.token == "login-1"
+
+    def test_refresh_logs_in_near_max_ttl(self, client):
+        client.post.return_value = VaultResponse(
+            {"auth": {"client_token": "initial", "lease_duration": 5}}, 200
+        )
+        manager = TokenManager(client, login=StaticLogin(), min_ttl=10)
+        manager.lookup()
+        assert manager.refresh() == pytest.approx(40)
+        assert client.token == "login-1"
+
+    def test_refresh_failure_retries(self, client):
+        client.post.side_effect = VaultClientException("503: sealed")
+        manager = TokenManager(client, retry_interval=3)
+        manager.lookup()
+        assert manager.refresh() == 3
+        assert client.token == "initial"
+
+    def test_non_expiring_token(self, client):
+        client.get.return_value = VaultResponse(
+            {"data": {"ttl": 0, "renewable": False}}, 200
+        )
+        manager = TokenManager(client)
+        manager.lookup()
+        assert manager.refresh() is None
+
+    def test_start_with_login(self, client):
+        with TokenManager(client, login=StaticLogin()) as manager:
+            assert client.token == "login-1"
+            assert manager.token_info.ttl == 60
+        assert manager._thread is None
+
+    def test_background_renewal(self, client, clock):
+        client.get.return_value = VaultResponse(
+            {"data": {"ttl": 1, "renewable": True}}, 200
+        )
+        client.post.return_value = VaultResponse(
+            {"auth": {"client_token": "renewed", "lease_duration": 0}}, 200
+        )
+        manager = TokenManager(client, renew_fraction=0.01)
+        manager._clock = clock
+        manager.start()
+        manager._thread.join(2)
+        assert client.token == "renewed"
+        manager.stop()
+
+    def test_bad_fraction(self, client):
+        with pytest.raises(ValueError):
+            TokenManager(client, renew_fraction=1)
+
+
+def test_approle_login(mocker, mock_http_call):
+    mock_http_call.return_value.status_code = 200
+    mock_http_call.return_value.content = json.dumps(
+        {"auth": {"client_token": "s.new", "lease_duration": 60, "renewable": True}}
+    ).encode()
+    client = VaultClient("http://localhost:8200/", "stale")
+    auth = AppRoleLogin("role", "secret").login(client)
+    assert auth["client_token"] == "s.new"
+    args, kwargs = mock_http_call.call_args
+    assert args == ("POST", "http://localhost:8200/v1/auth/approle/login")
+    assert json.loads(kwargs["data"]) == {"role_id": "role", "secret_id": "secret"}
+    assert kwargs["headers"]["X-Vault-Token"] is None
+
+
+def test_login_method_is_abstract():
+    with pytest.raises(TypeError):
+        LoginMethod()
@@ -0,0 +1,70 @@
+import pytest
+from snek.cache import SecretCache
+
+
+class TestSecretCache:
+    def test_get_set(self, clock):
+        cache = SecretCache(clock=clock)
+        assert cache.get(("/v1/secret", "foo", None)) is None
+        cache.set(("/v1/secret", "foo", None), "bar")
+        assert cache.get(("/v1/secret", "foo", None)) == "bar"
+        stats = cache.stats
+        assert (stats.hits, stats.misses, stats.size) == (1, 1, 1)
+
+    def test_ttl_expiry(self, clock):
+        cache = SecretCache(ttl=10, clock=clock)
+        cache.set(("/v1/secret", "foo", None), "bar")
+        cache.set(("/v1/secret", "short", None), "baz", ttl=1)
+        clock.now = 5
+        assert cache.get(("/v1/secret", "short", None)) is None
+        assert cache.get(("/v1/secret", "foo", None)) == "bar"
+        clock.now = 10
+        assert cache.get(("/v1/secret", "foo", None)) is None
+        assert cache.stats.expirations == 2
+
+    def test_pinned_versions_never_expire(self, clock):
+        cache = SecretCache(ttl=1, clock=clock)
+        cache.set(("/v1/secret", "foo", 3), "bar")
+        clock.now = 1000
+        assert cache.get(("/v1/secret", "foo", 3)) == "bar"
+
+    def test_lru_eviction(self, clock):
+        cache = SecretCache(max_size=2, clock=clock)
+        cache.set(("/v1/secret", "a", None), 1)
+        cache.set(("/v1/secret", "b", None), 2)
+        cache.get(("/v1/secret", "a", None))
+        cache.set(("/v1/secret", "c", None), 3)
+        assert cache.get(("/v1/secret", "b", None)) is None
+        assert cache.get(("/v1/secret", "a", None)) == 1
+        assert cache.stats.evictions == 1
+        assert len(cache) == 2
+
+    def test_invalidate(self, clock):
+        cache = SecretCache(clock=clock)
+        cache.set(("/v1/secret", "foo", None), "latest")
+        cache.set(("/v1/secret", "foo", 1), "pinned")
+        cache.invalidate("/v1/secret", "foo")
+        assert cache.get(("/v1/secret", "foo", None)) is None
+        assert cache.get(("/v1/secret", "foo", 1)) == "pinned"
+
+    def test_items(self, clock):
+        cache = SecretCache(ttl=10, clock=clock)
+        cache.set(("/v1/secret", "foo", None), "latest")
+        cache.set(("/v1/secret", "foo", 1), "pinned")
+        cache.set(("/v1/secret", "short", None), "short", ttl=1)
+        clock.now = 5
+        assert cache.items() == [
+            (("/v1/secret", "foo", None), "latest"),
+            (("/v1/secret", "foo", 1), "pinned"),
+        ]
+        assert (cache.stats.hits, cache.stats.misses) == (0, 0)
+
+    def test_clear(self, clock):
+        cache = SecretCache(clock=clock)
+        cache.set(("/v1/secret", "foo", None), "bar")
+        cache.clear()
+        assert len(cache) == 0
+
+    def test_bad_size(self):
+        with pytest.raises(ValueError):
+            SecretCache(max_size=0)
@@ -1,7 +1,9 @@
 import json
+import pickle
 
 import pytest
 from snek.client import VaultClient
+from snek.codec import JSONCodec
 from snek.constants import HttpMethod, HttpStatusCode
 from snek.exceptions import VaultClientException
 
@@ -18,7 +20,7 @@ def mock_request(mocker):
 
 def test_namespace():
     client = VaultClient("http://localhost:8200/", "abc12", namespace="foo")
-    assert client.session.headers["X-Vault-Namespace"] == "foo"
+    assert client.headers["X-Vault-Namespace"] == "foo"
 
 
 @pytest.mark.vault
@@ -46,7 +48,7 @@ def test_make_request_error(mock_http_call):
 def test_make_request_bad_code(mocker, mock_http_call):
     mock_http_call.return_value = mocker.Mock()
     mock_http_call.return_value.status_code = HttpStatusCode.FORBIDDEN.value
-    mock_http_call.return_value.json.return_value = {"foo": "bar"}
+    mock_http_call.return_value.content = b'{"foo":"bar"}'
     client = VaultClient("http://localhost:8200/", "abc123")
     with pytest.raises(VaultClientException, match='{"foo": "bar"}'):
         client.make_request(
@@ -71,7 +73,7 @@ def test_make_request_no_data(mock_http_call):
 
 def test_make_request_bad_no_json(mock_http_call):
     mock_http_call.return_value.status_code = HttpStatusCode.FORBIDDEN.value
-    mock_http_call.return_value.json.side_effect = json.JSONDecodeError("foo", "bar", 2)
+    mock_http_call.return_value.content = b"<html>"
     mock_http_call.return_value.text = ""
     client = VaultClient("http://localhost:8200/", "abc123")
     with pytest.raises(VaultClientException, match="403:"):
@@ -126,3 +128,100 @@ def test_delete(mock_client):
     mock_client.make_request.assert_called_with(
         HttpMethod.DELETE.value, "http://localhost:8200/v1/sys/madeup", params=None
     )
+
+
+def test_pool_options():
+    client = VaultClient(
+        "http://localhost:8200/", "abc123", pool_maxsize=32, pool_block=True
+    )
+    adapter = client.session.get_adapter("http://localhost:8200/")
+    assert adapter is client.adapter
+    assert adapter._pool_maxsize == 32
+    assert adapter._pool_block is True
+
+
+def test_shared_adapter():
+    first = VaultClient("http://localhost:8200/", "abc123")
+    second = VaultClient(
+        "http://localhost:8200/", "def456", namespace="foo", adapter=first.adapter
+    )
+    assert second.session.get_adapter("https://vault/") is first.adapter
+    assert first.headers["X-Vault-Token"] == "abc123"
+    assert second.headers["X-Vault-Token"] == "def456"
+
+
+def test_make_request_timeout(mock_http_call):
+    mock_http_call.return_value.status_code = HttpStatusCode.SUCCESS_NO_DATA.value
+    client = VaultClient(
+        "http://localhost:8200/", "abc123", connect_timeout=1.5, read_timeout=4
+    )
+    client.make_request(HttpMethod.GET.value, "http://localhost:8200/v1/sys/init")
+    assert mock_http_call.call_args[1]["timeout"] == (1.5, 4)
+    client.make_request(
+        HttpMethod.GET.value, "http://localhost:8200/v1/sys/init", timeout=9
+    )
+    assert mock_http_call.call_args[1]["timeout"] == 9
+
+
+def test_make_request_unknown_code(mock_http_call):
+    mock_http_call.return_value.status_code = 412
+    mock_http_call.return_value.content = b'{"errors": ["precondition"]}'
+    client = VaultClient("http://localhost:8200/", "abc123")
+    with pytest.raises(VaultClientException, match="412: ") as err:
+        client.get("/v1/secret/data/foo")
+    assert err.value.status_code == 412
+
+
+def test_make_request_standby_codes_only_ok_for_health(mock_http_call):
+    mock_http_call.return_value.status_code = HttpStatusCode.HEALTH_STANDBY_NODE.value
+    mock_http_call.return_value.content = b'{"standby": true}'
+    client = VaultClient("http://localhost:8200/", "abc123")
+    assert client.get("/v1/sys/health").response == {"standby": True}
+    with pytest.raises(VaultClientException) as err:
+        client.get("/v1/secret/data/foo")
+    assert err.value.status_code == HttpStatusCode.HEALTH_STANDBY_NODE
+
+
+def test_make_request_lazy_json(mocker, mock_http_call):
+    mock_http_call.return_value.status_code = HttpStatusCode.SUCCESS_DATA.value
+    mock_http_call.return_value.content = b'{"data": {}}'
+    loads = mocker.Mock(side_effect=json.loads)
+    client = VaultClient(
+        "http://localhost:8200/",
+        "abc123",
+        codec=JSONCodec("mock", loads, lambda obj: b""),
+    )
+    res = client.get("/v1/secret/data/foo")
+    assert not loads.called
+    assert res.response == {"data": {}}
+
+
+def test_make_request_error_formatted_on_use(mocker, mock_http_call):
+    mock_http_call.return_value.status_code = HttpStatusCode.FORBIDDEN.value
+    mock_http_call.return_value.content = b'{"errors": ["permission denied"]}'
+    get_text = mocker.spy(VaultClient, "_get_text")
+    client = VaultClient("http://localhost:8200/", "abc123")
+    with pytest.raises(VaultClientException) as err:
+        client.get("/v1/secret/data/foo")
+    assert not get_text.called
+    assert str(err.value) == '403: {"errors": ["permission denied"]}'
+    assert err.value.message == str(err.value)
+    assert get_text.call_count == 1
+    assert err.value.response.response == {"errors": ["permission denied"]}
+    copy = pickle.loads(pickle.dumps(err.value))
+    assert copy.message == err.value.message
+    assert copy.status_code == HttpStatusCode.FORBIDDEN
+
+
+def test_request_body_encoded_with_codec(mocker, mock_http_call):
+    mock_http_call.return_value.status_code = HttpStatusCode.SUCCESS_DATA.value
+    dumps = mocker.Mock(return_value=b'{"a":1}')
+    client = VaultClient(
+        "http://localhost:8200/",
+        "abc123",
+        codec=JSONCodec("mock", json.loads, dumps),
+    )
+    client.post("/v1/secret/data/foo", data={"a": 1})
+    dumps.assert_called_once_with({"a": 1})
+    assert mock_http_call.call_args[1]["data"] == b'{"a":1}'
+    assert "json" not in mock_http_call.call_args[1]
@@ -0,0 +1,143 @@
+import json
+
+import pytest
+from snek.cluster import NodeRole, VaultClusterClient
+from snek.exceptions import VaultClientException
+from snek.retry import RetryPolicy
+
+NODES = ["http://vault-0:8200/", "http://vault-1:8200/", "http://vault-2:8200"]
+HEALTH = {"vault-0": 200, "vault-1": 473, "vault-2": 473}
+
+
+@pytest.fixture
+def fake_cluster(mocker, mock_http_call):
+    state = {"health": dict(HEALTH), "down": set(), "calls": []}
+
+    def request(method, url, **kwargs):
+        host = url.split("/")[2].split(":")[0]
+        state["calls"].append((method, url))
+        if host in state["down"]:
+            raise IOError(f"{host} unreachable")
+        response = mocker.Mock()
+        if url.endswith("/v1/sys/health"):
+            response.status_code = state["health"][host]
+        else:
+            response.status_code = 200
+            response.content = json.dumps({"host": host}).encode()
+        return response
+
+    mock_http_call.side_effect = request
+    return state
+
+
+@pytest.fixture
+def cluster(fake_cluster, clock):
+    client = VaultClusterClient(
+        NODES, "abc123", failure_threshold=2, cooldown=10, clock=clock
+    )
+    client.check_health()
+    return client
+
+
+class TestVaultClusterClient:
+    def test_requires_nodes(self):
+        with pytest.raises(ValueError):
+            VaultClusterClient([], "abc123")
+
+    def test_check_health(self, cluster):
+        roles = [node.role for node in cluster.nodes]
+        assert roles == [
+            NodeRole.ACTIVE,
+            NodeRole.PERFORMANCE_STANDBY,
+            NodeRole.PERFORMANCE_STANDBY,
+        ]
+        assert len(cluster.healthy_nodes()) == 3
+
+    def test_reads_go_to_standbys(self, cluster, fake_cluster):
+        assert cluster.get("/v1/secret/data/foo").response["host"] != "vault-0"
+        assert cluster.list("/v1/secret/metadata/").response["host"] != "vault-0"
+        assert fake_cluster["calls"][-1] == (
+            "LIST",
+            fake_cluster["calls"][-1][1],
+        )
+
+    def test_least_outstanding(self, cluster):
+        cluster.nodes[1].outstanding = 5
+        assert cluster.select_node("GET") is cluster.nodes[2]
+        cluster.nodes[2].outstanding = 6
+        assert cluster.select_node("GET") is cluster.nodes[1]
+
+    def test_ties_take_turns(self, cluster):
+        hosts = [
+            cluster.get("/v1/secret/data/foo").response["host"] for _ in range(100)
+        ]
+        assert hosts.count("vault-1") == hosts.count("vault-2") == 50
+
+    def test_writes_go_to_active(self, cluster, fake_cluster):
+        res = cluster.post("/v1/secret/data/foo", data={"data": {}})
+        assert res.response["host"] == "vault-0"
+        assert fake_cluster["calls"][-1][1] == "http://vault-0:8200/v1/secret/data/foo"
+
+    def test_reads_fall_back_to_active(self, cluster, fake_cluster):
+        cluster.nodes[1].role = cluster.nodes[2].role = NodeRole.STANDBY
+        cluster.get("/v1/secret/data/foo", params={"version": "2"})
+        assert fake_cluster["calls"][-1][1] == "http://vault-0:8200/v1/secret/data/foo"
+
+    def test_circuit_breaker(self, cluster, fake_cluster, clock):
+        fake_cluster["down"].add("vault-1")
+        cluster.nodes[2].outstanding = 1
+        for _ in range(2):
+            with pytest.raises(VaultClientException):
+                cluster.get("/v1/secret/data/foo")
+        assert not cluster.nodes[1].available(clock.now)
+        assert cluster.select_node("GET") is cluster.nodes[2]
+
+        fake_cluster["down"].clear()
+        clock.now = 11
+        assert cluster.select_node("GET") is cluster.nodes[1]
+
+    def test_health_check_reinstates(self, cluster, fake_cluster, clock):
+        fake_cluster["down"].add("vault-2")
+        cluster.check_health()
+        cluster.check_health()
+        assert cluster.nodes[2].role is NodeRole.UNHEALTHY
+        assert not cluster.nodes[2].available(clock.now)
+        fake_cluster["down"].clear()
+        cluster.check_health()
+        assert cluster.nodes[2].available(clock.now)
+        assert cluster.nodes[2].role is NodeRole.PERFORMANCE_STANDBY
+
+    def test_retry_moves_to_other_node(self, fake_cluster, clock, mocker):
+        mocker.patch("snek.client.time.sleep")
+        cluster = VaultClusterClient(
+            NODES, "abc123", clock=clock, retry=RetryPolicy(max_attempts=3)
+        )
+        cluster.check_health()
+        fake_cluster["down"].update({"vault-1", "vault-2"})
+        res = cluster.get("/v1/secret/data/foo")
+        assert res.response["host"] == "vault-0"
+        hosts = [url.split("/")[2] for _, url in fake_cluster["calls"][3:]]
+        assert sorted(hosts[:2]) == ["vault-1:8200", "vault-2:8200"]
+        assert cluster.nodes[1].available(clock.now)
+
+    def test_retry_single_node(self, fake_cluster, clock, mocker):
+        mocker.patch("snek.client.time.sleep")
+        cluster = VaultClusterClient(
+            NODES[:1], "abc123", clock=clock, retry=RetryPolicy(max_attempts=3)
+        )
+        fake_cluster["down"].add("vault-0")
+        with pytest.raises(VaultClientException):
+            cluster.get("/v1/secret/data/foo")
+        assert len(fake_cluster["calls"]) == 3
+
+    def test_failover_to_active_when_no_standbys(self, cluster, fake_cluster):
+        fake_cluster["health"].update({"vault-1": 503, "vault-2": 429})
+        cluster.check_health()
+        assert cluster.select_node("GET") is cluster.nodes[0]
+
+    def test_start_stop(self, fake_cluster, mocker):
+        with VaultClusterClient(NODES, "abc123", health_interval=0.01) as cluster:
+            assert cluster.nodes[0].role is NodeRole.ACTIVE
+            close = mocker.spy(cluster.transport, "close")
+        assert cluster._thread is None
+        close.assert_called_once_with()
@@ -0,0 +1,56 @@
+import sys
+
+import pytest
+from snek import codec
+from snek.codec import CODECS, get_codec
+
+PAYLOAD = {
+    "data": {
+        "data": {"password": "hunter2", "cert": "é\U0001f600\n" * 10},
+        "metadata": {"version": 3, "deletion_time": "", "destroyed": False},
+    },
+    "lease_duration": 0,
+    "renewable": False,
+}
+
+
+@pytest.fixture
+def no_default(monkeypatch):
+    monkeypatch.setattr(codec, "_default", None)
+
+
+@pytest.mark.parametrize("name", list(CODECS))
+def test_round_trip(name):
+    pytest.importorskip(name)
+    json_codec = get_codec(name)
+    assert json_codec.name == name
+    encoded = json_codec.dumps(PAYLOAD)
+    assert isinstance(encoded, bytes)
+    assert json_codec.loads(encoded) == PAYLOAD
+    assert json_codec.loads(encoded.decode()) == PAYLOAD
+
+
+@pytest.mark.parametrize("name", list(CODECS))
+def test_rejects_invalid(name):
+    pytest.importorskip(name)
+    with pytest.raises(ValueError):
+        get_codec(name).loads(b"<html>")
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        get_codec("yaml")
+
+
+def test_default_prefers_fastest(no_default):
+    pytest.importorskip("orjson")
+    assert get_codec().name == "orjson"
+    assert get_codec() is get_codec()
+
+
+def test_default_falls_back_to_stdlib(monkeypatch, no_default):
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    monkeypatch.setitem(sys.modules, "ujson", None)
+    assert get_codec().name == "json"
+    with pytest.raises(ImportError):
+        get_codec("orjson")
@@ -0,0 +1,160 @@
+import threading
+import time
+
+import pytest
+from snek.client import VaultClient
+from snek.governor import Governor, Limit, Priority, current_priority, priority
+from snek.secrets import KVSecretV2API
+from snek.transit import TransitAPI
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+class TestPriority:
+    def test_context(self):
+        assert current_priority() is Priority.NORMAL
+        with priority(Priority.BACKGROUND):
+            assert current_priority() is Priority.BACKGROUND
+            with priority(Priority.INTERACTIVE):
+                assert current_priority() is Priority.INTERACTIVE
+            assert current_priority() is Priority.BACKGROUND
+        assert current_priority() is Priority.NORMAL
+
+    def test_thread_local(self):
+        seen = []
+        with priority(Priority.BACKGROUND):
+            thread = threading.Thread(target=lambda: seen.append(current_priority()))
+            thread.start()
+            thread.join()
+        assert seen == [Priority.NORMAL]
+
+
+class TestGovernor:
+    def test_unlimited(self):
+        governor = Governor()
+        with governor.slot("http://vault/v1/secret/data/foo"):
+            assert governor.stats()[""].in_flight == 1
+        stats = governor.stats()[""]
+        assert stats.admitted == 1 and stats.in_flight == 0 and stats.delayed == 0
+
+    def test_path_limits(self):
+        governor = Governor(
+            path_limits={
+                "secret/": Limit(max_in_flight=2),
+                "/secret/data/batch/": Limit(max_in_flight=1),
+            }
+        )
+        with governor.slot("http://vault/v1/secret/data/batch/a"):
+            pass
+        with governor.slot("http://vault/v1/secret/data/app"):
+            pass
+        with governor.slot("http://vault/v1/transit/encrypt/key"):
+            pass
+        stats = governor.stats()
+        assert stats[""].admitted == 3
+        assert stats["secret/"].admitted == 1
+        assert stats["secret/data/batch/"].admitted == 1
+
+    def test_max_in_flight(self):
+        governor = Governor(Limit(max_in_flight=2))
+        lock = threading.Lock()
+        active = []
+        peak = []
+
+        def work():
+            with governor.slot("http://vault/v1/secret/data/foo"):
+                with lock:
+                    active.append(1)
+                    peak.append(len(active))
+                time.sleep(0.005)
+                with lock:
+                    active.pop()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert max(peak) == 2
+        stats = governor.stats()[""]
+        assert stats.admitted == 8
+        assert stats.delayed >= 1
+        assert stats.wait_time > 0
+
+    def test_priority_skips_ahead(self):
+        governor = Governor(Limit(max_in_flight=1))
+        uri = "http://vault/v1/secret/data/foo"
+        order = []
+
+        def work(level):
+            with governor.slot(uri, level):
+                order.append(level)
+
+        with governor.slot(uri):
+            background = threading.Thread(target=work, args=(Priority.BACKGROUND,))
+            background.start()
+            wait_for(lambda: governor.stats()[""].queued == 1)
+            interactive = threading.Thread(target=work, args=(Priority.INTERACTIVE,))
+            interactive.start()
+            wait_for(lambda: governor.stats()[""].queued == 2)
+        background.join()
+        interactive.join()
+        assert order == [Priority.INTERACTIVE, Priority.BACKGROUND]
+        assert governor.wait_histograms[Priority.BACKGROUND].count == 1
+        assert governor.wait_histograms[Priority.NORMAL].count == 1
+
+    def test_rate(self):
+        governor = Governor(Limit(rate=100, burst=1))
+        start = time.monotonic()
+        for _ in range(4):
+            with governor.slot("http://vault/v1/secret/data/foo"):
+                pass
+        assert time.monotonic() - start >= 0.025
+        assert governor.stats()[""].delayed == 3
+
+    def test_invalid_limits(self):
+        with pytest.raises(ValueError):
+            Governor(Limit(rate=0))
+        with pytest.raises(ValueError):
+            Governor(path_limits={"secret/": Limit(rate=10, burst=0.5)})
+
+    def test_releases_on_error(self):
+        governor = Governor(Limit(max_in_flight=1))
+        with pytest.raises(RuntimeError):
+            with governor.slot("http://vault/v1/secret/data/foo"):
+                raise RuntimeError
+        assert governor.stats()[""].in_flight == 0
+
+
+def test_client_uses_governor(mock_http_call):
+    mock_http_call.return_value.status_code = 200
+    governor = Governor(path_limits={"secret/": Limit(max_in_flight=1)})
+    client = VaultClient("http://localhost:8200/", "abc123", governor=governor)
+    client.get("/v1/secret/data/foo")
+    client.post("/v1/sys/mounts/foo", data={})
+    stats = governor.stats()
+    assert stats[""].admitted == 2
+    assert stats["secret/"].admitted == 1
+    assert stats[""].in_flight == 0
+
+
+def test_bulk_workers_inherit_priority(mock_http_call):
+    mock_http_call.return_value.status_code = 200
+    mock_http_call.return_value.content = (
+        b'{"data": {"version": 1, "batch_results": [{"ciphertext": "vault:v1:x"}]}}'
+    )
+    governor = Governor()
+    client = VaultClient("http://localhost:8200/", "abc123", governor=governor)
+    api = KVSecretV2API(client)
+    with priority(Priority.BACKGROUND):
+        list(api.write_many([("a", {}, None), ("b", {}, None)], max_concurrency=2))
+        api.read_many(["a", "b"], max_concurrency=2)
+        list(TransitAPI(client).encrypt_many("key", [b"x"]))
+    histograms = governor.wait_histograms
+    assert histograms[Priority.BACKGROUND].count == 5
+    assert histograms[Priority.NORMAL].count == 0
@@ -0,0 +1,101 @@
+from datetime import timedelta
+
+import pytest
+from snek.client import VaultClient
+from snek.exceptions import VaultClientException
+from snek.instrumentation import (
+    HistogramCollector,
+    LatencyHistogram,
+    RequestEvent,
+    RequestObserver,
+    normalize_path,
+)
+
+
+@pytest.mark.parametrize(
+    "uri,expected",
+    [
+        ("http://vault:8200/v1/secret/data/app/db?version=2", "/v1/secret/data/{path}"),
+        ("/v1/kv/metadata/a/b/c", "/v1/kv/metadata/{path}"),
+        ("http://vault/v1/sys/leases/renew/database/creds/x", "/v1/sys/leases/renew"),
+        ("http://vault/v1/transit/encrypt/orders", "/v1/transit/encrypt/{name}"),
+        ("http://vault/v1/sys/health", "/v1/sys/health"),
+    ],
+)
+def test_normalize_path(uri, expected):
+    assert normalize_path(uri) == expected
+
+
+def make_event(elapsed, error=None):
+    return RequestEvent(
+        method="GET",
+        uri="http://vault/v1/secret/data/foo",
+        path="/v1/secret/data/{path}",
+        status_code=200,
+        elapsed=elapsed,
+        time_to_headers=None,
+        transfer_time=None,
+        response_bytes=10,
+        decode_time=0.0,
+        error=error,
+    )
+
+
+class TestLatencyHistogram:
+    def test_percentiles(self):
+        histogram = LatencyHistogram(growth=1.01)
+        for ms in range(1, 101):
+            histogram.record(ms / 1000)
+        assert histogram.count == 100
+        assert histogram.percentile(0.5) == pytest.approx(0.050, rel=0.01)
+        assert histogram.percentile(0.99) == pytest.approx(0.099, rel=0.01)
+        assert histogram.percentile(1.0) == 0.1
+        assert histogram.mean == pytest.approx(0.0505)
+
+    def test_empty(self):
+        assert LatencyHistogram().percentile(0.5) == 0.0
+
+
+class TestHistogramCollector:
+    def test_summary(self):
+        collector = HistogramCollector()
+        collector.on_request(make_event(0.01))
+        collector.on_request(make_event(0.02, error="500: boom"))
+        summary = collector.summary()["GET /v1/secret/data/{path}"]
+        assert summary["count"] == 2
+        assert summary["errors"] == 1
+        assert summary["bytes"] == 20
+        assert summary["max"] == 0.02
+        assert collector.percentile("GET", "/v1/secret/data/{path}", 0.99) > 0.019
+        collector.reset()
+        assert collector.summary() == {}
+
+
+def test_client_reports_events(mocker, mock_http_call):
+    events = []
+    observer = RequestObserver()
+    observer.on_request = events.append
+    broken = mocker.Mock()
+    broken.on_request.side_effect = RuntimeError("ignored")
+    mock_http_call.return_value.status_code = 200
+    mock_http_call.return_value.content = b'{"data": {}}'
+    mock_http_call.return_value.elapsed = timedelta(milliseconds=1)
+    client = VaultClient(
+        "http://localhost:8200/", "abc123", observers=[broken, observer]
+    )
+    client.get("/v1/secret/data/foo/bar")
+    mock_http_call.return_value.status_code = 403
+    with pytest.raises(VaultClientException):
+        client.get("/v1/secret/data/foo/bar")
+    mock_http_call.side_effect = IOError("refused")
+    with pytest.raises(VaultClientException):
+        client.list("/v1/secret/metadata/foo")
+
+    assert [e.status_code for e in events] == [200, 403, None]
+    assert events[0].path == "/v1/secret/data/{path}"
+    assert events[0].response_bytes == 12
+    assert events[0].time_to_headers == 0.001
+    assert events[0].error is None
+    assert events[1].error.startswith("403")
+    assert events[2].method == "LIST"
+    assert events[2].error == "refused"
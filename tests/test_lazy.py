@@ -0,0 +1,73 @@
+import io
+import json
+
+import pytest
+from snek.lazy import LazyValue, index_object
+
+DOC = {
+    "a": 'x\\y"z',
+    "nested": {"list": [1, {"b": "}"}], "s": "[,]"},
+    "num": -1.5e3,
+    "flag": True,
+    "none": None,
+    "uni": "café \U0001f600",
+}
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_index_object(indent):
+    raw = json.dumps(DOC, indent=indent).encode()
+    spans = index_object(raw)
+    assert list(spans) == list(DOC)
+    for key, (start, end) in spans.items():
+        assert json.loads(raw[start:end]) == DOC[key]
+
+
+def test_index_nested_and_empty():
+    raw = b'{"outer": {}, "x": {"y": 1}}'
+    spans = index_object(raw)
+    assert index_object(raw, spans["outer"][0]) == {}
+    assert json.loads(raw[slice(*index_object(raw, spans["x"][0])["y"])]) == 1
+
+
+@pytest.mark.parametrize("raw", [b"[1, 2]", b'{"a": 1', b'{"a" 1}', b""])
+def test_index_malformed(raw):
+    with pytest.raises(ValueError):
+        index_object(raw)
+
+
+class TestLazyValue:
+    def test_mapping(self):
+        value = LazyValue(json.dumps(DOC).encode())
+        assert len(value) == len(DOC)
+        assert dict(value) == DOC
+        assert value["nested"] is value["nested"]
+        with pytest.raises(KeyError):
+            value["missing"]
+
+    def test_decodes_on_access(self, mocker):
+        loads = mocker.spy(json, "loads")
+        value = LazyValue(json.dumps({"big": "x" * 1000, "small": 1}).encode())
+        assert value["small"] == 1
+        assert all(len(c.args[0]) < 10 for c in loads.call_args_list)
+
+    def test_raw(self):
+        value = LazyValue(b'{"a": [1, 2]}')
+        assert bytes(value.raw("a")) == b"[1, 2]"
+
+    @pytest.mark.parametrize("ensure_ascii", [True, False])
+    @pytest.mark.parametrize("chunk_size", [64, 65, 66, 67, 100, 1 << 16])
+    def test_write_to_string(self, chunk_size, ensure_ascii):
+        text = "-----BEGIN CERTIFICATE-----\n" + 'ab\\c"é\U0001f600\t' * 500
+        text += "é\U0001f600abc" * 100
+        raw = json.dumps({"cert": text}, ensure_ascii=ensure_ascii).encode()
+        value = LazyValue(raw)
+        out = io.BytesIO()
+        assert value.write_to("cert", out, chunk_size=chunk_size) == len(out.getvalue())
+        assert out.getvalue().decode() == text
+
+    def test_write_to_json(self):
+        value = LazyValue(b'{"config": {"a": [1, 2]}}')
+        out = io.BytesIO()
+        value.write_to("config", out)
+        assert json.loads(out.getvalue()) == {"a": [1, 2]}
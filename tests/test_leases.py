@@ -0,0 +1,223 @@
+import threading
+
+import pytest
+from snek.exceptions import LeaseException, VaultClientException
+from snek.leases import Lease, LeaseManager, TimerWheel
+from snek.models import VaultResponse
+
+
+def creds(lease_id, duration=60, renewable=True, username="app"):
+    return VaultResponse(
+        {
+            "lease_id": lease_id,
+            "lease_duration": duration,
+            "renewable": renewable,
+            "data": {"username": username, "password": "hunter2"},
+        },
+        200,
+    )
+
+
+@pytest.fixture
+def client(mock_vault_client):
+    client = mock_vault_client
+    client.put.return_value = VaultResponse(
+        {"lease_id": "ignored", "lease_duration": 60, "renewable": True}, 200
+    )
+    return client
+
+
+@pytest.fixture
+def manager(client, clock):
+    return LeaseManager(client, jitter=0, clock=clock)
+
+
+class TestTimerWheel:
+    def test_fires_when_due(self):
+        wheel = TimerWheel(tick=1, slots=8)
+        wheel.schedule("a", 2.5)
+        wheel.schedule("b", 5)
+        assert wheel.advance(2) == []
+        assert wheel.advance(2.6) == ["a"]
+        assert wheel.advance(10) == ["b"]
+        assert len(wheel) == 0
+
+    def test_beyond_one_turn(self):
+        wheel = TimerWheel(tick=1, slots=4)
+        wheel.schedule("far", 9.5)
+        for now in range(1, 9):
+            assert wheel.advance(now) == []
+        assert wheel.advance(9.5) == ["far"]
+
+    def test_catches_up(self):
+        wheel = TimerWheel(tick=1, slots=4)
+        for i in range(10):
+            wheel.schedule(i, i)
+        assert sorted(wheel.advance(100)) == list(range(10))
+
+    def test_cancel_and_reschedule(self):
+        wheel = TimerWheel(tick=1, slots=8)
+        wheel.schedule("a", 1)
+        wheel.schedule("b", 1)
+        wheel.schedule("a", 3)
+        wheel.cancel("b")
+        assert wheel.advance(2) == []
+        assert wheel.advance(3) == ["a"]
+
+    def test_past_deadline(self):
+        wheel = TimerWheel(tick=1, slots=8)
+        wheel.advance(5)
+        wheel.schedule("late", 1)
+        assert wheel.advance(5) == ["late"]
+
+    def test_bad_arguments(self):
+        with pytest.raises(ValueError):
+            TimerWheel(tick=0)
+
+
+class TestLeaseManager:
+    def test_track(self, manager):
+        lease = manager.track(creds("database/creds/app/1"), name="db")
+        assert lease.lease_id == "database/creds/app/1"
+        assert lease.expires_at == 60
+        assert manager.credentials("db") == {"username": "app", "password": "hunter2"}
+        assert manager.track(creds("x/2")).lease_id == "x/2"
+        assert manager.lease("x/2") is not None
+        with pytest.raises(ValueError):
+            manager.track(VaultResponse({"data": {}}, 200))
+        with pytest.raises(LeaseException):
+            manager.credentials("missing")
+
+    def test_renews(self, manager, client, clock):
+        manager.increment = 120
+        manager.track(creds("db/1"), name="db")
+        clock.now = 39
+        assert manager.tick() == []
+        clock.now = 41
+        assert manager.tick() == ["db"]
+        client.put.assert_called_once_with(
+            "/v1/sys/leases/renew", data={"lease_id": "db/1", "increment": 120}
+        )
+        lease = manager.lease("db")
+        assert (lease.issued_at, lease.duration) == (41, 60)
+        clock.now = 80
+        assert manager.tick() == []
+        clock.now = 82
+        assert manager.tick() == ["db"]
+
+    def test_jitter(self, client, clock, mocker):
+        manager = LeaseManager(client, jitter=0.1, clock=clock)
+        schedule = mocker.spy(manager.wheel, "schedule")
+        for i in range(50):
+            manager.track(creds(f"db/{i}"))
+        deadlines = [c.args[1] for c in schedule.call_args_list]
+        assert all(36 <= d <= 44 for d in deadlines)
+        assert len(set(deadlines)) > 1
+
+    def test_fetches_when_not_renewable(self, manager, client, clock, mocker):
+        fetch = mocker.Mock(return_value=creds("db/2", username="next"))
+        manager.track(creds("db/1", renewable=False), name="db", fetch=fetch)
+        clock.now = 41
+        manager.tick()
+        assert not client.put.called
+        assert manager.credentials("db")["username"] == "next"
+        assert manager.lease("db").issued_at == 41
+
+    def test_fetches_near_max_ttl(self, manager, client, clock, mocker):
+        client.put.return_value = VaultResponse(
+            {"lease_duration": 5, "renewable": True}, 200
+        )
+        fetch = mocker.Mock(return_value=creds("db/2", username="next"))
+        manager.track(creds("db/1"), name="db", fetch=fetch)
+        clock.now = 41
+        manager.tick()
+        assert client.put.called
+        assert manager.credentials("db")["username"] == "next"
+
+    def test_retries_then_expires(self, manager, client, clock):
+        client.put.side_effect = VaultClientException("503: sealed", status_code=503)
+        manager.track(creds("db/1"), name="db")
+        clock.now = 41
+        manager.tick()
+        assert manager.credentials("db")["username"] == "app"
+        clock.now = 46
+        manager.tick()
+        assert client.put.call_count == 2
+        clock.now = 61
+        with pytest.raises(LeaseException, match="expired"):
+            manager.credentials("db")
+        manager.tick()
+        assert manager.lease("db") is None
+
+    def test_failed_fetch_keeps_old_credentials(self, manager, clock, mocker):
+        fetch = mocker.Mock(side_effect=VaultClientException("500: error"))
+        manager.track(creds("db/1", renewable=False), name="db", fetch=fetch)
+        clock.now = 41
+        manager.tick()
+        assert manager.credentials("db")["username"] == "app"
+        clock.now = 46
+        manager.tick()
+        assert fetch.call_count == 2
+
+    def test_register(self, manager, mocker):
+        fetch = mocker.Mock(return_value=creds("db/1"))
+        assert manager.register("db", fetch).lease_id == "db/1"
+        assert manager.credentials("db")["username"] == "app"
+
+    def test_register_failure(self, manager, mocker):
+        fetch = mocker.Mock(side_effect=VaultClientException("403: denied", 403))
+        with pytest.raises(LeaseException) as err:
+            manager.register("db", fetch)
+        assert err.value.status_code == 403
+
+    def test_revoke(self, manager, client):
+        manager.track(creds("db/1"), name="db")
+        manager.revoke("db")
+        client.put.assert_called_once_with(
+            "/v1/sys/leases/revoke", data={"lease_id": "db/1"}
+        )
+        assert len(manager) == 0 and len(manager.wheel) == 0
+
+    def test_stop_revokes(self, manager, client):
+        manager.track(creds("db/1"))
+        manager.track(creds("db/2"))
+        manager.stop(revoke=False)
+        assert not client.put.called
+        manager.stop()
+        revoked = {c.kwargs["data"]["lease_id"] for c in client.put.call_args_list}
+        assert revoked == {"db/1", "db/2"}
+
+    def test_stop_revokes_replaced_leases(self, manager, client, clock, mocker):
+        fetch = mocker.Mock(return_value=creds("db/2", username="next"))
+        manager.track(creds("db/1", renewable=False), name="db", fetch=fetch)
+        manager.track(creds("cache/1", duration=10), name="cache")
+        manager.track(creds("cache/2"), name="cache")
+        clock.now = 41
+        manager.tick()
+        assert manager.lease("db").lease_id == "db/2"
+        manager.stop()
+        revoked = {
+            c.kwargs["data"]["lease_id"]
+            for c in client.put.call_args_list
+            if c.args[0] == "/v1/sys/leases/revoke"
+        }
+        # cache/1 expired on its own and needs no revoking.
+        assert revoked == {"db/1", "db/2", "cache/2"}
+
+    def test_background_renewal(self, client):
+        renewed = threading.Event()
+        client.put.side_effect = lambda *args, **kwargs: renewed.set() or creds("x")
+        with LeaseManager(client, renew_fraction=0.01, tick=0.01) as manager:
+            manager.track(creds("db/1", duration=1))
+            assert renewed.wait(2)
+
+    def test_bad_arguments(self, client):
+        with pytest.raises(ValueError):
+            LeaseManager(client, renew_fraction=1)
+        with pytest.raises(ValueError):
+            LeaseManager(client, jitter=1)
+
+
+def test_lease_never_expires():
+    lease = Lease("auth/1", 0, False, 5.0, {})
+    assert lease.expires_at is None
@@ -1,3 +1,4 @@
+import pytest
 from snek.constants import HttpStatusCode
 from snek.models import VaultResponse
 
@@ -16,3 +17,28 @@ class TestVaultResponse:
         assert vr.ok
         vr.status_code = HttpStatusCode(500)
         assert not vr.ok
+
+    def test_unknown_status_code(self):
+        vr = VaultResponse({}, 412)
+        assert vr.status_code == 412
+        assert not vr.ok
+
+    def test_lazy_response(self, mocker):
+        loader = mocker.Mock(return_value={"foo": "bar"})
+        vr = VaultResponse(None, 200, loader=loader)
+        assert not loader.called
+        assert vr.response == {"foo": "bar"}
+        assert vr.response == {"foo": "bar"}
+        loader.assert_called_once_with()
+        vr.response = {}
+        assert vr.response == {}
+
+    def test_slots(self):
+        with pytest.raises(AttributeError):
+            VaultResponse({}, 200).foo = "bar"
+
+    def test_raw_dropped_after_decode(self):
+        vr = VaultResponse(None, 200, loader=lambda: {"foo": "bar"}, raw=b"{}")
+        assert vr.raw == b"{}"
+        assert vr.response == {"foo": "bar"}
+        assert vr.raw is None
@@ -0,0 +1,142 @@
+import os
+
+import pytest
+
+pytest.importorskip("cryptography")
+
+from snek.cache import SecretCache  # noqa: E402
+from snek.constants import HttpStatusCode  # noqa: E402
+from snek.exceptions import VaultClientException  # noqa: E402
+from snek.models import VaultResponse  # noqa: E402
+from snek.persistent_cache import PersistentSecretCache, generate_key  # noqa: E402
+from snek.secrets import KVSecretV2API  # noqa: E402
+
+VERSIONS = {"app/db": 3, "app/api": 1}
+
+
+@pytest.fixture
+def key():
+    return generate_key()
+
+
+@pytest.fixture
+def cache_file(tmp_path):
+    return str(tmp_path / "secrets.cache")
+
+
+@pytest.fixture
+def vault(mock_vault_client):
+    client = mock_vault_client
+    versions = dict(VERSIONS)
+
+    def get(api_path, params=None):
+        kind, path = api_path.split("/", 4)[3:]
+        if path not in versions:
+            raise VaultClientException(
+                "404: not found", status_code=HttpStatusCode.INVALID_PATH
+            )
+        if kind == "metadata":
+            return VaultResponse({"data": {"current_version": versions[path]}}, 200)
+        return VaultResponse(
+            {
+                "data": {
+                    "data": {"path": path, "version": versions[path]},
+                    "metadata": {"version": versions[path]},
+                }
+            },
+            200,
+        )
+
+    client.get.side_effect = get
+    client.versions = versions
+    return client
+
+
+@pytest.fixture
+def warm_file(vault, cache_file, key):
+    with PersistentSecretCache(cache_file, key) as cache:
+        api = KVSecretV2API(vault, cache=cache)
+        for path in VERSIONS:
+            api.read(path)
+        api.read("app/db", version=3)
+    vault.get.reset_mock()
+    return cache_file
+
+
+class TestPersistentSecretCache:
+    def test_empty(self, cache_file, key):
+        cache = PersistentSecretCache(cache_file, key)
+        assert len(cache) == 0
+        cache.flush()
+        assert os.stat(cache_file).st_mode & 0o777 == 0o600
+        with open(cache_file, "rb") as fp:
+            assert b"app" not in fp.read()
+
+    def test_cold_start_served_from_disk(self, vault, warm_file, key):
+        cache = PersistentSecretCache(warm_file, key)
+        api = KVSecretV2API(vault, cache=cache)
+        assert len(cache) == 3
+        assert api.read("app/db").value == {"path": "app/db", "version": 3}
+        assert api.read("app/db", version=3).value["version"] == 3
+        vault.get.assert_not_called()
+
+    def test_wrong_key_ignored(self, warm_file):
+        assert len(PersistentSecretCache(warm_file, generate_key())) == 0
+
+    def test_corrupt_file_ignored(self, cache_file, key):
+        with open(cache_file, "wb") as fp:
+            fp.write(b"garbage")
+        assert len(PersistentSecretCache(cache_file, key)) == 0
+
+    def test_max_age(self, warm_file, key, mocker):
+        mocker.patch("snek.persistent_cache.time.time", return_value=1e12)
+        assert len(PersistentSecretCache(warm_file, key)) == 0
+
+    def test_revalidate(self, vault, warm_file, key):
+        vault.versions["app/db"] = 4
+        del vault.versions["app/api"]
+        cache = PersistentSecretCache(warm_file, key)
+        api = KVSecretV2API(vault, cache=cache)
+        result = cache.revalidate(api)
+        assert (result.unchanged, result.updated, result.removed) == (0, 1, 1)
+        assert api.read("app/db").value["version"] == 4
+        # pinned versions are never revalidated
+        assert api.read("app/db", version=3).value["version"] == 3
+        assert cache.revalidate(api).updated == 0
+
+        reloaded = PersistentSecretCache(warm_file, key)
+        assert len(reloaded) == 2
+
+    def test_revalidate_layered(self, vault, warm_file, key):
+        vault.versions["app/db"] = 4
+        del vault.versions["app/api"]
+        cache = PersistentSecretCache(warm_file, key)
+        front = SecretCache()
+        api = KVSecretV2API(vault, cache=front)
+        api_key = (api.mount_path, "app/api", None)
+        front.set(api_key, cache.get(api_key))
+        result = cache.revalidate(api)
+        assert (result.updated, result.removed) == (1, 1)
+        for layer in (cache, front):
+            assert layer.get((api.mount_path, "app/db", None)).version == 4
+            assert layer.get(api_key) is None
+
+    def test_revalidate_unchanged_skips_read(self, vault, warm_file, key):
+        cache = PersistentSecretCache(warm_file, key)
+        result = cache.revalidate(KVSecretV2API(vault, cache=cache))
+        assert result.unchanged == 2
+        assert all("/metadata/" in c.args[0] for c in vault.get.call_args_list)
+
+    def test_revalidate_failure_keeps_entry(self, vault, warm_file, key):
+        vault.get.side_effect = VaultClientException("503: sealed", status_code=503)
+        cache = PersistentSecretCache(warm_file, key)
+        result = cache.revalidate(KVSecretV2API(vault, cache=cache))
+        assert result.failed == 2
+        assert len(cache) == 3
+
+    def test_start_revalidation(self, vault, warm_file, key):
+        vault.versions["app/api"] = 2
+        cache = PersistentSecretCache(warm_file, key)
+        api = KVSecretV2API(vault, cache=cache)
+        cache.start_revalidation(api).join()
+        assert api.read("app/api").value["version"] == 2
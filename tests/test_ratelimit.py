@@ -0,0 +1,47 @@
+import threading
+import time
+
+import pytest
+from snek.ratelimit import TokenBucket
+
+
+class TestTokenBucket:
+    def test_validation(self):
+        with pytest.raises(ValueError):
+            TokenBucket(0)
+        with pytest.raises(ValueError):
+            TokenBucket(1, burst=0)
+        with pytest.raises(ValueError):
+            TokenBucket(1, burst=0.5)
+
+    def test_burst_then_rate(self, clock):
+        bucket = TokenBucket(10, burst=2, clock=clock, sleep=clock.sleep)
+        assert bucket.acquire() == 0
+        assert bucket.acquire() == 0
+        assert bucket.acquire() == pytest.approx(0.1)
+        assert bucket.acquire() == pytest.approx(0.2)
+        assert clock.slept == [pytest.approx(0.1), pytest.approx(0.2)]
+
+    def test_refill_capped_at_burst(self, clock):
+        bucket = TokenBucket(10, burst=2, clock=clock, sleep=clock.sleep)
+        clock.now = 100
+        for _ in range(2):
+            assert bucket.try_acquire()
+        assert not bucket.try_acquire()
+        assert bucket.wait_time() == pytest.approx(0.1)
+        clock.now += 0.125
+        assert bucket.wait_time() == 0
+        assert bucket.try_acquire()
+
+    def test_threads_share_rate(self):
+        bucket = TokenBucket(1000, burst=1)
+        start = time.monotonic()
+        threads = [
+            threading.Thread(target=lambda: [bucket.acquire() for _ in range(10)])
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert time.monotonic() - start >= 0.039
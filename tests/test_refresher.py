@@ -0,0 +1,100 @@
+import time
+
+import pytest
+from snek.cache import SecretCache
+from snek.exceptions import VaultClientException
+from snek.models import VaultResponse
+from snek.refresher import SecretRefresher
+from snek.secrets import KVSecretV2API
+
+
+def secret_response(version, value):
+    return VaultResponse(
+        {"data": {"data": value, "metadata": {"version": version}}}, 200
+    )
+
+
+@pytest.fixture
+def mock_api(mock_vault_client):
+    client = mock_vault_client
+    client.get.return_value = secret_response(1, {"password": "a"})
+
+    def get(api_path, params=None):
+        latest = client.get.return_value
+        if "/metadata/" in api_path:
+            version = latest.response["data"]["metadata"]["version"]
+            return VaultResponse({"data": {"current_version": version}}, 200)
+        return latest
+
+    client.get.side_effect = get
+    return KVSecretV2API(client)
+
+
+def data_reads(api):
+    return sum("/data/" in c.args[0] for c in api.client.get.call_args_list)
+
+
+class TestSecretRefresher:
+    def test_get_before_refresh(self, mock_api):
+        refresher = SecretRefresher(mock_api)
+        refresher.register("app/db")
+        assert refresher.get("app/db") is None
+
+    def test_refresh_and_change_callbacks(self, mock_api):
+        changes = []
+        refresher = SecretRefresher(mock_api)
+        refresher.register("app/db", on_change=lambda *args: changes.append(args))
+        refresher.refresh()
+        assert refresher.get("app/db").value == {"password": "a"}
+        refresher.refresh()
+        assert changes == []
+        assert data_reads(mock_api) == 1
+
+        mock_api.client.get.return_value = secret_response(2, {"password": "b"})
+        refresher.refresh()
+        assert refresher.get("app/db").value == {"password": "b"}
+        assert data_reads(mock_api) == 2
+        path, new, old = changes[0]
+        assert path == "app/db"
+        assert (new.value, old.value) == ({"password": "b"}, {"password": "a"})
+
+    def test_failures_keep_last_good_value(self, mock_api):
+        errors = []
+        refresher = SecretRefresher(
+            mock_api, on_error=lambda path, err: errors.append(path)
+        )
+        refresher.register("app/db")
+        refresher.refresh()
+        mock_api.client.get.side_effect = VaultClientException("503: sealed")
+        refresher.refresh()
+        assert refresher.get("app/db").value == {"password": "a"}
+        assert errors == ["app/db"]
+
+    def test_writes_through_cache_layers(self, mock_api):
+        mock_api.cache = SecretCache()
+        outer = SecretCache()
+        refresher = SecretRefresher(mock_api, caches=[outer, mock_api.cache])
+        assert refresher.caches == [outer]
+        refresher.register("app/db")
+        refresher.refresh()
+        mock_api.client.get.return_value = secret_response(2, {"password": "b"})
+        refresher.refresh()
+        key = (mock_api.mount_path, "app/db", None)
+        for cache in (mock_api.cache, outer):
+            assert cache.get(key).value == {"password": "b"}
+
+    def test_unregister(self, mock_api):
+        refresher = SecretRefresher(mock_api)
+        refresher.register("app/db")
+        refresher.refresh()
+        refresher.unregister("app/db")
+        assert refresher.get("app/db") is None
+
+    def test_background_thread(self, mock_api):
+        with SecretRefresher(mock_api, interval=0.01) as refresher:
+            refresher.register("app/db")
+            deadline = time.monotonic() + 2
+            while refresher.get("app/db") is None and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert refresher.get("app/db").value == {"password": "a"}
+        assert refresher._thread is None
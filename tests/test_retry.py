@@ -0,0 +1,88 @@
+import pytest
+from snek.client import VaultClient
+from snek.constants import HttpMethod, HttpStatusCode
+from snek.exceptions import VaultClientException
+from snek.retry import RetryEvent, RetryPolicy
+
+
+class TestRetryPolicy:
+    def test_backoff_full_jitter(self):
+        policy = RetryPolicy(backoff_base=0.5, backoff_max=3, rng=lambda: 1.0)
+        assert [policy.backoff(n) for n in range(1, 6)] == [0.5, 1, 2, 3, 3]
+        policy = RetryPolicy(backoff_base=0.5, rng=lambda: 0.5)
+        assert policy.backoff(3) == 1
+
+    def test_is_retryable(self):
+        policy = RetryPolicy()
+        assert policy.is_retryable("GET", HttpStatusCode.VAULT_MAINTENANCE)
+        assert policy.is_retryable("LIST", None)
+        assert not policy.is_retryable("GET", HttpStatusCode.FORBIDDEN)
+        assert not policy.is_retryable("POST", HttpStatusCode.VAULT_MAINTENANCE)
+
+    def test_custom_methods_and_statuses(self):
+        policy = RetryPolicy(retry_methods=[HttpMethod.POST], retry_statuses=[429])
+        assert policy.is_retryable("POST", HttpStatusCode.HEALTH_STANDBY_NODE)
+        assert not policy.is_retryable("GET", HttpStatusCode.HEALTH_STANDBY_NODE)
+
+    def test_next_delay_limits(self):
+        events = []
+        policy = RetryPolicy(
+            max_attempts=3, deadline=1.0, on_retry=events.append, rng=lambda: 1.0
+        )
+        code = HttpStatusCode.INTERNAL_SERVER_ERROR
+        assert policy.next_delay("GET", 1, code, 0) == 0.1
+        assert policy.next_delay("GET", 3, code, 0) is None
+        assert policy.next_delay("GET", 2, code, 0.9) is None
+        assert events == [RetryEvent("GET", 1, 0.1, code)]
+
+    def test_bad_attempts(self):
+        with pytest.raises(ValueError):
+            RetryPolicy(max_attempts=0)
+
+
+@pytest.fixture
+def no_sleep(mocker):
+    return mocker.patch("snek.client.time.sleep")
+
+
+def test_make_request_retries(mocker, mock_http_call, no_sleep):
+    events = []
+    failure = mocker.Mock(status_code=503)
+    failure.content = b'{"errors": ["sealed"]}'
+    success = mocker.Mock(status_code=200)
+    success.content = b'{"ok": true}'
+    mock_http_call.side_effect = [IOError("reset"), failure, success]
+    client = VaultClient(
+        "http://localhost:8200/",
+        "abc123",
+        retry=RetryPolicy(max_attempts=3, on_retry=events.append),
+    )
+    res = client.get("/v1/sys/init")
+    assert res.response == {"ok": True}
+    assert mock_http_call.call_count == 3
+    assert [e.status_code for e in events] == [
+        None,
+        HttpStatusCode.VAULT_MAINTENANCE,
+    ]
+    assert no_sleep.call_count == 2
+
+
+def test_make_request_gives_up(mocker, mock_http_call, no_sleep):
+    mock_http_call.return_value = mocker.Mock(status_code=500)
+    mock_http_call.return_value.content = b"{}"
+    client = VaultClient(
+        "http://localhost:8200/", "abc123", retry=RetryPolicy(max_attempts=2)
+    )
+    with pytest.raises(VaultClientException) as err:
+        client.get("/v1/sys/init")
+    assert err.value.status_code == HttpStatusCode.INTERNAL_SERVER_ERROR
+    assert mock_http_call.call_count == 2
+
+
+def test_make_request_does_not_retry_post(mock_http_call, no_sleep):
+    mock_http_call.side_effect = IOError("reset")
+    client = VaultClient("http://localhost:8200/", "abc123", retry=RetryPolicy())
+    with pytest.raises(VaultClientException):
+        client.post("/v1/secret/data/foo", data={})
+    assert mock_http_call.call_count == 1
+    assert not no_sleep.called
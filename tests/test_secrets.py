@@ -1,4 +1,8 @@
+import json
+
 import pytest
+from snek.cache import SecretCache
+from snek.client import VaultClient
 from snek.constants import HttpStatusCode
 from snek.exceptions import (
     KV2SecretException,
@@ -6,7 +10,8 @@ from snek.exceptions import (
     SecretReadException,
     VaultClientException,
 )
-from snek.secrets import KVSecretV2, KVSecretV2API
+from snek.models import VaultResponse
+from snek.secrets import KVSecretV2, KVSecretV2API, WriteStatus
 
 
 @pytest.fixture
@@ -14,10 +19,24 @@ def test_kv2(test_client):
     return KVSecretV2API(test_client)
 
 
+@pytest.fixture
+def mock_vault_client(mock_vault_client):
+    client = mock_vault_client
+    client.get.return_value = VaultResponse(
+        {"data": {"data": {"foo": "bar"}, "metadata": {"version": 1}}}, 200
+    )
+    client.post.return_value = VaultResponse({"data": {"version": 2}}, 200)
+    return client
+
+
 class TestKVSecretV2:
     def test__str__(self):
         secret = KVSecretV2("/foo/bar")
         assert str(secret) == "/foo/bar: null"
+        res = VaultResponse({"data": {"data": {"a": 1}}}, 200)
+        secret = KVSecretV2("/foo/bar", vault_response=res)
+        # Formatted by the standard library whichever codec is installed.
+        assert str(secret) == '/foo/bar: {"data": {"a": 1}}'
 
     def test_create_or_update(self, test_kv2):
         assert test_kv2.create_or_update("foo/bar", {"foo": "bar"})
@@ -50,3 +69,353 @@ class TestKVSecretV2:
     def test_empty_secret(self):
         kv2 = KVSecretV2("foo/bar")
         assert kv2.data is None
+
+
+class TestKVSecretV2APICache:
+    def test_read_uses_cache(self, mock_vault_client):
+        cache = SecretCache()
+        kv2 = KVSecretV2API(mock_vault_client, cache=cache)
+        first = kv2.read("foo/bar")
+        assert kv2.read("foo/bar") is first
+        assert mock_vault_client.get.call_count == 1
+        kv2.read("foo/bar", version=1)
+        assert mock_vault_client.get.call_count == 2
+        assert cache.stats.hits == 1
+
+    def test_create_or_update_invalidates(self, mock_vault_client):
+        kv2 = KVSecretV2API(mock_vault_client, cache=SecretCache())
+        kv2.read("foo/bar")
+        kv2.create_or_update("foo/bar", {"foo": "baz"})
+        kv2.read("foo/bar")
+        assert mock_vault_client.get.call_count == 2
+
+    def test_failed_read_not_cached(self, mock_vault_client):
+        cache = SecretCache()
+        kv2 = KVSecretV2API(mock_vault_client, cache=cache)
+        mock_vault_client.get.side_effect = VaultClientException("404: nope")
+        with pytest.raises(SecretReadException):
+            kv2.read("foo/bar")
+        assert len(cache) == 0
+
+
+class TestKVSecretV2APIReadMany:
+    def test_read_many(self, mock_vault_client):
+        def get(api_path, params=None):
+            if api_path.endswith("missing"):
+                raise VaultClientException("404: not found")
+            return VaultResponse({"data": {"data": {"path": api_path}}}, 200)
+
+        mock_vault_client.get.side_effect = get
+        kv2 = KVSecretV2API(mock_vault_client)
+        paths = [f"app/{i}" for i in range(20)] + ["missing"]
+        results = kv2.read_many(paths, max_concurrency=4)
+        assert len(results) == 21
+        for i, secret in enumerate(results[:-1]):
+            assert secret.path == f"app/{i}"
+            assert secret.value == {"path": f"/v1/secret/data/app/{i}"}
+        assert isinstance(results[-1], SecretReadException)
+
+    def test_read_many_empty(self, mock_vault_client):
+        assert KVSecretV2API(mock_vault_client).read_many([]) == []
+
+    def test_read_many_bad_concurrency(self, mock_vault_client):
+        with pytest.raises(ValueError):
+            KVSecretV2API(mock_vault_client).read_many(["foo"], max_concurrency=0)
+
+
+TREE = {
+    "": ["a", "b/", "c/"],
+    "b/": ["x", "y/"],
+    "b/y/": ["z"],
+    "c/": ["w"],
+}
+
+
+@pytest.fixture
+def tree_client(mock_vault_client):
+    def list_keys(api_path, params=None):
+        path = api_path[len("/v1/secret/metadata/") :]
+        if path not in TREE:
+            raise VaultClientException("404: none", status_code=HttpStatusCode(404))
+        return VaultResponse({"data": {"keys": TREE[path]}}, 200)
+
+    def get(api_path, params=None):
+        path = api_path[len("/v1/secret/data/") :]
+        if path == "c/w":
+            raise VaultClientException("403: denied", status_code=HttpStatusCode(403))
+        return VaultResponse({"data": {"data": {"path": path}}}, 200)
+
+    mock_vault_client.list.side_effect = list_keys
+    mock_vault_client.get.side_effect = get
+    return mock_vault_client
+
+
+class TestKVSecretV2APIWalk:
+    def test_list(self, tree_client):
+        kv2 = KVSecretV2API(tree_client)
+        assert kv2.list("b/") == ["x", "y/"]
+        assert kv2.list("nothing/") == []
+
+    def test_list_fails(self, tree_client):
+        tree_client.list.side_effect = VaultClientException("403: denied")
+        with pytest.raises(SecretReadException):
+            KVSecretV2API(tree_client).list()
+
+    def test_walk(self, tree_client):
+        kv2 = KVSecretV2API(tree_client)
+        assert sorted(kv2.walk(max_concurrency=2)) == ["a", "b/x", "b/y/z", "c/w"]
+        assert sorted(kv2.walk("b")) == ["b/x", "b/y/z"]
+        assert sorted(kv2.walk(max_depth=1)) == ["a"]
+        assert sorted(kv2.walk(max_depth=2)) == ["a", "b/x", "c/w"]
+
+    def test_walk_include_secrets(self, tree_client):
+        kv2 = KVSecretV2API(tree_client)
+        results = dict(kv2.walk(include_secrets=True, max_concurrency=3))
+        assert sorted(results) == ["a", "b/x", "b/y/z", "c/w"]
+        assert results["b/y/z"].value == {"path": "b/y/z"}
+        assert isinstance(results["c/w"], SecretReadException)
+
+    def test_walk_stops_early(self, tree_client):
+        walker = KVSecretV2API(tree_client).walk()
+        assert next(walker)
+        walker.close()
+
+    def test_walk_takes_keys_lazily(self, tree_client):
+        taken = []
+
+        def keys():
+            for i in range(1000):
+                taken.append(i)
+                yield f"k{i}"
+
+        tree_client.list.side_effect = lambda api_path, params=None: VaultResponse(
+            {"data": {"keys": keys()}}, 200
+        )
+        walker = KVSecretV2API(tree_client).walk(
+            include_secrets=True, max_concurrency=2
+        )
+        assert next(walker)
+        assert len(taken) <= 3
+        walker.close()
+
+
+class TestKVSecretV2APIWriteMany:
+    def test_write_many(self, mock_vault_client):
+        def post(api_path, data=None):
+            path = api_path.rsplit("/", 1)[-1]
+            if path == "cas":
+                raise VaultClientException(
+                    '400: {"errors": ["check-and-set parameter did not match"]}',
+                    status_code=HttpStatusCode.INVALID_REQUEST,
+                )
+            if path == "denied":
+                raise VaultClientException(
+                    "403: permission denied", status_code=HttpStatusCode.FORBIDDEN
+                )
+            if path == "down":
+                raise VaultClientException("Connection refused")
+            if path == "sealed":
+                raise VaultClientException("503: sealed", status_code=503)
+            if path == "bad":
+                raise VaultClientException(
+                    "400: bad", status_code=HttpStatusCode.INVALID_REQUEST
+                )
+            return VaultResponse({"data": {"version": data["options"]["cas"]}}, 200)
+
+        mock_vault_client.post.side_effect = post
+        kv2 = KVSecretV2API(mock_vault_client)
+        names = ["a", "cas", "denied", "down", "sealed", "bad", "b"]
+        items = ((name, {"v": 1}, i) for i, name in enumerate(names))
+        results = sorted(kv2.write_many(items, max_concurrency=3))
+        assert [result.position for result in results] == list(range(len(names)))
+        assert [result.status for result in results] == [
+            WriteStatus.OK,
+            WriteStatus.CAS_CONFLICT,
+            WriteStatus.PERMISSION_DENIED,
+            WriteStatus.TRANSIENT,
+            WriteStatus.TRANSIENT,
+            WriteStatus.FAILED,
+            WriteStatus.OK,
+        ]
+        assert results[0].ok and results[0].version == 0
+        assert results[-1].version == 6
+        assert results[3].retryable and not results[1].retryable
+        assert results[2].error.status_code == HttpStatusCode.FORBIDDEN
+
+    def test_write_many_rate_limited(self, mock_http_call, mocker):
+        def request(method, uri, **kwargs):
+            limited = uri.endswith("/limited")
+            return mocker.Mock(
+                status_code=429 if limited else 200,
+                content=(
+                    b'{"errors": ["request path \\"secret/data/limited\\": '
+                    b'rate limit quota exceeded"]}'
+                    if limited
+                    else b'{"data": {"version": 1}}'
+                ),
+            )
+
+        mock_http_call.side_effect = request
+        kv2 = KVSecretV2API(VaultClient("http://localhost:8200/", "abc"))
+        items = [("ok", {"v": 1}, None), ("limited", {"v": 1}, None)]
+        results = sorted(kv2.write_many(items))
+        assert [result.status for result in results] == [
+            WriteStatus.OK,
+            WriteStatus.TRANSIENT,
+        ]
+        assert results[1].retryable
+        assert "rate limit quota exceeded" in results[1].error.message
+
+    def test_write_many_streams_input(self, mock_vault_client):
+        pulled = []
+
+        def items():
+            for i in range(100):
+                pulled.append(i)
+                yield f"app/{i}", {"v": i}, None
+
+        results = KVSecretV2API(mock_vault_client).write_many(
+            items(), max_concurrency=2
+        )
+        next(results)
+        assert len(pulled) <= 3
+        results.close()
+        assert len(pulled) < 100
+
+    def test_write_many_rate_limit(self, mock_vault_client, mocker):
+        acquire = mocker.patch("snek.secrets.TokenBucket.acquire")
+        items = [(f"app/{i}", {}, None) for i in range(5)]
+        kv2 = KVSecretV2API(mock_vault_client)
+        assert len(list(kv2.write_many(items, rate_limit=100))) == 5
+        assert acquire.call_count == 5
+
+    def test_write_many_bad_concurrency(self, mock_vault_client):
+        with pytest.raises(ValueError):
+            list(KVSecretV2API(mock_vault_client).write_many([], max_concurrency=0))
+
+    def test_create_or_update_keeps_status(self, mock_vault_client):
+        mock_vault_client.post.side_effect = VaultClientException(
+            "403: denied", status_code=HttpStatusCode.FORBIDDEN
+        )
+        with pytest.raises(SecretCreateUpdateException) as err:
+            KVSecretV2API(mock_vault_client).create_or_update("foo", {})
+        assert err.value.status_code == HttpStatusCode.FORBIDDEN
+        assert "403: denied" in err.value.message
+
+
+class TestKVSecretV2APIMetadata:
+    @pytest.fixture
+    def versioned_client(self, mock_vault_client):
+        state = {"version": 3}
+
+        def get(api_path, params=None):
+            if "/metadata/" in api_path:
+                if api_path.endswith("missing"):
+                    raise VaultClientException(
+                        "404: not found", status_code=HttpStatusCode.INVALID_PATH
+                    )
+                return VaultResponse(
+                    {"data": {"current_version": state["version"]}}, 200
+                )
+            return VaultResponse(
+                {
+                    "data": {
+                        "data": {"v": state["version"]},
+                        "metadata": {"version": state["version"]},
+                    }
+                },
+                200,
+            )
+
+        mock_vault_client.get.side_effect = get
+        mock_vault_client.state = state
+        return mock_vault_client
+
+    def test_version_populated(self, versioned_client):
+        kv2 = KVSecretV2API(versioned_client)
+        assert kv2.read("foo").version == 3
+        assert kv2.create_or_update("foo", {}).version == 2
+
+    def test_read_metadata(self, versioned_client):
+        kv2 = KVSecretV2API(versioned_client)
+        assert kv2.read_metadata("foo") == {"current_version": 3}
+        assert kv2.current_version("foo") == 3
+        versioned_client.get.assert_called_with("/v1/secret/metadata/foo")
+        with pytest.raises(SecretReadException) as err:
+            kv2.current_version("missing")
+        assert err.value.status_code == HttpStatusCode.INVALID_PATH
+
+    def test_read_if_changed(self, versioned_client):
+        kv2 = KVSecretV2API(versioned_client)
+        known = kv2.read("foo")
+        assert kv2.read_if_changed("foo", known) is None
+        assert versioned_client.get.call_count == 2
+        versioned_client.state["version"] = 4
+        fresh = kv2.read_if_changed("foo", known)
+        assert fresh.version == 4 and fresh.value == {"v": 4}
+        assert kv2.read_if_changed("foo").version == 4
+
+    def test_read_if_changed_uses_cache(self, versioned_client):
+        cache = SecretCache()
+        kv2 = KVSecretV2API(versioned_client, cache=cache)
+        kv2.read("foo")
+        assert kv2.read_if_changed("foo") is None
+        versioned_client.state["version"] = 5
+        assert kv2.read_if_changed("foo").version == 5
+        assert kv2.read("foo").version == 5
+
+
+def lazy_response(body):
+    raw = json.dumps(body).encode()
+    return VaultResponse(None, 200, loader=lambda: json.loads(raw), raw=raw)
+
+
+class TestKVSecretV2Lazy:
+    BODY = {
+        "data": {
+            "data": {"cert": "-----BEGIN-----\n" + "A" * 5000, "port": 5432},
+            "metadata": {"version": 7},
+        }
+    }
+
+    def test_lazy(self):
+        res = lazy_response(self.BODY)
+        secret = KVSecretV2("app/tls", vault_response=res, lazy=True)
+        assert secret.version == 7
+        assert res.raw is not None
+        assert secret.value["port"] == 5432
+        assert dict(secret.value) == self.BODY["data"]["data"]
+        assert str(secret).startswith('app/tls: {"data": {"cert"')
+        assert secret.data == self.BODY["data"]
+
+    def test_write_value(self, tmp_path):
+        target = tmp_path / "cert.pem"
+        for lazy in (True, False):
+            secret = KVSecretV2(
+                "app/tls", vault_response=lazy_response(self.BODY), lazy=lazy
+            )
+            with open(target, "wb") as fp:
+                secret.write_value("cert", fp, chunk_size=256)
+            assert target.read_text() == self.BODY["data"]["data"]["cert"]
+
+    def test_falls_back_without_raw(self):
+        res = VaultResponse(self.BODY, 200)
+        secret = KVSecretV2("app/tls", vault_response=res, lazy=True)
+        assert secret.value == self.BODY["data"]["data"]
+        assert secret.version == 7
+
+    def test_deleted_version(self):
+        body = {"data": {"data": None, "metadata": {"version": 2}}}
+        secret = KVSecretV2("app/tls", vault_response=lazy_response(body), lazy=True)
+        assert secret.version == 2
+        assert secret.value is None
+
+    def test_slots(self):
+        with pytest.raises(AttributeError):
+            KVSecretV2("foo").extra = 1
+
+    def test_api_lazy(self, mock_vault_client):
+        mock_vault_client.get.return_value = lazy_response(self.BODY)
+        secret = KVSecretV2API(mock_vault_client, lazy=True).read("app/tls")
+        assert secret.value["port"] == 5432
+        assert mock_vault_client.get.return_value.raw is not None
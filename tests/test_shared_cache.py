@@ -0,0 +1,225 @@
+import multiprocessing
+import os
+import socket
+import struct
+import threading
+
+import pytest
+from snek.cache import SecretCache
+from snek.constants import HttpStatusCode
+from snek.exceptions import VaultClientException
+from snek.models import VaultResponse
+from snek.secrets import KVSecretV2API
+from snek.shared_cache import SecretCacheServer, SharedSecretCache, _UnixServer
+
+VERSIONS = {"app/db": 3, "app/api": 1}
+
+
+@pytest.fixture
+def vault(mock_vault_client):
+    client = mock_vault_client
+    versions = dict(VERSIONS)
+
+    def get(api_path, params=None):
+        kind, path = api_path.split("/", 4)[3:]
+        if path not in versions:
+            raise VaultClientException(
+                "404: not found", status_code=HttpStatusCode.INVALID_PATH
+            )
+        if kind == "metadata":
+            return VaultResponse({"data": {"current_version": versions[path]}}, 200)
+        return VaultResponse(
+            {
+                "data": {
+                    "data": {"path": path, "version": versions[path]},
+                    "metadata": {"version": versions[path]},
+                }
+            },
+            200,
+        )
+
+    client.get.side_effect = get
+    client.post.return_value = VaultResponse({"data": {"version": 4}}, 200)
+    client.versions = versions
+    return client
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / "secrets.sock")
+
+
+@pytest.fixture
+def server(socket_path):
+    with SecretCacheServer(socket_path) as server:
+        yield server
+
+
+def _child_read(socket_path, cache, queue):
+    secret = cache.get(("/v1/secret", "app/db", None))
+    other = SharedSecretCache(socket_path).get(("/v1/secret", "app/db", None))
+    queue.put((secret.value, other.version))
+
+
+class TestSharedSecretCache:
+    def test_shared_between_processes(self, vault, server, socket_path):
+        first = KVSecretV2API(vault, cache=SharedSecretCache(socket_path))
+        second = KVSecretV2API(vault, cache=SharedSecretCache(socket_path))
+        assert first.read("app/db").value == {"path": "app/db", "version": 3}
+        secret = second.read("app/db")
+        assert vault.get.call_count == 1
+        assert secret.version == 3
+        assert secret.value == {"path": "app/db", "version": 3}
+        assert second.cache.stats == first.cache.stats
+        assert (first.cache.stats.hits, len(first.cache)) == (1, 1)
+
+    def test_write_invalidates_everywhere(self, vault, server, socket_path):
+        first = KVSecretV2API(vault, cache=SharedSecretCache(socket_path))
+        second = KVSecretV2API(vault, cache=SharedSecretCache(socket_path))
+        first.read("app/db")
+        first.read("app/db", version=3)
+        second.create_or_update("app/db", {"password": "new"})
+        assert first.cache.get((first.mount_path, "app/db", None)) is None
+        assert first.cache.get((first.mount_path, "app/db", 3)).version == 3
+
+    def test_clear(self, vault, server, socket_path):
+        cache = SharedSecretCache(socket_path)
+        KVSecretV2API(vault, cache=cache).read("app/db")
+        cache.clear()
+        assert len(cache) == 0
+
+    def test_items(self, vault, server, socket_path):
+        cache = SharedSecretCache(socket_path)
+        api = KVSecretV2API(vault, cache=cache)
+        api.read("app/db")
+        api.read("app/api", version=1)
+        items = cache.items()
+        assert [key for key, _ in items] == [
+            (api.mount_path, "app/db", None),
+            (api.mount_path, "app/api", 1),
+        ]
+        assert [secret.version for _, secret in items] == [3, 1]
+        assert items[1][1].value == {"path": "app/api", "version": 1}
+        assert server.cache.stats.hits == 0
+
+    def test_server_unavailable(self, vault, socket_path):
+        cache = SharedSecretCache(socket_path, timeout=0.1)
+        api = KVSecretV2API(vault, cache=cache)
+        assert api.read("app/db").version == 3
+        api.create_or_update("app/db", {"password": "new"})
+        assert cache.get((api.mount_path, "app/db", None)) is None
+        assert cache.items() == []
+        assert cache.stats.size == 0
+
+    def test_malformed_reply_is_a_miss(self, socket_path):
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(socket_path)
+        listener.listen()
+
+        def serve():
+            for reply in (struct.pack(">I", 2**31), struct.pack(">I", 3) + b"{{{"):
+                conn, _ = listener.accept()
+                conn.recv(1024)
+                conn.sendall(reply)
+                conn.recv(1024)
+                conn.close()
+
+        thread = threading.Thread(target=serve, daemon=True)
+        thread.start()
+        cache = SharedSecretCache(socket_path)
+        assert cache.get(("/v1/secret", "app/db", None)) is None
+        assert cache.get(("/v1/secret", "app/db", None)) is None
+        cache._close()
+        thread.join(5)
+        listener.close()
+
+    def test_reconnects_after_restart(self, vault, socket_path):
+        cache = SharedSecretCache(socket_path)
+        api = KVSecretV2API(vault, cache=cache)
+        with SecretCacheServer(socket_path):
+            api.read("app/db")
+        with SecretCacheServer(socket_path):
+            assert cache.get((api.mount_path, "app/db", None)) is None
+            api.read("app/db")
+            assert cache.get((api.mount_path, "app/db", None)).version == 3
+
+    @pytest.mark.skipif(
+        "fork" not in multiprocessing.get_all_start_methods(),
+        reason="needs fork",
+    )
+    @pytest.mark.filterwarnings("ignore::DeprecationWarning")
+    def test_forked_child(self, vault, server, socket_path):
+        cache = SharedSecretCache(socket_path)
+        KVSecretV2API(vault, cache=cache).read("app/db")
+        context = multiprocessing.get_context("fork")
+        queue = context.Queue()
+        child = context.Process(target=_child_read, args=(socket_path, cache, queue))
+        child.start()
+        assert queue.get(timeout=10) == ({"path": "app/db", "version": 3}, 3)
+        child.join(10)
+        assert cache.stats.hits == 2
+
+
+class TestSecretCacheServer:
+    def test_socket_permissions(self, socket_path, mocker):
+        modes = []
+        activate = _UnixServer.server_activate
+
+        def server_activate(server):
+            modes.append(os.stat(socket_path).st_mode & 0o777)
+            activate(server)
+
+        mocker.patch.object(_UnixServer, "server_activate", server_activate)
+        with SecretCacheServer(socket_path):
+            assert os.stat(socket_path).st_mode & 0o777 == 0o600
+        # Already private when it started listening.
+        assert modes == [0o600]
+
+    def test_second_server_refused(self, server, socket_path):
+        with pytest.raises(OSError):
+            SecretCacheServer(socket_path).start()
+
+    def test_removes_stale_socket(self, socket_path):
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(socket_path)
+        stale.close()
+        with SecretCacheServer(socket_path):
+            assert os.path.exists(socket_path)
+        assert not os.path.exists(socket_path)
+
+    def test_rejects_cached_api(self, vault, socket_path):
+        with pytest.raises(ValueError):
+            SecretCacheServer(
+                socket_path, api=KVSecretV2API(vault, cache=SecretCache())
+            )
+
+    def test_refresh(self, vault, socket_path, clock):
+        server = SecretCacheServer(
+            socket_path, api=KVSecretV2API(vault), ttl=10, clock=clock
+        )
+        with server:
+            cache = SharedSecretCache(socket_path)
+            api = KVSecretV2API(vault, cache=cache)
+            for path in VERSIONS:
+                api.read(path)
+            api.read("app/db", version=3)
+            vault.versions["app/db"] = 4
+            del vault.versions["app/api"]
+            assert server.refresh() == {"updated": 1, "removed": 1}
+            assert cache.get((api.mount_path, "app/db", None)).value == {
+                "path": "app/db",
+                "version": 4,
+            }
+            assert cache.get((api.mount_path, "app/api", None)) is None
+
+            # Refreshing keeps the entry alive, but only while it is used.
+            clock.now = 6
+            assert server.refresh() == {"unchanged": 1}
+            clock.now = 12
+            assert server.refresh() == {}
+            assert cache.get((api.mount_path, "app/db", None)) is not None
+            clock.now = 17
+            assert cache.get((api.mount_path, "app/db", None)) is None
+
+    def test_refresh_without_api(self, server):
+        assert server.refresh() == {}
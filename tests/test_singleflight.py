@@ -0,0 +1,145 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from snek.client import VaultClient
+from snek.singleflight import AsyncSingleFlight, SingleFlight
+
+
+class TestSingleFlight:
+    def test_shares_result(self):
+        flight = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def slow():
+            calls.append(1)
+            release.wait(2)
+            return object()
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(flight.do("k", slow)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 2
+        while flight.coalesced < 4 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+        assert len(calls) == 1
+        assert len(results) == 5
+        assert all(result is results[0] for result in results)
+
+    def test_shares_exception(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        errors = []
+
+        def failing():
+            started.set()
+            release.wait(2)
+            raise ValueError("boom")
+
+        def call():
+            try:
+                flight.do("k", failing)
+            except ValueError as err:
+                errors.append(err)
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait(2)
+        follower = threading.Thread(target=call)
+        follower.start()
+        while not flight.coalesced:
+            time.sleep(0.001)
+        release.set()
+        leader.join()
+        follower.join()
+        assert len(errors) == 2
+        assert errors[0] is errors[1]
+
+    def test_sequential_calls_not_shared(self):
+        flight = SingleFlight()
+        assert flight.do("k", lambda: 1) == 1
+        assert flight.do("k", lambda: 2) == 2
+        assert flight.coalesced == 0
+
+
+class TestAsyncSingleFlight:
+    def test_shares_result(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return len(calls)
+
+        async def go():
+            return await asyncio.gather(*(flight.do("k", slow) for _ in range(5)))
+
+        assert asyncio.run(go()) == [1] * 5
+        assert flight.coalesced == 4
+
+    def test_shares_exception(self):
+        flight = AsyncSingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        async def go():
+            return await asyncio.gather(
+                *(flight.do("k", failing) for _ in range(3)), return_exceptions=True
+            )
+
+        errors = asyncio.run(go())
+        assert all(isinstance(err, ValueError) for err in errors)
+
+
+def test_client_coalesces_gets(mocker, mock_http_call):
+    release = threading.Event()
+
+    def slow_request(*args, **kwargs):
+        release.wait(2)
+        response = mocker.Mock(status_code=200)
+        response.content = b'{"data": {}}'
+        return response
+
+    mock_http_call.side_effect = slow_request
+    client = VaultClient("http://localhost:8200/", "abc123", coalesce_reads=True)
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(
+                client.get("/v1/secret/data/foo", params={"version": None})
+            )
+        )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 2
+    while client.singleflight.coalesced < 3 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert mock_http_call.call_count == 1
+    assert all(result is results[0] for result in results)
+
+
+@pytest.mark.parametrize("other", [{"version": "2"}, None])
+def test_client_does_not_coalesce_different_params(mock_http_call, other):
+    mock_http_call.return_value.status_code = 204
+    client = VaultClient("http://localhost:8200/", "abc123", coalesce_reads=True)
+    client.get("/v1/secret/data/foo", params={"version": "1"})
+    client.get("/v1/secret/data/foo", params=other)
+    assert mock_http_call.call_count == 2
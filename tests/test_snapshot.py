@@ -0,0 +1,144 @@
+import gzip
+import json
+
+import pytest
+from snek.client import VaultClient
+from snek.constants import HttpStatusCode
+from snek.exceptions import SnapshotException, VaultClientException
+from snek.models import VaultResponse
+from snek.secrets import KVSecretV2API
+from snek.snapshot import export_mount, import_mount
+
+
+class FakeKV:
+    """Minimal in-memory KV2 backend behind a mocked VaultClient."""
+
+    def __init__(self, mocker, secrets=None):
+        self.secrets = dict(secrets or {})
+        self.unreadable = set()
+        self.client = mocker.Mock(spec=VaultClient)
+        self.client.list.side_effect = self.list
+        self.client.get.side_effect = self.get
+        self.client.post.side_effect = self.post
+
+    def list(self, api_path, params=None):
+        prefix = api_path[len("/v1/secret/metadata/") :]
+        keys = set()
+        for path in self.secrets:
+            if path.startswith(prefix):
+                rest = path[len(prefix) :]
+                keys.add(rest.split("/")[0] + "/" if "/" in rest else rest)
+        if not keys:
+            raise VaultClientException("404", status_code=HttpStatusCode(404))
+        return VaultResponse({"data": {"keys": sorted(keys)}}, 200)
+
+    def get(self, api_path, params=None):
+        path = api_path[len("/v1/secret/data/") :]
+        if path in self.unreadable:
+            raise VaultClientException("403", status_code=HttpStatusCode(403))
+        data = {"data": self.secrets[path], "metadata": {"version": 1}}
+        raw = json.dumps({"data": data}).encode()
+        return VaultResponse(None, 200, loader=lambda: json.loads(raw), raw=raw)
+
+    def post(self, api_path, data=None):
+        path = api_path[len("/v1/secret/data/") :]
+        if data["options"].get("cas") == 0 and path in self.secrets:
+            raise VaultClientException("400: cas", status_code=HttpStatusCode(400))
+        self.secrets[path] = data["data"]
+        return VaultResponse({"data": {"version": 1}}, 200)
+
+
+SECRETS = {f"app/{i:02d}": {"n": i} for i in range(10)}
+SECRETS.update({"db/creds": {"user": "u"}, "top": {"a": 1}})
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_round_trip(mocker, tmp_path, compress):
+    source = FakeKV(mocker, SECRETS)
+    target = FakeKV(mocker)
+    snapshot = str(tmp_path / "snap")
+    result = export_mount(
+        KVSecretV2API(source.client), snapshot, compress=compress, batch_size=3
+    )
+    assert result.written == len(SECRETS)
+    with open(snapshot, "rb") as fp:
+        assert (fp.read(2) == b"\x1f\x8b") is compress
+
+    result = import_mount(KVSecretV2API(target.client), snapshot, max_concurrency=3)
+    assert result.written == len(SECRETS)
+    assert target.secrets == SECRETS
+
+
+def test_export_lazy(mocker, tmp_path):
+    source = FakeKV(mocker, SECRETS)
+    snapshot = tmp_path / "snap"
+    result = export_mount(KVSecretV2API(source.client, lazy=True), str(snapshot))
+    assert result.written == len(SECRETS)
+    records = [json.loads(line) for line in snapshot.open()]
+    assert {r["path"]: r["data"] for r in records} == SECRETS
+    assert {r["version"] for r in records} == {1}
+
+
+def test_export_prefix(mocker, tmp_path):
+    source = FakeKV(mocker, SECRETS)
+    snapshot = tmp_path / "snap"
+    export_mount(KVSecretV2API(source.client), str(snapshot), prefix="db")
+    assert [json.loads(line)["path"] for line in snapshot.open()] == ["db/creds"]
+
+
+def test_export_resume(mocker, tmp_path):
+    source = FakeKV(mocker, SECRETS)
+    source.unreadable.add("app/05")
+    snapshot = str(tmp_path / "snap")
+    checkpoint = str(tmp_path / "checkpoint")
+    api = KVSecretV2API(source.client)
+    with pytest.raises(SnapshotException):
+        export_mount(
+            api, snapshot, compress=True, checkpoint_path=checkpoint, batch_size=2
+        )
+
+    source.unreadable.clear()
+    result = export_mount(
+        api, snapshot, compress=True, checkpoint_path=checkpoint, batch_size=2
+    )
+    assert result.written == len(SECRETS) - 4
+    with gzip.open(snapshot) as fp:
+        paths = [json.loads(line)["path"] for line in fp]
+    assert paths == sorted(SECRETS)
+
+
+def test_export_skip_errors(mocker, tmp_path):
+    source = FakeKV(mocker, SECRETS)
+    source.unreadable.add("top")
+    result = export_mount(
+        KVSecretV2API(source.client), str(tmp_path / "snap"), skip_errors=True
+    )
+    assert result.skipped == 1
+    assert result.written == len(SECRETS) - 1
+
+
+def test_import_cas_and_resume(mocker, tmp_path):
+    snapshot = tmp_path / "snap"
+    snapshot.write_text(
+        "".join(json.dumps({"path": p, "data": d}) + "\n" for p, d in SECRETS.items())
+    )
+    target = FakeKV(mocker, {"app/03": {"n": "kept"}})
+    api = KVSecretV2API(target.client)
+    checkpoint = str(tmp_path / "checkpoint")
+    with pytest.raises(SnapshotException, match="app/03"):
+        import_mount(
+            api,
+            str(snapshot),
+            cas=0,
+            checkpoint_path=checkpoint,
+            max_concurrency=1,
+            checkpoint_every=1,
+        )
+    assert json.load(open(checkpoint)) == {"line": 3}
+
+    result = import_mount(
+        api, str(snapshot), cas=0, checkpoint_path=checkpoint, skip_errors=True
+    )
+    assert result == (len(SECRETS) - 4, 1)
+    assert target.secrets["app/03"] == {"n": "kept"}
+    assert target.secrets["top"] == {"a": 1}
@@ -0,0 +1,268 @@
+import base64
+import json
+import threading
+import time
+
+import pytest
+from snek.client import VaultClient
+from snek.constants import HttpStatusCode
+from snek.exceptions import TransitException, VaultClientException
+from snek.models import VaultResponse
+from snek.transit import DataKeyCache, TransitAPI
+
+
+def _b64(data):
+    return base64.b64encode(data).decode()
+
+
+def _transform(endpoint, item):
+    if item.get("plaintext") == _b64(b"fail"):
+        return {"error": "invalid input"}
+    if endpoint == "encrypt":
+        return {"ciphertext": f"vault:v1:{item['plaintext']}", "key_version": 1}
+    if endpoint == "decrypt":
+        return {"plaintext": item["ciphertext"][len("vault:v1:") :]}
+    if endpoint == "rewrap":
+        return {"ciphertext": item["ciphertext"].replace(":v1:", ":v2:")}
+    return {"hmac": f"vault:v1:{item['input']}"}
+
+
+@pytest.fixture
+def vault(mock_vault_client):
+    client = mock_vault_client
+    client.keys = 0
+
+    def post(api_path, data=None):
+        endpoint = api_path.split("/")[3]
+        if endpoint == "datakey":
+            client.keys += 1
+            key = bytes([client.keys]) * 32
+            return VaultResponse(
+                {
+                    "data": {
+                        "plaintext": _b64(key),
+                        "ciphertext": f"vault:v1:{_b64(key)}",
+                        "key_version": 1,
+                    }
+                },
+                200,
+            )
+        batch = data["batch_input"]
+        if any(item.get("plaintext") == _b64(b"down") for item in batch):
+            raise VaultClientException(
+                "500: down", status_code=HttpStatusCode.INTERNAL_SERVER_ERROR
+            )
+        results = [_transform(endpoint, item) for item in batch]
+        return VaultResponse({"data": {"batch_results": results}}, 200)
+
+    client.post.side_effect = post
+    return client
+
+
+def _batch_sizes(vault):
+    return [len(c.kwargs["data"]["batch_input"]) for c in vault.post.call_args_list]
+
+
+class TestTransitAPIBatches:
+    def test_encrypt_many(self, vault):
+        transit = TransitAPI(vault, max_batch_items=3)
+        plaintexts = [str(i).encode() for i in range(10)]
+        results = list(transit.encrypt_many("orders", plaintexts))
+        assert [r.position for r in results] == list(range(10))
+        assert [r.value for r in results] == [f"vault:v1:{_b64(p)}" for p in plaintexts]
+        assert all(r.ok and r.key_version == 1 for r in results)
+        assert sorted(_batch_sizes(vault)) == [1, 3, 3, 3]
+        assert vault.post.call_args[0][0] == "/v1/transit/encrypt/orders"
+
+    def test_split_by_size(self, vault):
+        transit = TransitAPI(vault, max_batch_bytes=300)
+        list(transit.encrypt_many("orders", [b"x" * 150] * 5))
+        assert _batch_sizes(vault) == [1] * 5
+
+    def test_in_order_when_batches_finish_out_of_order(self, vault):
+        post = vault.post.side_effect
+
+        def slow_first(api_path, data=None):
+            if data["batch_input"][0]["plaintext"] == _b64(b"0"):
+                time.sleep(0.05)
+            return post(api_path, data=data)
+
+        vault.post.side_effect = slow_first
+        transit = TransitAPI(vault, max_batch_items=1, max_concurrency=4)
+        plaintexts = [str(i).encode() for i in range(8)]
+        results = list(transit.encrypt_many("orders", plaintexts))
+        assert [r.position for r in results] == list(range(8))
+
+    def test_streams_input(self, vault):
+        pulled = []
+
+        def plaintexts():
+            for i in range(1000):
+                pulled.append(i)
+                yield b"x"
+
+        transit = TransitAPI(vault, max_batch_items=10, max_concurrency=2)
+        results = transit.encrypt_many("orders", plaintexts())
+        assert not pulled
+        next(results)
+        assert len(pulled) <= 31
+        results.close()
+
+    def test_failures(self, vault):
+        transit = TransitAPI(vault, max_batch_items=2)
+        plaintexts = [b"a", b"fail", b"down", b"b", b"c"]
+        results = list(transit.encrypt_many("orders", plaintexts))
+        assert [r.ok for r in results] == [True, False, False, False, True]
+        assert results[1].error == "invalid input"
+        assert results[1].status_code is None
+        assert results[2].status_code == HttpStatusCode.INTERNAL_SERVER_ERROR
+        assert results[3].error == "500: down"
+
+    def test_decrypt_many_with_context(self, vault):
+        transit = TransitAPI(vault)
+        ciphertexts = [(f"vault:v1:{_b64(b'secret')}", b"tenant-1")]
+        (result,) = transit.decrypt_many("orders", ciphertexts)
+        assert result.value == b"secret"
+        item = vault.post.call_args.kwargs["data"]["batch_input"][0]
+        assert item["context"] == _b64(b"tenant-1")
+
+    def test_rewrap_and_hmac(self, vault):
+        transit = TransitAPI(vault)
+        (result,) = transit.rewrap_many("orders", ["vault:v1:YQ=="], key_version=2)
+        assert result.value == "vault:v2:YQ=="
+        assert vault.post.call_args.kwargs["data"]["key_version"] == 2
+        (result,) = transit.hmac_many("orders", [b"a"], algorithm="sha2-512")
+        assert result.value == "vault:v1:YQ=="
+        assert vault.post.call_args[0][0] == "/v1/transit/hmac/orders/sha2-512"
+
+    def test_bad_arguments(self, vault):
+        with pytest.raises(ValueError):
+            TransitAPI(vault, max_batch_items=0)
+        with pytest.raises(ValueError):
+            TransitAPI(vault, max_concurrency=0)
+
+
+class TestTransitAPISingle:
+    def test_round_trip(self, vault):
+        transit = TransitAPI(vault)
+        ciphertext = transit.encrypt("orders", b"secret")
+        assert transit.decrypt("orders", ciphertext) == b"secret"
+        assert transit.rewrap("orders", ciphertext).startswith("vault:v2:")
+        assert transit.hmac("orders", b"a") == "vault:v1:YQ=="
+
+    def test_errors(self, vault):
+        transit = TransitAPI(vault)
+        with pytest.raises(TransitException, match="invalid input"):
+            transit.encrypt("orders", b"fail")
+        with pytest.raises(TransitException) as err:
+            transit.encrypt("orders", b"down")
+        assert err.value.status_code == HttpStatusCode.INTERNAL_SERVER_ERROR
+
+
+class TestDataKeys:
+    def test_uncached(self, vault):
+        transit = TransitAPI(vault)
+        first = transit.data_key("orders")
+        assert first.plaintext == b"\x01" * 32
+        assert transit.data_key("orders") != first
+        assert vault.post.call_args[0][0] == "/v1/transit/datakey/plaintext/orders"
+        assert vault.post.call_args.kwargs["data"] == {"bits": 256}
+
+    def test_generate_failure(self, vault):
+        vault.post.side_effect = VaultClientException("403: denied", status_code=403)
+        with pytest.raises(TransitException) as err:
+            TransitAPI(vault).data_key("orders")
+        assert err.value.status_code == 403
+
+    def test_reuse(self, vault, clock):
+        cache = DataKeyCache(max_age=60, max_uses=3, clock=clock)
+        transit = TransitAPI(vault, datakey_cache=cache)
+        keys = [transit.data_key("orders") for _ in range(4)]
+        assert len(set(keys)) == 2
+        assert transit.data_key("orders", context=b"tenant") not in keys
+        clock.now = 61
+        assert transit.data_key("orders") not in keys
+        assert vault.keys == 4
+
+    def test_reuse_across_threads(self, vault):
+        transit = TransitAPI(vault, datakey_cache=DataKeyCache())
+        keys = []
+        threads = [
+            threading.Thread(target=lambda: keys.append(transit.data_key("orders")))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(set(keys)) == 1
+
+    def test_unwrap(self, vault, clock):
+        transit = TransitAPI(vault, datakey_cache=DataKeyCache(clock=clock))
+        key = transit.data_key("orders")
+        assert transit.unwrap_data_key("orders", key.ciphertext) == key.plaintext
+        assert vault.post.call_count == 1
+
+        other = f"vault:v1:{_b64(b'k' * 32)}"
+        assert transit.unwrap_data_key("orders", other) == b"k" * 32
+        assert transit.unwrap_data_key("orders", other) == b"k" * 32
+        assert vault.post.call_count == 2
+        transit.unwrap_data_key("orders", other, context=b"tenant")
+        assert vault.post.call_count == 3
+        transit.unwrap_data_key("invoices", other)
+        assert vault.post.call_count == 4
+
+        clock.now = 301
+        transit.unwrap_data_key("orders", other)
+        assert vault.post.call_count == 5
+
+    def test_generate_outside_lock(self, vault):
+        cache = DataKeyCache()
+        transit = TransitAPI(vault, datakey_cache=cache)
+        key = transit.data_key("invoices")
+        started, release = threading.Event(), threading.Event()
+
+        def generate():
+            started.set()
+            release.wait(5)
+            return key
+
+        thread = threading.Thread(
+            target=cache.checkout, args=(("m", "o", None, 256), generate)
+        )
+        thread.start()
+        assert started.wait(5)
+        # Another key and the unwrapped keys are served while one is generated.
+        assert transit.data_key("invoices") is key
+        assert transit.unwrap_data_key("invoices", key.ciphertext) == key.plaintext
+        assert thread.is_alive()
+        release.set()
+        thread.join()
+        assert vault.post.call_count == 1
+
+    def test_unwrap_uncached(self, vault):
+        transit = TransitAPI(vault)
+        other = f"vault:v1:{_b64(b'k' * 32)}"
+        transit.unwrap_data_key("orders", other)
+        transit.unwrap_data_key("orders", other)
+        assert vault.post.call_count == 2
+
+
+def test_partial_batch_failure(mock_http_call):
+    # Vault answers 400 when any item fails, with every item's result in the body.
+    mock_http_call.return_value.status_code = 400
+    mock_http_call.return_value.content = json.dumps(
+        {
+            "data": {
+                "batch_results": [
+                    {"plaintext": _b64(b"secret")},
+                    {"error": "invalid ciphertext: no prefix"},
+                ]
+            }
+        }
+    ).encode()
+    transit = TransitAPI(VaultClient("http://localhost:8200/", "abc"))
+    good, bad = transit.decrypt_many("orders", [f"vault:v1:{_b64(b'secret')}", "x"])
+    assert good.ok and good.value == b"secret"
+    assert not bad.ok and bad.error == "invalid ciphertext: no prefix"
+    assert bad.status_code is None
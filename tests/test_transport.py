@@ -0,0 +1,253 @@
+import json
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import snek
+from snek.client import VaultClient
+from snek.constants import HttpStatusCode
+from snek.exceptions import VaultClientException
+from snek.transport import (
+    HTTP2Transport,
+    HTTPClientTransport,
+    RequestsTransport,
+    _dropped,
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.server.seen.append(
+            {
+                "method": self.command,
+                "path": self.path,
+                "headers": dict(self.headers),
+                "body": self.rfile.read(length),
+                "port": self.client_address[1],
+            }
+        )
+        if self.path.startswith("/v1/missing"):
+            status, body = 404, b'{"errors": []}'
+        elif self.path.startswith("/v1/garbage"):
+            self.wfile.write(b"not http\r\n\r\n")
+            self.close_connection = True
+            return
+        else:
+            status, body = 200, b'{"data": {"value": "bar"}}'
+        # Closes the connection without telling the client, like an idle timeout.
+        self.close_connection = self.path.endswith("/close")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_PUT = do_POST = do_LIST = _reply
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    server.seen = []
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,))
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+@pytest.fixture
+def url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+class TestHTTPClientTransport:
+    def test_client_round_trip(self, server, url):
+        with VaultClient(url, "abc", transport=HTTPClientTransport()) as client:
+            assert client.get("/v1/secret/foo").response["data"] == {"value": "bar"}
+            client.put("/v1/secret/foo", data={"a": 1})
+            client.get("/v1/secret/foo", params={"version": 2, "skip": None})
+            with pytest.raises(VaultClientException) as err:
+                client.list("/v1/missing")
+            assert err.value.status_code is HttpStatusCode.INVALID_PATH
+        get, put, versioned, listed = server.seen
+        assert get["headers"]["X-Vault-Token"] == "abc"
+        assert json.loads(put["body"]) == {"a": 1}
+        assert versioned["path"] == "/v1/secret/foo?version=2"
+        assert listed["method"] == "LIST"
+        # One keep-alive connection served every request.
+        assert len({r["port"] for r in server.seen}) == 1
+
+    def test_headers(self, server, url):
+        transport = HTTPClientTransport(headers={"X-Vault-Token": "abc", "X-A": "1"})
+        transport.request(
+            "GET", f"{url}v1/sys/health", headers={"X-Vault-Token": None, "X-B": "2"}
+        )
+        headers = server.seen[0]["headers"]
+        assert "X-Vault-Token" not in headers
+        assert (headers["X-A"], headers["X-B"]) == ("1", "2")
+        transport.close()
+
+    def test_connection_per_thread(self, server, url):
+        transport = HTTPClientTransport()
+
+        def read():
+            for _ in range(3):
+                transport.request("GET", f"{url}v1/secret/foo")
+
+        threads = [threading.Thread(target=read) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len({r["port"] for r in server.seen}) == 3
+        transport.close()
+
+    def test_reconnects_after_server_closes(self, server, url):
+        transport = HTTPClientTransport()
+        transport.request("GET", f"{url}v1/secret/close")
+        (conn,) = transport._connections
+        deadline = time.monotonic() + 2
+        while not _dropped(conn.sock) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        res = transport.request("GET", f"{url}v1/secret/foo")
+        assert res.status_code == 200
+        assert len({r["port"] for r in server.seen}) == 2
+        transport.close()
+
+    def test_errors(self, server, url):
+        transport = HTTPClientTransport()
+        with pytest.raises(IOError):
+            transport.request("GET", f"{url}v1/garbage")
+        with pytest.raises(IOError):
+            transport.request("GET", "http://127.0.0.1:1/", timeout=1)
+        with pytest.raises(ValueError):
+            transport.request("GET", "ftp://127.0.0.1/")
+        with pytest.raises(TypeError):
+            transport.request("GET", url, verify=False)
+
+    def test_clients_share_transport(self, server, url):
+        transport = HTTPClientTransport()
+        first = VaultClient(url, "token-a", transport=transport)
+        second = VaultClient(url, "token-b", namespace="ns-b", transport=transport)
+        first.get("/v1/secret/foo")
+        second.get("/v1/secret/foo")
+        first.token = "token-c"
+        first.get("/v1/secret/foo")
+        seen = [r["headers"] for r in server.seen]
+        assert [h["X-Vault-Token"] for h in seen] == ["token-a", "token-b", "token-c"]
+        assert [h.get("X-Vault-Namespace") for h in seen] == [None, "ns-b", None]
+        assert second.token == "token-b"
+        transport.close()
+
+    def test_client_connection_error(self):
+        client = VaultClient(
+            "http://127.0.0.1:1/", "abc", transport=HTTPClientTransport()
+        )
+        with pytest.raises(VaultClientException):
+            client.get("/v1/secret/foo")
+
+
+class TestHTTP2Transport:
+    @pytest.fixture(autouse=True)
+    def h2(self):
+        pytest.importorskip("httpx")
+        pytest.importorskip("h2")
+
+    def test_request(self):
+        httpx = pytest.importorskip("httpx")
+        seen = []
+
+        def handler(request):
+            seen.append(request)
+            if request.url.path == "/v1/down":
+                raise httpx.ConnectError("Connection failure")
+            return httpx.Response(200, json={"data": {"value": "bar"}})
+
+        transport = HTTP2Transport(
+            headers={"X-Vault-Token": "abc", "X-A": "1"},
+            transport=httpx.MockTransport(handler),
+        )
+        client = VaultClient("https://vault/", "abc", transport=transport)
+        res = client.get("/v1/secret/foo", params={"version": 2, "skip": None})
+        assert res.response["data"] == {"value": "bar"}
+        client.make_request(
+            "PUT",
+            "https://vault/v1/auth/token",
+            json={"a": 1},
+            headers={"X-Vault-Token": None},
+        )
+        with pytest.raises(VaultClientException, match="Connection failure"):
+            client.get("/v1/down")
+        with pytest.raises(TypeError):
+            transport.request("GET", "https://vault/", verify=False)
+        client.close()
+
+        get, put = seen[:2]
+        assert str(get.url) == "https://vault/v1/secret/foo?version=2"
+        assert get.headers["X-Vault-Token"] == "abc"
+        assert put.method == "PUT" and json.loads(put.content) == {"a": 1}
+        assert "X-Vault-Token" not in put.headers and put.headers["X-A"] == "1"
+
+    def test_clients_share_transport(self):
+        httpx = pytest.importorskip("httpx")
+        seen = []
+
+        def handler(request):
+            seen.append(request.headers)
+            return httpx.Response(200, json={})
+
+        transport = HTTP2Transport(transport=httpx.MockTransport(handler))
+        first = VaultClient("https://vault/", "token-a", transport=transport)
+        second = VaultClient(
+            "https://vault/", "token-b", namespace="ns-b", transport=transport
+        )
+        first.get("/v1/secret/foo")
+        second.get("/v1/secret/foo")
+        first.get("/v1/secret/foo")
+        assert [h["X-Vault-Token"] for h in seen] == ["token-a", "token-b", "token-a"]
+        assert [h.get("X-Vault-Namespace") for h in seen] == [None, "ns-b", None]
+        transport.close()
+
+    def test_http1_fallback(self, server, url):
+        with VaultClient(url, "abc", transport=HTTP2Transport()) as client:
+            for _ in range(3):
+                client.get("/v1/secret/foo")
+        assert len({r["port"] for r in server.seen}) == 1
+
+
+def test_default_transport():
+    client = VaultClient("http://localhost:8200/", "abc")
+    assert isinstance(client.transport, RequestsTransport)
+    assert "X-Vault-Token" not in client.session.headers
+    other = VaultClient(
+        "http://localhost:8200/", "abc", transport=HTTPClientTransport()
+    )
+    with pytest.raises(AttributeError):
+        other.session
+    assert other.token == "abc"
+
+
+def test_lazy_package_attributes():
+    assert snek.VaultClient is VaultClient
+    assert "KVSecretV2API" in dir(snek)
+    with pytest.raises(AttributeError):
+        snek.missing
+    code = (
+        "import sys, snek; "
+        "assert 'snek.client' not in sys.modules; "
+        "snek.VaultClient; "
+        "assert 'snek.client' in sys.modules and 'requests' not in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)